@@ -1,20 +1,171 @@
 # app/__init__.py
 
 import os
+import threading
 from flask import Flask
-from google.cloud import datastore
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from .startup_profile import StartupProfile
+from .json_provider import AppJSONProvider
+from .metrics import get_registry, init_app as init_metrics, instrument_datastore_client
 
 # .envファイルの読み込みをここで行う
 load_dotenv() 
 
+_UNSET = object()
+
+
+def _create_datastore_client():
+    """Datastoreクライアントを生成する。失敗した場合は None (従来どおり各エンドポイントで 500 を返す)。"""
+    try:
+        from google.cloud import datastore
+        project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+        if project_id:
+            client = datastore.Client(project=project_id)
+        else:
+            client = datastore.Client()
+        print("Datastore client initialized and attached to app instance.") # 既存のprint
+        return client
+    except Exception as e:
+        print(f"Error initializing Datastore client in create_app: {e}")
+        return None
+
+
+class MyUtilFlask(Flask):
+    """
+    Datastoreクライアントを初回アクセス時に生成する Flask。
+    認証情報の探索と gRPC チャネルの準備をコールドスタートの起動処理から外すため、
+    app.db は最初に参照したリクエストで _create_datastore_client() を呼ぶ。
+    クライアントは RPC の回数と所要時間を記録するプロキシ (app/metrics.py) で包む。
+    JSON のシリアライズは AppJSONProvider (app/json_provider.py) で行う。
+    """
+
+    json_provider_class = AppJSONProvider
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._db_client = _UNSET
+        self._db_lock = threading.Lock()
+
+    @property
+    def db(self):
+        if self._db_client is _UNSET:
+            with self._db_lock:
+                if self._db_client is _UNSET:
+                    self._db_client = instrument_datastore_client(_create_datastore_client(), get_registry(self))
+        return self._db_client
+
+    @db.setter
+    def db(self, client):
+        self._db_client = instrument_datastore_client(client, get_registry(self))
+
+    @property
+    def db_initialized(self) -> bool:
+        return self._db_client is not _UNSET
+
+    def reset_db(self):
+        """生成済みのクライアントを捨て、次の app.db の参照で作り直させる (fork 後の子プロセス用)。"""
+        self._db_client = _UNSET
+        self._db_lock = threading.Lock()
+
+
+# fork 後も親プロセスのものをそのまま使える拡張 (スレッド・gRPC チャネルを持たないもの)
+_FORK_SAFE_EXTENSIONS = ('startup_profile',)
+
+
+def reset_after_fork(app_instance):
+    """
+    gunicorn の post_fork (gunicorn.conf.py) から子プロセスで呼ぶ。
+    preload_app で親プロセスが作った Datastore クライアント (gRPC チャネル)・Generative AI の設定・
+    スレッドプールやバックグラウンドスレッドを持つ拡張を捨て、子プロセスで初回使用時に作り直させる。
+    """
+    app_instance.reset_db()
+    registry = app_instance.extensions.get('metrics')
+    for name in list(app_instance.extensions):
+        if name not in _FORK_SAFE_EXTENSIONS:
+            app_instance.extensions.pop(name, None)
+    if registry is not None:
+        # リクエストの計測フックが同じレジストリを参照しているため、入れ替えずに中身だけ初期化する
+        registry.reset()
+        app_instance.extensions['metrics'] = registry
+
+
 def create_app(config_name=None):
     print("--- create_app() CALLED ---") # 既存のprint
-    app_instance = Flask(__name__)
+    profile = StartupProfile()
+    app_instance = MyUtilFlask(__name__)
+    app_instance.extensions['startup_profile'] = profile
 
     # --- 設定の読み込み ---
     app_instance.config['SECRET_AUTH_KEY'] = os.environ.get('SECRET_AUTH_KEY', 'mysecretkey_app_init_default')
+    # クライアントごとのAPIキー (Datastore の api_keys) の検証結果キャッシュ (有効/無効の保持秒数, 件数)
+    # AUTH_LEGACY_KEY_ENABLED=false で SECRET_AUTH_KEY による認証を無効にする
+    app_instance.config['AUTH_KEY_CACHE_TTL_SECONDS'] = float(os.environ.get('AUTH_KEY_CACHE_TTL_SECONDS', 300))
+    app_instance.config['AUTH_KEY_NEGATIVE_CACHE_TTL_SECONDS'] = float(os.environ.get('AUTH_KEY_NEGATIVE_CACHE_TTL_SECONDS', 30))
+    app_instance.config['AUTH_KEY_CACHE_MAXSIZE'] = int(os.environ.get('AUTH_KEY_CACHE_MAXSIZE', 4096))
+    app_instance.config['AUTH_LEGACY_KEY_ENABLED'] = os.environ.get('AUTH_LEGACY_KEY_ENABLED', 'true').lower() != 'false'
+    # GET /employees/<id> の読み取りキャッシュ (ワーカープロセスごと)
+    app_instance.config['EMPLOYEE_CACHE_MAXSIZE'] = int(os.environ.get('EMPLOYEE_CACHE_MAXSIZE', 1024))
+    app_instance.config['EMPLOYEE_CACHE_TTL_SECONDS'] = int(os.environ.get('EMPLOYEE_CACHE_TTL_SECONDS', 300))
+    # イベント書き込み時の従業員の存在確認を省くための従業員 ID の集合 (バックグラウンドで keys-only クエリで読み直す間隔。0 以下なら読み直さない)
+    app_instance.config['EMPLOYEE_ID_SET_REFRESH_SECONDS'] = float(os.environ.get('EMPLOYEE_ID_SET_REFRESH_SECONDS', 600))
+    # 従業員ごとのイベント集計の月ごとのシャード数 (1シャードへの書き込みはおおむね毎秒1回まで)、
+    # 集計をバックグラウンドで書き出す間隔 (秒)、日付の集計に使うUTCからの時差
+    app_instance.config['EVENT_ROLLUP_SHARDS'] = int(os.environ.get('EVENT_ROLLUP_SHARDS', 4))
+    app_instance.config['EVENT_ROLLUP_FLUSH_SECONDS'] = float(os.environ.get('EVENT_ROLLUP_FLUSH_SECONDS', 5))
+    app_instance.config['EVENT_ROLLUP_UTC_OFFSET_HOURS'] = int(os.environ.get('EVENT_ROLLUP_UTC_OFFSET_HOURS', 9))
+    # /meeting-summary/meeting の非同期ジョブ (ワーカー数, 待ち行列の長さ, 結果の保持秒数)
+    app_instance.config['MEETING_SUMMARY_JOB_WORKERS'] = int(os.environ.get('MEETING_SUMMARY_JOB_WORKERS', 2))
+    app_instance.config['MEETING_SUMMARY_JOB_QUEUE_SIZE'] = int(os.environ.get('MEETING_SUMMARY_JOB_QUEUE_SIZE', 16))
+    app_instance.config['MEETING_SUMMARY_JOB_TTL_SECONDS'] = int(os.environ.get('MEETING_SUMMARY_JOB_TTL_SECONDS', 3600))
+    # 要約結果のキャッシュ (プロセス内LRUの件数と保持秒数, Datastore 側の有効秒数)
+    app_instance.config['MEETING_SUMMARY_CACHE_MAXSIZE'] = int(os.environ.get('MEETING_SUMMARY_CACHE_MAXSIZE', 256))
+    app_instance.config['MEETING_SUMMARY_CACHE_TTL_SECONDS'] = int(os.environ.get('MEETING_SUMMARY_CACHE_TTL_SECONDS', 3600))
+    app_instance.config['MEETING_SUMMARY_CACHE_PERSISTENT_TTL_SECONDS'] = int(os.environ.get('MEETING_SUMMARY_CACHE_PERSISTENT_TTL_SECONDS', 7 * 24 * 3600))
+    # 長文モード (この文字数を超える文字起こしは分割して並列に要約する)
+    app_instance.config['LONG_TRANSCRIPT_THRESHOLD_CHARS'] = int(os.environ.get('LONG_TRANSCRIPT_THRESHOLD_CHARS', 60000))
+    app_instance.config['LONG_TRANSCRIPT_CHUNK_CHARS'] = int(os.environ.get('LONG_TRANSCRIPT_CHUNK_CHARS', 30000))
+    app_instance.config['MEETING_SUMMARY_CHUNK_CONCURRENCY'] = int(os.environ.get('MEETING_SUMMARY_CHUNK_CONCURRENCY', 4))
+    # 要約前の文字起こしの前処理 (カンマ区切りの手順, 空にすると前処理しない) と入力トークン数の上限
+    # (1回の呼び出しで要約する上限, 超えた場合は長文モード / 受け付ける上限, 超えた場合は 413)
+    app_instance.config['TRANSCRIPT_PREPROCESSING'] = os.environ.get('TRANSCRIPT_PREPROCESSING', 'whitespace,timestamps,fillers,speakers')
+    app_instance.config['MEETING_SUMMARY_SINGLE_CALL_MAX_TOKENS'] = int(os.environ.get('MEETING_SUMMARY_SINGLE_CALL_MAX_TOKENS', 60000))
+    app_instance.config['MEETING_SUMMARY_MAX_INPUT_TOKENS'] = int(os.environ.get('MEETING_SUMMARY_MAX_INPUT_TOKENS', 500000))
+    # /meeting-summary/meeting/stream で応答待ちの間に送るキープアライブの間隔 (秒)
+    app_instance.config['SSE_HEARTBEAT_SECONDS'] = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    # /meeting-summary/meeting/stream の進捗イベントのキューの長さ (受信が追いつかない分は捨てる)
+    app_instance.config['SSE_EVENT_QUEUE_SIZE'] = int(os.environ.get('SSE_EVENT_QUEUE_SIZE', 64))
+    # Google Meet 表示名インデックスの差分更新間隔と全件再読み込み間隔 (秒)
+    app_instance.config['GOOGLE_MEET_MAP_REFRESH_SECONDS'] = float(os.environ.get('GOOGLE_MEET_MAP_REFRESH_SECONDS', 60))
+    app_instance.config['GOOGLE_MEET_MAP_FULL_RELOAD_SECONDS'] = float(os.environ.get('GOOGLE_MEET_MAP_FULL_RELOAD_SECONDS', 3600))
+    # 差分更新で updated_at を遡って読む秒数 (ワーカー間の時刻のずれ・遅れてコミットされた書き込みを取りこぼさないため)
+    app_instance.config['GOOGLE_MEET_MAP_SYNC_OVERLAP_SECONDS'] = float(os.environ.get('GOOGLE_MEET_MAP_SYNC_OVERLAP_SECONDS', 30))
+    # 要約への話者 (従業員ID) の付与と、従業員一覧の再読み込み間隔 (秒)
+    app_instance.config['SPEAKER_RESOLUTION_ENABLED'] = os.environ.get('SPEAKER_RESOLUTION_ENABLED', 'true').lower() != 'false'
+    app_instance.config['SPEAKER_RESOLVER_EMPLOYEE_REFRESH_SECONDS'] = float(os.environ.get('SPEAKER_RESOLVER_EMPLOYEE_REFRESH_SECONDS', 300))
+    # Slack投稿のバックグラウンド送信 (キューの長さ, 最大再送回数, 1リクエストのタイムアウト秒)
+    app_instance.config['SLACK_API_URL'] = os.environ.get('SLACK_API_URL', 'https://slack.com/api/chat.postMessage')
+    app_instance.config['SLACK_QUEUE_SIZE'] = int(os.environ.get('SLACK_QUEUE_SIZE', 100))
+    app_instance.config['SLACK_MAX_RETRIES'] = int(os.environ.get('SLACK_MAX_RETRIES', 5))
+    app_instance.config['SLACK_TIMEOUT_SECONDS'] = float(os.environ.get('SLACK_TIMEOUT_SECONDS', 10))
+    # プロセスあたりの LLM 同時呼び出し数と、枠が空くまで待つ秒数 (超えた要約リクエストは 503)
+    app_instance.config['LLM_MAX_CONCURRENCY'] = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+    app_instance.config['LLM_QUEUE_TIMEOUT_SECONDS'] = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', 30))
+    # 'stub' にすると Gemini の代わりに app/genai_stub.py を使う (負荷試験・ローカル開発用)
+    app_instance.config['GENAI_BACKEND'] = os.environ.get('GENAI_BACKEND', 'google')
+    app_instance.config['GENAI_STUB_LATENCY_SECONDS'] = float(os.environ.get('GENAI_STUB_LATENCY_SECONDS', 0.5))
+    # /metrics の集計。複数ワーカーで動かす場合は共有ディレクトリを METRICS_DIR に指定する (未指定の場合はプロセス内のみ)
+    app_instance.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', '')
+    app_instance.config['METRICS_FLUSH_SECONDS'] = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    # POST の Idempotency-Key (保存したレスポンスの保持秒数, プロセス内の件数, 実行中の同じキーを待つ秒数, 実行中の印の有効秒数)
+    app_instance.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    app_instance.config['IDEMPOTENCY_CACHE_MAXSIZE'] = int(os.environ.get('IDEMPOTENCY_CACHE_MAXSIZE', 1024))
+    app_instance.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 60))
+    app_instance.config['IDEMPOTENCY_LOCK_SECONDS'] = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 300))
+    # JSON レスポンスの整形 (未指定: デバッグ時のみ整形, 'true': 常にコンパクト, 'false': 常に整形)
+    json_compact = os.environ.get('JSON_COMPACT', '').lower()
+    app_instance.config['JSON_COMPACT'] = None if not json_compact else json_compact != 'false'
+    app_instance.json.compact = app_instance.config['JSON_COMPACT']
     
     # GOOGLE_GEN_AI_API_KEY の取得状況を詳細にログ出力
     retrieved_gen_ai_key = os.environ.get('GOOGLE_GEN_AI_API_KEY')
@@ -32,61 +183,37 @@ def create_app(config_name=None):
     # ... (SECRET_AUTH_KEY のチェック) ...
 
     # --- Datastoreクライアントの初期化 ---
-    try:
-        project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
-        if project_id:
-            app_instance.db = datastore.Client(project=project_id)
-        else:
-            app_instance.db = datastore.Client()
-        print("Datastore client initialized and attached to app instance.") # 既存のprint
-    except Exception as e:
-        print(f"Error initializing Datastore client in create_app: {e}")
-        app_instance.db = None
-
+    # クライアントは app_instance.db への初回アクセス時に生成する (MyUtilFlask.db を参照)
     # --- Google Generative AI クライアントの初期化 ---
-    # configオブジェクトの現在のキー一覧をログ出力
-    print(f"DEBUG: Keys currently in app_instance.config: {list(app_instance.config.keys())}")
-    
-    # より安全なキーの存在確認と値の評価
-    if 'GOOGLE_GEN_AI_API_KEY' in app_instance.config and app_instance.config.get('GOOGLE_GEN_AI_API_KEY'):
-        api_key_to_use = app_instance.config['GOOGLE_GEN_AI_API_KEY']
-        print(f"DEBUG: Found GOOGLE_GEN_AI_API_KEY in config. Value: '{api_key_to_use}'. Proceeding with genai.configure.")
-        try:
-            # !!! 重要: エンドポイントの指定がまだ必要です !!!
-            # google-generativeai==0.8.5 での正しいエンドポイント指定方法を再度ご確認ください。
-            # 例: client_options={"api_endpoint": "us-central1-aiplatform.googleapis.com"}
-            genai.configure(
-                api_key=api_key_to_use
-                # , client_options={"api_endpoint": "us-central1-aiplatform.googleapis.com"} # <-- このような指定が必要
-            )
-            print("Google Generative AI configured.") # 既存のprint
-        except Exception as e:
-            print(f"Error configuring Google Generative AI: {e}")
-            app_instance.logger.warning(f"Failed to configure Google Generative AI: {e}. Generative AI features may not work.")
-    else:
-        missing_reason = ""
-        if 'GOOGLE_GEN_AI_API_KEY' not in app_instance.config:
-            missing_reason = "key not found in config"
-        elif not app_instance.config.get('GOOGLE_GEN_AI_API_KEY'):
-            missing_reason = "key is in config but value is None or empty"
-        
-        print(f"DEBUG: GOOGLE_GEN_AI_API_KEY {missing_reason}. Generative AI features may not work.")
-        app_instance.logger.warning(f"GOOGLE_GEN_AI_API_KEY {missing_reason}. Generative AI features may not work.")
-    
+    # google.generativeai は要約の初回実行時にインポート・configure する (app/genai_client.py を参照)
+
+    profile.mark("config")
+
+    # --- リクエストの計測 ---
+    init_metrics(app_instance)
+    profile.mark("metrics")
+
     # --- Blueprintの登録 ---
-    from .main import main_bp
+    # 各 Blueprint のインポート時間は profile.import_module で計測する
+    main_bp = profile.import_module('app.main').main_bp
     # 'main_bp_instance' のような、アプリケーション内でユニークな名前を明示的に指定
     app_instance.register_blueprint(main_bp, name=f"main_bp_instance_{os.getpid()}") # プロセスIDなどでさらにユニークに
+    profile.mark("blueprint:main")
 
-    from .employees import employees_bp
+    employees_bp = profile.import_module('app.employees').employees_bp
     app_instance.register_blueprint(employees_bp, name=f"employees_bp_instance_{os.getpid()}")
+    profile.mark("blueprint:employees")
 
-    from .meeting_summary import bp as meeting_summary_bp
+    meeting_summary_bp = profile.import_module('app.meeting_summary').bp
     app_instance.register_blueprint(meeting_summary_bp, url_prefix='/meeting-summary')
-    
-    from .google_meet_maps.routes import google_meet_map_bp
+    profile.mark("blueprint:meeting_summary")
+
+    google_meet_map_bp = profile.import_module('app.google_meet_maps.routes').google_meet_map_bp
 
     app_instance.register_blueprint(google_meet_map_bp)
+    profile.mark("blueprint:google_meet_maps")
 
+    profile.finish()
+    app_instance.logger.info(f"create_app() finished in {profile.report()['total_ms']} ms")
 
     return app_instance
\ No newline at end of file
@@ -1,26 +1,150 @@
 # app/auth.py
 
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 import functools
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.cache import StatsTTLCache
+from app.extensions import get_or_create_extension
+
+API_KEY_KIND = 'api_keys'
+# SECRET_AUTH_KEY で認証されたリクエストの g.api_client_id
+LEGACY_CLIENT_ID = 'legacy'
+
+
+class AuthBackendError(Exception):
+    """APIキーの照会先 (Datastore) が使えない場合に送出する"""
+
+
+def hash_api_key(raw_key: str) -> str:
+    """APIキーの SHA-256 (16進)。Datastore には生のキーではなくこの値をキー名として保存する。"""
+    return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+
+class ApiKeyVerifier:
+    """
+    API_KEY_KIND (キー名 = APIキーの SHA-256) に保存したクライアントごとのAPIキーを検証する。
+    検証結果はプロセス内にキャッシュし (有効なキーは ttl 秒, 無効なキーは negative_ttl 秒)、
+    有効なキーは ttl の半分を過ぎるとバックグラウンドで再検証するため、ウォームアップ後の認証で RPC は発生しない。
+    キーの無効化 (disabled / expires_at) はキャッシュの ttl 以内に全インスタンスへ反映される。
+    """
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30, maxsize: int = 4096):
+        self.ttl = ttl
+        self._valid = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._invalid = StatsTTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def verify(self, app, raw_key: str) -> Optional[str]:
+        """有効なキーであればクライアントIDを、無効であれば None を返す。"""
+        legacy_key = app.config.get('SECRET_AUTH_KEY')
+        if app.config.get('AUTH_LEGACY_KEY_ENABLED', True) and legacy_key and \
+                hmac.compare_digest(raw_key.encode('utf-8'), legacy_key.encode('utf-8')):
+            return LEGACY_CLIENT_ID
+
+        digest = hash_api_key(raw_key)
+        cached = self._valid.get(digest)
+        if cached is not None:
+            client_id, verified_at = cached
+            if time.monotonic() - verified_at >= self.ttl / 2:
+                self._refresh_in_background(app, digest)
+            return client_id
+        if self._invalid.get(digest):
+            return None
+        return self._lookup(app, digest)
+
+    def invalidate(self, raw_key: str):
+        digest = hash_api_key(raw_key)
+        self._valid.invalidate(digest)
+        self._invalid.invalidate(digest)
+
+    def stats(self):
+        return {"valid": self._valid.stats(), "invalid": self._invalid.stats()}
+
+    def _lookup(self, app, digest: str) -> Optional[str]:
+        db_client = app.db
+        if not db_client:
+            raise AuthBackendError("Datastore client not initialized")
+        try:
+            entity = db_client.get(db_client.key(API_KEY_KIND, digest))
+        except Exception as e:
+            raise AuthBackendError(str(e))
+
+        client_id = None
+        if entity is not None and hmac.compare_digest(entity.key.name, digest) and not entity.get('disabled'):
+            expires_at = entity.get('expires_at')
+            if expires_at is None or expires_at > datetime.now(timezone.utc):
+                client_id = entity.get('client_id') or digest[:12]
+
+        if client_id is None:
+            self._valid.invalidate(digest)
+            self._invalid.set(digest, True)
+        else:
+            self._valid.set(digest, (client_id, time.monotonic()))
+        return client_id
+
+    def _refresh_in_background(self, app, digest: str):
+        with self._lock:
+            if digest in self._refreshing:
+                return
+            self._refreshing.add(digest)
+
+        def _refresh():
+            try:
+                self._lookup(app, digest)
+            except AuthBackendError as e:
+                # 照会に失敗した場合はキャッシュ済みの結果を ttl まで使い続ける
+                app.logger.warning(f"Failed to refresh API key verification: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(digest)
+
+        threading.Thread(target=_refresh, name="api-key-refresh", daemon=True).start()
+
+
+def get_api_key_verifier(app) -> ApiKeyVerifier:
+    """アプリごとのAPIキー検証器を返す (初回アクセス時に生成)。"""
+    verifier = app.extensions.get('api_key_verifier')
+    if verifier is None:
+        verifier = get_or_create_extension(app, 'api_key_verifier', lambda: ApiKeyVerifier(
+            ttl=app.config.get('AUTH_KEY_CACHE_TTL_SECONDS', 300),
+            negative_ttl=app.config.get('AUTH_KEY_NEGATIVE_CACHE_TTL_SECONDS', 30),
+            maxsize=app.config.get('AUTH_KEY_CACHE_MAXSIZE', 4096),
+        ))
+    return verifier
+
 
 def authenticate_request(f):
     """
-    リクエストヘッダーの 'X-Auth-Key' を検証するデコレータ。
+    リクエストヘッダーの 'X-Auth-Key' を検証するデコレータ。全ての Blueprint の認証付きエンドポイントで使う。
+    認証に成功すると g.api_client_id にクライアントID (SECRET_AUTH_KEY の場合は 'legacy') を設定する。
     """
     @functools.wraps(f) # これにより、デコレートされた関数の名前やドキュメントが保持されます。
     def decorated_function(*args, **kwargs):
         auth_key = request.headers.get('X-Auth-Key')
-        
+
         if not auth_key:
             current_app.logger.error("Authorization header missing.")
             return jsonify({"message": "Authorization header missing"}), 401
-        
-        # current_app.config['SECRET_AUTH_KEY'] は app/__init__.py で設定されています
-        # 環境変数 SECRET_AUTH_KEY の値と一致するかを検証
-        if auth_key != current_app.config.get('SECRET_AUTH_KEY'):
-            current_app.logger.warning(f"Unauthorized access attempt with key: {auth_key}")
+
+        app = current_app._get_current_object()
+        try:
+            client_id = get_api_key_verifier(app).verify(app, auth_key)
+        except AuthBackendError as e:
+            current_app.logger.error(f"API key verification is unavailable: {e}")
+            return jsonify({"message": "Authentication service unavailable"}), 503
+
+        if client_id is None:
+            # キーそのものはログに残さない (照合用にハッシュの先頭だけ出力する)
+            current_app.logger.warning(f"Unauthorized access attempt with key hash: {hash_api_key(auth_key)[:12]}")
             return jsonify({"message": "Unauthorized"}), 401
-        
+
+        g.api_client_id = client_id
         return f(*args, **kwargs)
     return decorated_function
-
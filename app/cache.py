@@ -0,0 +1,80 @@
+# app/cache.py
+
+import threading
+from cachetools import TTLCache
+
+
+class _CountingTTLCache(TTLCache):
+    """LRU追い出しとTTL失効を StatsTTLCache に通知する TTLCache。"""
+
+    def __init__(self, maxsize, ttl, owner):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._owner = owner
+
+    def popitem(self):
+        item = super().popitem()
+        self._owner.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._owner.expirations += len(expired)
+        return expired
+
+
+class StatsTTLCache:
+    """
+    サイズ上限 (LRU) と TTL を持つプロセス内キャッシュ。
+    cachetools.TTLCache をロックで保護し、ヒット/ミス/追い出し件数を記録する。
+    gunicorn のワーカーごとに独立したキャッシュになる点に注意。
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._cache = _CountingTTLCache(maxsize, ttl, self)
+
+    def get(self, key):
+        """キャッシュされた値を返す。存在しない場合は None。"""
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """キャッシュのサイズ調整用の統計情報を返す。"""
+        with self._lock:
+            # 失効済みエントリを先に掃除し、現在のサイズを正確にする
+            self._cache.expire()
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,102 @@
+# app/employees/existence.py
+
+"""
+存在が確認済みの従業員 ID の集合 (プロセス内)。
+
+イベントの書き込みでは親の従業員が存在するかを確かめる必要があるが、集合に含まれる ID は Datastore を読まずに
+存在するものとして扱い、従業員の lookup を省く。集合に無い ID だけが従来通り Datastore で確認される。
+
+- 初回の使用時にバックグラウンドスレッドを起動し、起動直後と refresh_seconds ごとに keys-only クエリ
+  (キーのみ・エンティティ本文を読まない) で全件を読み直す。リクエストのスレッドでは読み直さず、読み込み前は
+  集合が空のまま (すべての ID を Datastore で確認する) 動く。refresh_seconds が 0 以下なら読み直さない。
+- POST /employees・/employees:batch で作成した ID と、Datastore での確認で見つかった ID はその場で追加する。
+- 偽陽性があると存在しない従業員の下にイベントを書き込んでしまうため、Bloom フィルタではなく ID そのものを保持する。
+  コンソール等で削除された従業員は、次の読み直しまで存在するものとして扱われる。
+"""
+
+import threading
+import time
+from typing import Iterable
+
+from app.extensions import get_or_create_extension
+from app.schemas import EMPLOYEE
+
+EMPLOYEE_KIND = EMPLOYEE.kind
+
+
+class EmployeeIdSet:
+    def __init__(self, app, refresh_seconds: float = 600):
+        self._app = app
+        self.refresh_seconds = refresh_seconds
+        self._ids = frozenset()
+        self._added = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loaded = False
+        self._hits = 0
+        self._misses = 0
+
+    def ensure_started(self):
+        """読み直しのスレッドを起動する (起動済みなら何もしない)。読み込みの完了は待たない。"""
+        if self.refresh_seconds <= 0:
+            return
+        # スレッドは初回の使用時に起動する (gunicorn の fork 前に起動しないため)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="employee-id-refresh", daemon=True)
+                self._thread.start()
+
+    def contains(self, employee_id: str) -> bool:
+        """存在が確認済みなら True。False は「未確認」であり、存在しないことを意味しない。"""
+        found = employee_id in self._ids or employee_id in self._added
+        if found:
+            self._hits += 1
+        else:
+            self._misses += 1
+        return found
+
+    def add(self, employee_id: str):
+        with self._lock:
+            self._added.add(employee_id)
+
+    def add_many(self, employee_ids: Iterable[str]):
+        with self._lock:
+            self._added.update(employee_ids)
+
+    def stats(self):
+        return {"size": len(self._ids) + len(self._added), "loaded": self._loaded,
+                "hits": self._hits, "misses": self._misses}
+
+    def refresh(self, db_client):
+        """keys-only クエリで全件を読み直し、集合を入れ替える。"""
+        query = db_client.query(kind=EMPLOYEE_KIND)
+        query.keys_only()
+        with self._lock:
+            # 読み込み中に追加された ID は読み込み結果に含まれないことがあるため、入れ替え後も残す
+            added_before = set(self._added)
+        ids = frozenset(entity.key.name for entity in query.fetch() if entity.key.name)
+        with self._lock:
+            self._ids = ids
+            self._added -= added_before
+        self._loaded = True
+
+    def _worker(self):
+        while True:
+            db_client = getattr(self._app, 'db', None)
+            try:
+                if db_client:
+                    self.refresh(db_client)
+            except Exception as e:
+                self._app.logger.warning(f"Failed to load employee IDs: {e}")
+            time.sleep(self.refresh_seconds)
+
+
+def get_employee_id_set(app) -> EmployeeIdSet:
+    """アプリごとの EmployeeIdSet を返す (初回アクセス時に生成)。"""
+    id_set = app.extensions.get('employee_id_set')
+    if id_set is None:
+        id_set = get_or_create_extension(app, 'employee_id_set', lambda: EmployeeIdSet(
+            app,
+            refresh_seconds=app.config.get('EMPLOYEE_ID_SET_REFRESH_SECONDS', 600),
+        ))
+    return id_set
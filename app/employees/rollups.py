@@ -0,0 +1,305 @@
+# app/employees/rollups.py
+
+"""
+従業員ごとのイベント集計 (employee_event_rollup)。
+
+イベントの書き込み (リクエストの処理) では集計を更新せず、件数の差分をプロセス内の RollupBuffer に貯める。
+バックグラウンドスレッドが EVENT_ROLLUP_FLUSH_SECONDS ごとに、貯まった差分をまとめて集計エンティティに加算する。
+
+集計エンティティは従業員エンティティを親に持ち、月ごと・シャードごとに1つ (キー名 <YYYY-MM>-s<n>)。
+1つのエンティティは1か月分の件数だけを持つため、大きさは月の日数 × イベント種別数で頭打ちになる。
+同じ月への加算が1つのエンティティに集中しないよう、加算ごとに EVENT_ROLLUP_SHARDS 個のシャードからランダムに選ぶ。
+  month:  YYYY-MM
+  counts: {event_type: {YYYY-MM-DD: 件数}} (JSON, unindexed)
+  total:  その月・シャードの件数
+読み取り側は従業員の集計エンティティを ancestor クエリで読み、対象の月だけを合算する。
+このプロセスがまだ書き出していない差分も加えるため、同じワーカーへの書き込みはすぐに反映される
+(他のワーカーへの書き込みは最大 EVENT_ROLLUP_FLUSH_SECONDS 程度遅れて反映される)。
+
+日付は EVENT_ROLLUP_UTC_OFFSET_HOURS (既定 +9 = JST) の日付で数える。
+プロセスが強制終了された場合など、書き出す前の差分は失われることがある。invoke rebuild-event-rollups で数え直せる。
+"""
+
+import atexit
+import functools
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from google.api_core import exceptions as google_exceptions
+
+from app.extensions import get_or_create_extension
+from app.schemas import EMPLOYEE_EVENT_ROLLUP
+
+ROLLUP_KIND = EMPLOYEE_EVENT_ROLLUP.kind
+# トランザクションの競合 (同じシャードへの同時書き込み) 時の再試行回数
+ROLLUP_TRANSACTION_RETRIES = 3
+# 1回のトランザクションで加算する集計エンティティ数の上限
+ROLLUP_FLUSH_BATCH_SIZE = 100
+
+
+class EmployeeNotFoundError(Exception):
+    """イベントの親となる従業員が存在しない"""
+
+
+def rollup_key(db_client, employee_id, month, shard):
+    parent_key = db_client.key('employees', employee_id)
+    return db_client.key(ROLLUP_KIND, f'{month}-s{shard}', parent=parent_key)
+
+
+def event_day(timestamp, utc_offset_hours):
+    """イベントの timestamp を集計用の日付 (YYYY-MM-DD) にする。"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone(timedelta(hours=utc_offset_hours))).date().isoformat()
+
+
+def iso_week(day_str):
+    year, week, _ = date.fromisoformat(day_str).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def event_deltas(event_entities, utc_offset_hours):
+    """イベントの件数を Counter({(event_type, YYYY-MM-DD): 件数}) にする。"""
+    deltas = Counter()
+    for entity in event_entities:
+        deltas[(entity['event_type'], event_day(entity['timestamp'], utc_offset_hours))] += 1
+    return deltas
+
+
+def _empty_counts():
+    return {"total": 0, "by_type_day": {}}
+
+
+def _add_counts(counts, deltas):
+    """deltas は Counter({(event_type, day): 件数})。"""
+    for (event_type, day), n in deltas.items():
+        counts["total"] += n
+        type_days = counts["by_type_day"].setdefault(event_type, {})
+        type_days[day] = type_days.get(day, 0) + n
+    return counts
+
+
+def _deltas_by_month(deltas):
+    by_month = defaultdict(Counter)
+    for (event_type, day), n in deltas.items():
+        by_month[day[:7]][(event_type, day)] += n
+    return by_month
+
+
+def _load_type_days(entity):
+    if entity is None or not entity.get('counts'):
+        return {}
+    return json.loads(entity['counts'])
+
+
+def _build_rollup_entity(key, month, type_days, now_utc):
+    return EMPLOYEE_EVENT_ROLLUP.to_entity(key, {
+        'month': month,
+        'total': sum(n for days in type_days.values() for n in days.values()),
+        'counts': json.dumps(type_days, ensure_ascii=False, separators=(',', ':')),
+        'updated_at': now_utc,
+    })
+
+
+def _run_with_retry(fn):
+    for attempt in range(ROLLUP_TRANSACTION_RETRIES):
+        try:
+            return fn()
+        except (google_exceptions.Conflict, google_exceptions.Aborted):
+            if attempt == ROLLUP_TRANSACTION_RETRIES - 1:
+                raise
+            time.sleep(0.05 * (2 ** attempt) * (1 + random.random()))
+
+
+def _apply_deltas(db_client, updates, shards, now_utc):
+    """updates は [((employee_id, month), deltas)]。各 (従業員, 月) のランダムなシャードに1つのトランザクションで加算する。"""
+    with db_client.transaction():
+        keys = [rollup_key(db_client, employee_id, month, random.randrange(shards))
+                for (employee_id, month), _ in updates]
+        found = {entity.key: entity for entity in db_client.get_multi(keys)}
+        entities = []
+        for key, ((_, month), deltas) in zip(keys, updates):
+            type_days = _load_type_days(found.get(key))
+            for (event_type, day), n in deltas.items():
+                days = type_days.setdefault(event_type, {})
+                days[day] = days.get(day, 0) + n
+            entities.append(_build_rollup_entity(key, month, type_days, now_utc))
+        db_client.put_multi(entities)
+
+
+class RollupBuffer:
+    """
+    イベント件数の差分をプロセス内に貯め、バックグラウンドスレッドで集計エンティティに加算する (write-behind)。
+    加算に失敗した差分は貯め直して次の書き出しで再試行する。プロセスの終了時にも書き出す。
+    """
+
+    def __init__(self, app, shards: int = 4, flush_seconds: float = 5.0):
+        self._app = app
+        self.shards = shards
+        self.flush_seconds = flush_seconds
+        self._pending = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def add(self, employee_id, deltas):
+        """従業員のイベント件数の差分 (event_deltas の戻り値) を貯める。"""
+        if not deltas:
+            return
+        with self._lock:
+            self._pending[employee_id].update(deltas)
+        self._ensure_started()
+
+    def pending(self, employee_id) -> Counter:
+        """まだ書き出していない従業員の差分。"""
+        with self._lock:
+            return Counter(self._pending.get(employee_id, ()))
+
+    def flush(self) -> int:
+        """貯まっている差分を集計エンティティに加算し、加算したイベント件数を返す。失敗した差分は貯め直す。"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(Counter)
+            if not pending:
+                return 0
+            db_client = getattr(self._app, 'db', None)
+            if not db_client:
+                self._restore(pending.items())
+                return 0
+            updates = [((employee_id, month), deltas) for employee_id, employee_deltas in pending.items()
+                       for month, deltas in _deltas_by_month(employee_deltas).items()]
+            flushed = 0
+            for start in range(0, len(updates), ROLLUP_FLUSH_BATCH_SIZE):
+                batch = updates[start:start + ROLLUP_FLUSH_BATCH_SIZE]
+                try:
+                    _run_with_retry(functools.partial(_apply_deltas, db_client, batch, self.shards,
+                                                      datetime.now(timezone.utc)))
+                except Exception as e:
+                    self._app.logger.warning(f"Failed to flush {len(batch)} event rollup update(s). Retrying later: {e}")
+                    self._restore((employee_id, deltas) for (employee_id, _), deltas in batch)
+                    continue
+                flushed += sum(sum(deltas.values()) for _, deltas in batch)
+            return flushed
+
+    def _restore(self, items):
+        with self._lock:
+            for employee_id, deltas in items:
+                self._pending[employee_id].update(deltas)
+
+    def _ensure_started(self):
+        # スレッドは初回の加算時に起動する (gunicorn の fork 前に起動しないため)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="event-rollup-flush", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                self._app.logger.error(f"Unexpected error while flushing event rollups: {e}", exc_info=True)
+
+
+def get_rollup_buffer(app) -> RollupBuffer:
+    """アプリごとの RollupBuffer を返す (初回アクセス時に生成)。"""
+    buffer = app.extensions.get('event_rollup_buffer')
+    if buffer is None:
+        buffer = get_or_create_extension(app, 'event_rollup_buffer', lambda: RollupBuffer(
+            app,
+            shards=app.config.get('EVENT_ROLLUP_SHARDS', 4),
+            flush_seconds=app.config.get('EVENT_ROLLUP_FLUSH_SECONDS', 5.0),
+        ))
+    return buffer
+
+
+def read_rollup(db_client, employee_id, since_day=None, until_day=None, pending=None):
+    """
+    従業員の集計エンティティを ancestor クエリで読み、since_day <= 日付 < until_day を含む月だけを合算する。
+    pending (まだ書き出していない差分) があれば加える。従業員がいなければ EmployeeNotFoundError。
+    """
+    employee_key = db_client.key('employees', employee_id)
+    if db_client.get(employee_key) is None:
+        raise EmployeeNotFoundError(employee_id)
+
+    since_month = since_day[:7] if since_day else None
+    until_month = until_day[:7] if until_day else None
+    counts = _empty_counts()
+    for entity in db_client.query(kind=ROLLUP_KIND, ancestor=employee_key).fetch():
+        month = entity.get('month')
+        # month の無いものは全期間をシャードごとに持っていた旧形式 (rebuild-event-rollups で作り直す)
+        if not month or (since_month and month < since_month) or (until_month and month > until_month):
+            continue
+        for event_type, days in _load_type_days(entity).items():
+            type_days = counts["by_type_day"].setdefault(event_type, {})
+            for day, n in days.items():
+                type_days[day] = type_days.get(day, 0) + n
+        counts["total"] += entity.get('total') or 0
+    if pending:
+        _add_counts(counts, pending)
+    return counts
+
+
+def summarize_rollup(counts, event_type=None, since_day=None, until_day=None, granularity='day'):
+    """
+    合算した件数を絞り込んで集計結果にする。
+    event_type で種別を、since_day <= 日付 < until_day (YYYY-MM-DD) で期間を絞り込む。
+    granularity は 'day' または 'week' (ISO 週, YYYY-Www)。
+    """
+    if event_type:
+        day_counts = {event_type: counts["by_type_day"].get(event_type, {})}
+    else:
+        day_counts = counts["by_type_day"]
+
+    filtered = any((event_type, since_day, until_day))
+    by_type = Counter()
+    by_period = Counter()
+    for type_name, days in day_counts.items():
+        for day, n in days.items():
+            if (since_day and day < since_day) or (until_day and day >= until_day):
+                continue
+            by_type[type_name] += n
+            by_period[iso_week(day) if granularity == 'week' else day] += n
+
+    if not filtered:
+        # 絞り込みなしの合計は by_type_day を足し直さず集計エンティティの total をそのまま使う
+        total = counts["total"]
+    else:
+        total = sum(by_type.values())
+    return {
+        "total": total,
+        "by_type": dict(sorted(by_type.items())),
+        f"by_{granularity}": dict(sorted(by_period.items())),
+    }
+
+
+def rebuild_rollup(db_client, employee_id, utc_offset_hours, now_utc):
+    """
+    従業員の全イベントを ancestor クエリで数え直し、集計を作り直す (時差の変更後や集計の不整合時に使う)。
+    月ごとの件数をシャード0 (<YYYY-MM>-s0) に書き込み、それ以外の集計エンティティ (他のシャード・旧形式) は削除する。
+    戻り値は数え直したイベント件数。
+    数え直しの間に書き込まれたイベントは反映されないことがあるため、書き込みの少ない時間帯に実行する。
+    """
+    parent_key = db_client.key('employees', employee_id)
+    existing_query = db_client.query(kind=ROLLUP_KIND, ancestor=parent_key)
+    existing_query.keys_only()
+    existing_keys = [entity.key for entity in existing_query.fetch()]
+
+    deltas = event_deltas(db_client.query(kind='employee_event', ancestor=parent_key).fetch(), utc_offset_hours)
+    entities = []
+    for month, month_deltas in sorted(_deltas_by_month(deltas).items()):
+        type_days = _add_counts(_empty_counts(), month_deltas)["by_type_day"]
+        entities.append(_build_rollup_entity(rollup_key(db_client, employee_id, month, 0), month, type_days, now_utc))
+    if entities:
+        db_client.put_multi(entities)
+    rewritten = {entity.key for entity in entities}
+    stale_keys = [key for key in existing_keys if key not in rewritten]
+    if stale_keys:
+        db_client.delete_multi(stale_keys)
+    return sum(deltas.values())
@@ -1,34 +1,61 @@
 # app/employees/routes.py
 
-from flask import jsonify, request, current_app
-from google.cloud import datastore
-from datetime import datetime, timezone
+from flask import jsonify, request, current_app, Response, stream_with_context
+from google.cloud.datastore.query import PropertyFilter
+from google.api_core import exceptions as google_exceptions
+from datetime import date, datetime, timezone
+import io
+import itertools
 import json
 import traceback
 
 from . import employees_bp # 同じディレクトリの__init__.pyで定義したemployees_bpをインポート
+from app.cache import StatsTTLCache
 
-# 認証関数をmain Blueprintからインポート (長期的には専用モジュール推奨)
-# このインポートが循環参照エラーを起こさないか注意が必要です。
-# もしエラーになる場合は、authenticate関数を app/auth.py のような別ファイルに移動し、
-# そこから main と employees の両方でインポートするように変更します。
-try:
-    from app.main.routes import authenticate_request
-except ImportError: 
-    # 開発中の仮のフォールバック (本番では解決が必要)
-    def authenticate_request(current_request):
-        current_app.logger.error("CRITICAL: authenticate function could not be imported for employees_bp!")
-        return False # 安全のため認証失敗とする
+from app.auth import authenticate_request
+from app.idempotency import idempotent, request_body_cached
+from app.extensions import get_or_create_extension
+from app.schemas import EMPLOYEE, EMPLOYEE_EVENT
+from .existence import get_employee_id_set
+from .rollups import EmployeeNotFoundError, event_deltas, get_rollup_buffer, read_rollup, summarize_rollup
+
+# Datastore の1リクエストあたりの上限 (lookup: 1000キー, commit: 500ミューテーション)
+GET_MULTI_CHUNK_SIZE = 1000
+PUT_MULTI_CHUNK_SIZE = 500
+
+def _get_employee_cache():
+    """アプリごとの従業員読み取りキャッシュを返す (初回アクセス時に生成)。"""
+    cache = current_app.extensions.get('employee_cache')
+    if cache is None:
+        cache = get_or_create_extension(current_app, 'employee_cache', lambda: StatsTTLCache(
+            maxsize=current_app.config.get('EMPLOYEE_CACHE_MAXSIZE', 1024),
+            ttl=current_app.config.get('EMPLOYEE_CACHE_TTL_SECONDS', 300),
+        ))
+    return cache
+
+def _build_employee_entity(key, employee_data):
+    """従業員データを検証し、保存用のEntityを組み立てる。戻り値は (entity, エラーメッセージ)。"""
+    if not isinstance(employee_data, dict):
+        return None, "Employee data must be a JSON object"
+
+    entity = EMPLOYEE.to_entity(key, {
+        "name": employee_data.get("name"),
+        "email": employee_data.get("email"),
+        "role": employee_data.get("role")
+    })
+
+    if not entity.get("name") or not entity.get("email"):
+        return None, "Missing required fields: name and email"
+    return entity, None
 
 @employees_bp.route('/<string:employee_id>', methods=['POST'])
+@authenticate_request
+@idempotent
 def create_employee(employee_id):
     db_client = current_app.db
     if not db_client:
         return jsonify({"error": "Datastore client not initialized"}), 500
     
-    if not authenticate_request(request):
-        return jsonify({"error": "Unauthorized"}), 401
-    
     try:
         employee_data = request.get_json()
         if not employee_data:
@@ -41,17 +68,14 @@ def create_employee(employee_id):
         if entity:
             return jsonify({"error": f"Employee with ID {employee_id} already exists"}), 409
 
-        entity = datastore.Entity(key=key)
-        entity.update({
-            "name": employee_data.get("name"),
-            "email": employee_data.get("email"),
-            "role": employee_data.get("role")
-        })
-
-        if not entity.get("name") or not entity.get("email"):
-            return jsonify({"error": "Missing required fields: name and email"}), 400
+        entity, error = _build_employee_entity(key, employee_data)
+        if error:
+            return jsonify({"error": error}), 400
 
         db_client.put(entity)
+        # 書き込んだ内容でキャッシュを更新し、以降の GET で Datastore を読まずに済むようにする
+        _get_employee_cache().set(employee_id, dict(entity))
+        get_employee_id_set(current_app._get_current_object()).add(employee_id)
         response_data = dict(entity)
         response_data['id'] = employee_id 
         return jsonify({"message": f"Employee {employee_id} created successfully", "data": response_data}), 201
@@ -59,105 +83,516 @@ def create_employee(employee_id):
         current_app.logger.error(f"Error creating employee {employee_id}: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+def _iter_batch_records():
+    """
+    バッチリクエストのボディからレコードを1件ずつ取り出すジェネレータ。
+    Content-Type が application/x-ndjson の場合はボディを1行ずつ、それ以外は JSON 配列として扱う。
+    各要素は (index, record, エラーメッセージ)。
+    NDJSON は request.stream から1行ずつ読み、ボディ全体をメモリに載せない。ただし Idempotency-Key 付きの
+    リクエストでは idempotent がフィンガープリントのために読み切っているため、request.get_data() から読む。
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        lines = io.BytesIO(request.get_data()) if request_body_cached() else request.stream
+        index = 0
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line), None
+            except (ValueError, UnicodeDecodeError):
+                yield index, None, "Invalid JSON line"
+            index += 1
+        return
+
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        raise ValueError("Request body must be a JSON array or NDJSON stream")
+    for index, record in enumerate(records):
+        yield index, record, None
+
+def _flush_employee_chunk(db_client, chunk, results):
+    """チャンク内の有効なレコードを get_multi で存在確認し、新規分のみ put_multi で書き込む。"""
+    if not chunk:
+        return
+    keys = [entity.key for _, _, entity in chunk]
+    try:
+        existing = {entity.key for entity in db_client.get_multi(keys)}
+        new_items = [item for item in chunk if item[2].key not in existing]
+        for index, employee_id, entity in chunk:
+            if entity.key in existing:
+                results[index] = {"index": index, "id": employee_id, "status": "conflict",
+                                  "error": f"Employee with ID {employee_id} already exists"}
+        if new_items:
+            db_client.put_multi([entity for _, _, entity in new_items])
+            get_employee_id_set(current_app._get_current_object()).add_many(
+                employee_id for _, employee_id, _ in new_items)
+        for index, employee_id, entity in new_items:
+            results[index] = {"index": index, "id": employee_id, "status": "created"}
+    except Exception as e:
+        current_app.logger.error(f"Error writing employee batch chunk: {e}")
+        for index, employee_id, _ in chunk:
+            if index not in results:
+                results[index] = {"index": index, "id": employee_id, "status": "error",
+                                  "error": "An unexpected error occurred"}
+
+@authenticate_request
+@idempotent
+def batch_create_employees():
+    """
+    複数の従業員をまとめて作成するエンドポイント (POST /employees:batch)。
+    JSON配列または NDJSON ストリームを受け取り、レコードごとに created / conflict / invalid を返す。
+    存在確認と書き込みはチャンク単位の get_multi / put_multi で行うため、RPC数はレコード数に比例しない。
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+
+    results = {}
+    seen_ids = set()
+    chunk = []
+    try:
+        for index, record, parse_error in _iter_batch_records():
+            if parse_error:
+                results[index] = {"index": index, "id": None, "status": "invalid", "error": parse_error}
+                continue
+
+            employee_id = record.get("id") if isinstance(record, dict) else None
+            if not employee_id or not isinstance(employee_id, str):
+                results[index] = {"index": index, "id": employee_id, "status": "invalid",
+                                  "error": "Missing or invalid 'id' (string)"}
+                continue
+
+            entity, error = _build_employee_entity(db_client.key('employees', employee_id), record)
+            if error:
+                results[index] = {"index": index, "id": employee_id, "status": "invalid", "error": error}
+                continue
+
+            # 同一バッチ内の重複IDは2件目以降を conflict とする
+            if employee_id in seen_ids:
+                results[index] = {"index": index, "id": employee_id, "status": "conflict",
+                                  "error": f"Duplicate ID {employee_id} in batch"}
+                continue
+            seen_ids.add(employee_id)
+
+            chunk.append((index, employee_id, entity))
+            if len(chunk) >= min(GET_MULTI_CHUNK_SIZE, PUT_MULTI_CHUNK_SIZE):
+                _flush_employee_chunk(db_client, chunk, results)
+                chunk = []
+        _flush_employee_chunk(db_client, chunk, results)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ordered_results = [results[index] for index in sorted(results)]
+    counts = {"created": 0, "conflict": 0, "invalid": 0, "error": 0}
+    for result in ordered_results:
+        counts[result["status"]] += 1
+    return jsonify({"summary": counts, "results": ordered_results}), 200
+
+@employees_bp.record
+def _register_batch_routes(state):
+    # Blueprint の url_prefix 配下では '/employees/...' しか作れないため、
+    # コレクションに対するカスタムメソッド (/employees:batch) はアプリに直接登録する
+    state.app.add_url_rule('/employees:batch', endpoint=f"{state.name}.batch_create_employees",
+                           view_func=batch_create_employees, methods=['POST'])
+
 @employees_bp.route('/<string:employee_id>', methods=['GET'])
+@authenticate_request
 def get_employee(employee_id):
     db_client = current_app.db
     if not db_client:
         return jsonify({"error": "Datastore client not initialized"}), 500
 
-    if not authenticate_request(request):
-        return jsonify({"error": "Unauthorized"}), 401
-
     try:
+        cache = _get_employee_cache()
+        cached = cache.get(employee_id)
+        if cached is not None:
+            return jsonify(cached), 200
+
         kind = 'employees'
         key = db_client.key(kind, employee_id)
         entity = db_client.get(key)
         if entity:
-            return jsonify(dict(entity)), 200
+            employee = dict(entity)
+            cache.set(employee_id, employee)
+            return jsonify(employee), 200
         else:
             return jsonify({"error": "Employee not found"}), 404
     except Exception as e:
         current_app.logger.error(f"Error getting employee {employee_id}: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
-@employees_bp.route('/<string:employee_id>/events', methods=['POST']) # パスは /employees/<employee_id>/events となる
-def create_employee_event(employee_id):
-    db_client = current_app.db
-    if not db_client:
-        return jsonify({"error": "Datastore client not initialized"}), 500
-    
-    if not authenticate_request(request):
-        return jsonify({"error": "Unauthorized"}), 401
+@employees_bp.route('/cache/stats', methods=['GET'])
+@authenticate_request
+def get_employee_cache_stats():
+    """従業員読み取りキャッシュのヒット/ミス/追い出し件数を返す (キャッシュサイズ調整用)。"""
+    return jsonify(_get_employee_cache().stats()), 200
 
-    employee_key = db_client.key('employees', employee_id)
-    employee = db_client.get(employee_key)
-    if not employee:
-        return jsonify({"error": f"Employee with ID {employee_id} not found for event creation"}), 404
+# イベント一覧の1ページあたりの件数
+EVENT_LIST_DEFAULT_LIMIT = 100
+EVENT_LIST_MAX_LIMIT = 1000
 
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Invalid JSON payload for event"}), 400
-    except Exception:
-        return jsonify({"error": "Invalid JSON payload for event"}), 400
+def _parse_iso_timestamp(value):
+    """ISO 8601 文字列をUTCのdatetimeに変換する (タイムゾーンなしはUTCとみなす)。不正な形式は ValueError。"""
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+def _event_to_dict(entity, employee_id):
+    """employee_event エンティティをAPIレスポンス用の辞書に変換する。"""
+    details = entity.get('details')
+    if isinstance(details, str):
+        try:
+            details = json.loads(details)
+        except ValueError:
+            pass
+    timestamp = entity.get('timestamp')
+    created_at = entity.get('created_at')
+    updated_at = entity.get('updated_at')
+    return {
+        "event_id": str(entity.key.id_or_name), "employee_id": employee_id,
+        "timestamp": timestamp.isoformat() if timestamp else None,
+        "event_type": entity.get('event_type'),
+        "description": entity.get('description'), "details": details,
+        "created_at": created_at.isoformat() if created_at else None,
+        "updated_at": updated_at.isoformat() if updated_at else None
+    }
+
+def _parse_event_payload(data):
+    """
+    イベントのリクエストデータを検証し、保存に必要な値を取り出す。
+    戻り値は (フィールドの辞書, エラーメッセージ)。
+    """
+    if not isinstance(data, dict):
+        return None, "Invalid JSON payload for event"
 
     event_type = data.get('event_type')
     description = data.get('description')
 
     if not event_type or not isinstance(event_type, str):
-        return jsonify({"error": "Missing or invalid 'event_type' (string) for event"}), 400
+        return None, "Missing or invalid 'event_type' (string) for event"
     if not description or not isinstance(description, str):
-        return jsonify({"error": "Missing or invalid 'description' (string) for event"}), 400
-    
+        return None, "Missing or invalid 'description' (string) for event"
+
     try:
         request_timestamp_str = data.get('timestamp')
         if request_timestamp_str:
-            event_timestamp = datetime.fromisoformat(request_timestamp_str)
-            if event_timestamp.tzinfo is None:
-                event_timestamp = event_timestamp.replace(tzinfo=timezone.utc)
-            else:
-                event_timestamp = event_timestamp.astimezone(timezone.utc)
+            event_timestamp = _parse_iso_timestamp(request_timestamp_str)
         else:
             event_timestamp = datetime.now(timezone.utc)
-    except ValueError:
-        return jsonify({"error": "Invalid 'timestamp' format for event. Use ISO 8601 format."}), 400
+    except (ValueError, TypeError):
+        return None, "Invalid 'timestamp' format for event. Use ISO 8601 format."
 
     details_dict = data.get('details')
     details_str = None
     if details_dict is not None:
         if not isinstance(details_dict, dict):
-            return jsonify({"error": "'details' for event must be a JSON object (dict)"}), 400
+            return None, "'details' for event must be a JSON object (dict)"
         try:
             details_str = json.dumps(details_dict)
         except TypeError:
-            return jsonify({"error": "Failed to serialize 'details' for event to JSON string"}), 400
+            return None, "Failed to serialize 'details' for event to JSON string"
+
+    return {
+        'event_type': event_type, 'description': description,
+        'timestamp': event_timestamp, 'details': details_dict, 'details_str': details_str
+    }, None
+
+def _build_event_entity(db_client, employee_id, event_fields, now_utc):
+    """検証済みのイベントフィールドから、従業員を親に持つ employee_event エンティティを組み立てる。"""
+    parent_key = db_client.key('employees', employee_id)
+    event_key = db_client.key('employee_event', parent=parent_key)
+
+    values = {
+        'timestamp': event_fields['timestamp'], 'event_type': event_fields['event_type'],
+        'description': event_fields['description'], 'created_at': now_utc,
+        'updated_at': now_utc
+    }
+    if event_fields['details_str'] is not None:
+        values['details'] = event_fields['details_str']
+    return EMPLOYEE_EVENT.to_entity(event_key, values)
+
+@employees_bp.route('/<string:employee_id>/events', methods=['GET'])
+@authenticate_request
+def list_employee_events(employee_id):
+    """
+    従業員のイベントを ancestor クエリで取得するエンドポイント。
+    クエリパラメータ:
+      since / until: timestamp の範囲 (ISO 8601, since <= timestamp < until)
+      event_type: イベント種別で絞り込み
+      order: 'desc' (既定, 新しい順) または 'asc'
+      limit: 1ページの件数 (既定100, 最大1000)
+      cursor: 前ページのレスポンスに含まれる next_cursor
+      stream: 'true' または Accept: application/x-ndjson の場合、全件を NDJSON でストリーム返却
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+
+    args = request.args
+    stream = args.get('stream', '').lower() in ('1', 'true', 'yes') or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+    try:
+        limit = args.get('limit', type=int)
+        if limit is None and not stream:
+            limit = EVENT_LIST_DEFAULT_LIMIT
+        if limit is not None and not 1 <= limit <= EVENT_LIST_MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {EVENT_LIST_MAX_LIMIT}")
+        since = _parse_iso_timestamp(args['since']) if args.get('since') else None
+        until = _parse_iso_timestamp(args['until']) if args.get('until') else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    order = args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        return jsonify({"error": "'order' must be 'asc' or 'desc'"}), 400
+
+    parent_key = db_client.key('employees', employee_id)
+    query = db_client.query(kind='employee_event', ancestor=parent_key)
+    event_type = args.get('event_type')
+    if event_type:
+        query.add_filter(filter=PropertyFilter('event_type', '=', event_type))
+    if since:
+        query.add_filter(filter=PropertyFilter('timestamp', '>=', since))
+    if until:
+        query.add_filter(filter=PropertyFilter('timestamp', '<', until))
+    query.order = ['timestamp'] if order == 'asc' else ['-timestamp']
+
+    cursor = args.get('cursor') or None
+
+    if stream:
+        try:
+            # 不正なカーソルを 200 の送信開始後ではなく 400 で返せるよう、最初のページは応答を返す前に読む
+            pages = query.fetch(limit=limit, start_cursor=cursor).pages
+            first_page = list(next(pages, []))
+        except (ValueError, TypeError, google_exceptions.BadRequest) as e:
+            return jsonify({"error": f"Invalid cursor: {e}"}), 400
+        except Exception as e:
+            current_app.logger.error(f"Error listing employee events for {employee_id}: {e}")
+            return jsonify({"error": "An unexpected error occurred"}), 500
+
+        def generate():
+            # サーバー側のバッチ単位でページングしながら1件ずつ書き出すため、全件をメモリに保持しない
+            for page in itertools.chain([first_page], pages):
+                for entity in page:
+                    yield current_app.json.dumps(_event_to_dict(entity, employee_id)) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        iterator = query.fetch(limit=limit, start_cursor=cursor)
+        page = next(iterator.pages, [])
+        events = [_event_to_dict(entity, employee_id) for entity in page]
+        next_cursor = iterator.next_page_token
+        if isinstance(next_cursor, bytes):
+            next_cursor = next_cursor.decode('ascii')
+    except (ValueError, TypeError, google_exceptions.BadRequest) as e:
+        return jsonify({"error": f"Invalid cursor: {e}"}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error listing employee events for {employee_id}: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+    return jsonify({"events": events, "next_cursor": next_cursor}), 200
+
+@employees_bp.route('/<string:employee_id>/events/stats', methods=['GET'])
+@authenticate_request
+def get_employee_event_stats(employee_id):
+    """
+    従業員のイベント件数の集計を返すエンドポイント。月ごとの集計エンティティを読むため、イベント数に依存しない。
+    クエリパラメータ:
+      event_type: イベント種別で絞り込み
+      since / until: 日付の範囲 (YYYY-MM-DD, since <= 日付 < until)。日付は EVENT_ROLLUP_UTC_OFFSET_HOURS の日付
+      granularity: 'day' (既定) または 'week' (ISO 週)
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+
+    args = request.args
+    try:
+        since_day = date.fromisoformat(args['since']).isoformat() if args.get('since') else None
+        until_day = date.fromisoformat(args['until']).isoformat() if args.get('until') else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    granularity = args.get('granularity', 'day').lower()
+    if granularity not in ('day', 'week'):
+        return jsonify({"error": "'granularity' must be 'day' or 'week'"}), 400
+
+    try:
+        counts = read_rollup(db_client, employee_id, since_day=since_day, until_day=until_day,
+                             pending=get_rollup_buffer(current_app._get_current_object()).pending(employee_id))
+    except EmployeeNotFoundError:
+        return jsonify({"error": f"Employee with ID {employee_id} not found"}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error reading employee event stats for {employee_id}: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+    stats = summarize_rollup(counts, event_type=args.get('event_type') or None,
+                             since_day=since_day, until_day=until_day, granularity=granularity)
+    stats["employee_id"] = employee_id
+    return jsonify(stats), 200
+
+def _record_event_rollups(events_by_employee):
+    """イベント件数の差分を集計のバッファに貯める (集計エンティティへの加算はバックグラウンドで行う)。"""
+    rollups = get_rollup_buffer(current_app._get_current_object())
+    utc_offset_hours = current_app.config.get('EVENT_ROLLUP_UTC_OFFSET_HOURS', 9)
+    for employee_id, events in events_by_employee.items():
+        rollups.add(employee_id, event_deltas(events, utc_offset_hours))
+
+def _get_employee_ids():
+    """存在が確認済みの従業員 ID の集合を返す。読み直しはバックグラウンドで行い、ここでは待たない。"""
+    employee_ids = get_employee_id_set(current_app._get_current_object())
+    employee_ids.ensure_started()
+    return employee_ids
+
+def _flush_event_chunk(db_client, chunk, known_employees, results):
+    """
+    チャンク内のイベントを書き込む。親従業員の存在確認は、存在が確認済みの ID の集合に無いIDのみ get_multi でまとめて行い、
+    結果は known_employees に記録してリクエスト全体で再利用する。
+    イベントは put_multi で書き込み、集計 (employee_event_rollup) の差分はバッファに貯める。
+    """
+    if not chunk:
+        return
+    try:
+        employee_ids = _get_employee_ids()
+        for _, employee_id, _ in chunk:
+            if employee_id not in known_employees and employee_ids.contains(employee_id):
+                known_employees[employee_id] = True
+        unknown_ids = list({employee_id for _, employee_id, _ in chunk if employee_id not in known_employees})
+        for start in range(0, len(unknown_ids), GET_MULTI_CHUNK_SIZE):
+            id_slice = unknown_ids[start:start + GET_MULTI_CHUNK_SIZE]
+            found = db_client.get_multi([db_client.key('employees', employee_id) for employee_id in id_slice])
+            found_ids = {entity.key.name for entity in found}
+            employee_ids.add_many(found_ids)
+            for employee_id in id_slice:
+                known_employees[employee_id] = employee_id in found_ids
+
+        now_utc = datetime.now(timezone.utc)
+        to_write = []
+        for index, employee_id, event_fields in chunk:
+            if not known_employees[employee_id]:
+                results[index] = {"index": index, "employee_id": employee_id, "status": "not_found",
+                                  "error": f"Employee with ID {employee_id} not found for event creation"}
+                continue
+            to_write.append((index, employee_id, _build_event_entity(db_client, employee_id, event_fields, now_utc)))
+
+        if to_write:
+            events_by_employee = {}
+            for _, employee_id, entity in to_write:
+                events_by_employee.setdefault(employee_id, []).append(entity)
+            db_client.put_multi([entity for _, _, entity in to_write])
+            _record_event_rollups(events_by_employee)
+        for index, employee_id, entity in to_write:
+            results[index] = {"index": index, "employee_id": employee_id, "status": "created",
+                              "event_id": str(entity.key.id)}
+    except Exception as e:
+        current_app.logger.error(f"Error writing employee event batch chunk: {e}")
+        for index, employee_id, _ in chunk:
+            if index not in results:
+                results[index] = {"index": index, "employee_id": employee_id, "status": "error",
+                                  "error": "Internal Server Error during event creation"}
+
+@employees_bp.route('/events:batch', methods=['POST']) # パスは /employees/events:batch となる
+@authenticate_request
+@idempotent
+def batch_create_employee_events():
+    """
+    複数従業員のイベントをまとめて登録するエンドポイント。
+    NDJSON ストリーム (Content-Type: application/x-ndjson) または JSON 配列を受け取り、
+    各レコードは単体の POST /employees/<employee_id>/events と同じ項目に加えて 'employee_id' を持つ。
+    親の存在確認は従業員IDごとに1回、書き込みは put_multi のチャンク単位で行い、行ごとの結果を返す。
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+
+    results = {}
+    known_employees = {}
+    chunk = []
+    try:
+        for index, record, parse_error in _iter_batch_records():
+            if parse_error:
+                results[index] = {"index": index, "employee_id": None, "status": "invalid", "error": parse_error}
+                continue
+
+            employee_id = record.get('employee_id') if isinstance(record, dict) else None
+            if not employee_id or not isinstance(employee_id, str):
+                results[index] = {"index": index, "employee_id": employee_id, "status": "invalid",
+                                  "error": "Missing or invalid 'employee_id' (string) for event"}
+                continue
+
+            event_fields, error = _parse_event_payload(record)
+            if error:
+                results[index] = {"index": index, "employee_id": employee_id, "status": "invalid", "error": error}
+                continue
+
+            chunk.append((index, employee_id, event_fields))
+            if len(chunk) >= PUT_MULTI_CHUNK_SIZE:
+                _flush_event_chunk(db_client, chunk, known_employees, results)
+                chunk = []
+        _flush_event_chunk(db_client, chunk, known_employees, results)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ordered_results = [results[index] for index in sorted(results)]
+    counts = {"created": 0, "not_found": 0, "invalid": 0, "error": 0}
+    for result in ordered_results:
+        counts[result["status"]] += 1
+    return jsonify({"summary": counts, "results": ordered_results}), 200
+
+@employees_bp.route('/<string:employee_id>/events', methods=['POST']) # パスは /employees/<employee_id>/events となる
+@authenticate_request
+@idempotent
+def create_employee_event(employee_id):
+    """
+    従業員のイベントを登録するエンドポイント。
+    存在が確認済みの従業員 (app/employees/existence.py) は従業員を読まずにイベントを書き込み (put のみ)、
+    未確認の従業員はトランザクションを使わずに get で存在を確かめてから書き込む。
+    確認と書き込みの間に従業員が削除された場合、イベントは親の無いまま残る。
+    集計 (employee_event_rollup) の差分はバッファに貯める。
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Invalid JSON payload for event"}), 400
+    except Exception:
+        return jsonify({"error": "Invalid JSON payload for event"}), 400
+
+    event_fields, error = _parse_event_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
 
     now_utc = datetime.now(timezone.utc)
     created_at = now_utc
     updated_at = now_utc
 
     try:
-        parent_key = db_client.key('employees', employee_id)
-        event_key = db_client.key('employee_event', parent=parent_key) 
-        
-        event_entity = datastore.Entity(key=event_key)
-        event_entity.update({
-            'timestamp': event_timestamp, 'event_type': event_type,
-            'description': description, 'created_at': created_at,
-            'updated_at': updated_at
-        })
-        if details_str is not None:
-            event_entity['details'] = details_str
+        event_entity = _build_event_entity(db_client, employee_id, event_fields, now_utc)
+        # 存在が確認済みの従業員には読まずに書き込む。未確認なら lookup で確かめてから書き込む
+        # (トランザクションは使わない。確認と書き込みの間に削除された場合はイベントだけが残る)
+        employee_ids = _get_employee_ids()
+        if not employee_ids.contains(employee_id):
+            if db_client.get(db_client.key('employees', employee_id)) is None:
+                raise EmployeeNotFoundError(employee_id)
+            employee_ids.add(employee_id)
         db_client.put(event_entity)
-        
+        _record_event_rollups({employee_id: [event_entity]})
+
         generated_event_id = str(event_entity.key.id) 
         response_data = {
             "event_id": generated_event_id, "employee_id": employee_id,
-            "timestamp": event_timestamp.isoformat(), "event_type": event_type,
-            "description": description, "details": details_dict, 
+            "timestamp": event_fields['timestamp'].isoformat(), "event_type": event_fields['event_type'],
+            "description": event_fields['description'], "details": event_fields['details'], 
             "created_at": created_at.isoformat(), "updated_at": updated_at.isoformat()
         }
         return jsonify(response_data), 201
+    except EmployeeNotFoundError:
+        return jsonify({"error": f"Employee with ID {employee_id} not found for event creation"}), 404
     except Exception as e:
         current_app.logger.error(f"Error creating employee event for {employee_id}: {e}") 
         traceback.print_exc()
@@ -0,0 +1,21 @@
+# app/extensions.py
+
+import threading
+
+# ファクトリの中で別の拡張を取得する場合 (例: SummaryJobManager → metrics) があるため RLock を使う
+_lock = threading.RLock()
+
+
+def get_or_create_extension(app, name, factory):
+    """
+    app.extensions[name] を返す。無ければ factory() で生成して登録する。
+    gthread ワーカーでは初回リクエストが同時に届くことがあるため、ロックで生成を1回に限る
+    (setdefault だけでは、使われないインスタンスのスレッドプールやセッションが作られてしまう)。
+    """
+    value = app.extensions.get(name)
+    if value is None:
+        with _lock:
+            value = app.extensions.get(name)
+            if value is None:
+                value = app.extensions[name] = factory()
+    return value
@@ -0,0 +1,68 @@
+# app/genai_client.py
+
+import threading
+from contextlib import contextmanager
+
+from app.extensions import get_or_create_extension
+
+_lock = threading.Lock()
+
+
+class LLMBusyError(Exception):
+    """同時に実行できる LLM 呼び出しの上限に達し、待ち時間内に枠が空かなかった"""
+
+
+def get_genai(app):
+    """
+    google.generativeai を初回使用時にインポートし、app の GOOGLE_GEN_AI_API_KEY で configure して返す。
+    インポートだけで1秒前後かかるため、要約を使わないリクエスト (コールドスタート直後の /employees 等) では読み込まない。
+    configure はプロセスで1回だけ行い、失敗した場合は警告を出して次回の呼び出しで再試行する。
+    """
+    state = app.extensions.get('genai')
+    if state is not None:
+        return state
+    with _lock:
+        state = app.extensions.get('genai')
+        if state is not None:
+            return state
+        if app.config.get('GENAI_BACKEND') == 'stub':
+            # 負荷試験用: Gemini を呼ばずに一定の待ち時間で固定の形の応答を返す
+            from app import genai_stub
+            genai_stub.configure(latency=app.config.get('GENAI_STUB_LATENCY_SECONDS', 0.5))
+            app.logger.warning("GENAI_BACKEND=stub: using the stub Generative AI backend.")
+            app.extensions['genai'] = genai_stub
+            return genai_stub
+        import google.generativeai as genai
+
+        api_key = app.config.get('GOOGLE_GEN_AI_API_KEY')
+        if not api_key:
+            app.logger.warning("GOOGLE_GEN_AI_API_KEY is not set. Generative AI features may not work.")
+            return genai
+        try:
+            # !!! 重要: エンドポイントの指定がまだ必要です !!!
+            # 例: client_options={"api_endpoint": "us-central1-aiplatform.googleapis.com"}
+            genai.configure(api_key=api_key)
+            print("Google Generative AI configured.") # 既存のprint
+        except Exception as e:
+            print(f"Error configuring Google Generative AI: {e}")
+            app.logger.warning(f"Failed to configure Google Generative AI: {e}. Generative AI features may not work.")
+            return genai
+        app.extensions['genai'] = genai
+        return genai
+
+
+@contextmanager
+def llm_slot(app):
+    """
+    LLM 呼び出し1回分の実行枠を確保する (プロセスあたり LLM_MAX_CONCURRENCY 件まで)。
+    gthread ワーカーではスレッド数までリクエストを受け付けるため、Gemini への同時呼び出しとメモリ使用量をここで抑える。
+    LLM_QUEUE_TIMEOUT_SECONDS 以内に枠が空かない場合は LLMBusyError を送出する。
+    """
+    semaphore = get_or_create_extension(app, 'llm_semaphore', lambda: threading.BoundedSemaphore(
+        app.config.get('LLM_MAX_CONCURRENCY', 16)))
+    if not semaphore.acquire(timeout=app.config.get('LLM_QUEUE_TIMEOUT_SECONDS', 30)):
+        raise LLMBusyError("Too many concurrent LLM calls")
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,79 @@
+# app/genai_stub.py
+
+"""
+負荷試験・ローカル開発用の google.generativeai の代替 (GENAI_BACKEND=stub)。
+Gemini を呼ばずに、一定の待ち時間の後でプロンプトから機械的に作った Function Calling の応答を返す。
+app/genai_client.get_genai() が google.generativeai の代わりにこのモジュールを返す。
+"""
+
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+from app.meeting_summary.chunking import SOURCE_INDEX_PATTERN
+
+_settings = {"latency": 0.5, "stream_chunks": 4}
+
+_DATE_PATTERN = re.compile(r'\d{4}[-/年]\d{1,2}[-/月]\d{1,2}')
+
+
+class BlockedPromptException(Exception):
+    pass
+
+
+types = SimpleNamespace(BlockedPromptException=BlockedPromptException)
+
+
+def configure(latency: float = 0.5, stream_chunks: int = 4, **kwargs):
+    """応答までの待ち時間 (秒) とストリーミング時のチャンク数を設定する。api_key などの引数は無視する。"""
+    _settings["latency"] = latency
+    _settings["stream_chunks"] = max(1, stream_chunks)
+
+
+def _summary_args(prompt: str):
+    indices = sorted({int(match.group(2)) for match in SOURCE_INDEX_PATTERN.finditer(prompt)})
+    date_match = _DATE_PATTERN.search(prompt)
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+    return {
+        "meeting_date": date_match.group(0) if date_match else "",
+        "employee_name": ["Stub Employee"],
+        "purpose": "Load test",
+        "decisions": [{
+            "item": f"Stub decision {digest}",
+            "discussion_summary": "Generated by the stub LLM backend.",
+            "source_utterance_indices": indices[:3],
+        }],
+        "overall_summary": f"Stub summary of {len(prompt)} characters.",
+        "action_items": [{"action": f"Follow up {digest}", "assignee": "Stub Employee", "due_date": ""}],
+    }
+
+
+def _response(prompt: str):
+    part = SimpleNamespace(function_call=SimpleNamespace(args=_summary_args(prompt)), text='')
+    candidate = SimpleNamespace(finish_reason=None, safety_ratings=[], content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(candidates=[candidate])
+
+
+class _StreamingResponse:
+    def __init__(self, prompt: str):
+        self._response = _response(prompt)
+        self.candidates = self._response.candidates
+
+    def __iter__(self):
+        delay = _settings["latency"] / _settings["stream_chunks"]
+        for _ in range(_settings["stream_chunks"]):
+            time.sleep(delay)
+            yield self._response
+
+
+class GenerativeModel:
+    def __init__(self, model_name: str, tools=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        if stream:
+            return _StreamingResponse(prompt)
+        time.sleep(_settings["latency"])
+        return _response(prompt)
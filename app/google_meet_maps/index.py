@@ -0,0 +1,151 @@
+# app/google_meet_maps/index.py
+
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from google.cloud.datastore.query import PropertyFilter
+from app.extensions import get_or_create_extension
+
+MAPPING_KIND = "google_meet_employee_map"
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_meet_name(name: str) -> str:
+    """表示名の照合用キー (NFKC正規化・大文字小文字無視・空白の統一)"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', name)).strip().casefold()
+
+
+class GoogleMeetMappingIndex:
+    """
+    email ⇔ Google Meet 表示名 の双方向インデックス (プロセス内)。
+    初回に1回のクエリで全件を読み込み、以降は refresh_seconds ごとに updated_at 以降の差分だけを取り込む。
+    書き込み時は apply() で即座に反映する。full_reload_seconds ごとに全件を読み直し、
+    コンソール等での削除も取り込む。マッピングが変わるたびに version が増える。
+
+    差分の基準 (_last_sync) は Datastore から読んだ updated_at の最大値だけで進める。
+    このプロセスの書き込み (apply) で進めると、それより前の時刻で他のワーカーがコミットした書き込みを取りこぼす。
+    さらに、時刻のずれやコミットの遅れに備えて sync_overlap_seconds だけ遡って読む (再適用しても結果は変わらない)。
+    """
+
+    def __init__(self, refresh_seconds: float = 60, full_reload_seconds: float = 3600,
+                 sync_overlap_seconds: float = 30):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.sync_overlap_seconds = sync_overlap_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._email_to_name: Dict[str, str] = {}
+        self._name_to_emails: Dict[str, List[str]] = {}
+        self._last_sync: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_load = 0.0
+        self._loaded = False
+
+    def ensure_fresh(self, db_client):
+        """必要であれば Datastore から全件または差分を読み込む。他のスレッドが更新中の場合は待たない (初回を除く)。"""
+        now = time.monotonic()
+        if self._loaded and now - self._last_refresh < self.refresh_seconds:
+            return
+        if not self._refresh_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            now = time.monotonic()
+            if not self._loaded or now - self._last_full_load >= self.full_reload_seconds:
+                self._full_load(db_client)
+            elif now - self._last_refresh >= self.refresh_seconds:
+                self._incremental_load(db_client)
+        finally:
+            self._refresh_lock.release()
+
+    def apply(self, email: str, google_meet_name: str):
+        """1件のマッピングを反映する (書き込み時・差分読み込み時)。差分の基準 (_last_sync) は進めない"""
+        with self._lock:
+            self._apply_locked(email, google_meet_name)
+            self.version += 1
+
+    def lookup_email(self, email: str) -> Optional[str]:
+        """email から Google Meet 表示名を返す"""
+        return self._email_to_name.get(email)
+
+    def lookup_name(self, google_meet_name: str) -> List[str]:
+        """Google Meet 表示名 (正規化して照合) から email のリストを返す"""
+        return list(self._name_to_emails.get(normalize_meet_name(google_meet_name), ()))
+
+    def snapshot(self) -> Dict[str, str]:
+        """email → 表示名 の全件のコピーを返す"""
+        with self._lock:
+            return dict(self._email_to_name)
+
+    def _apply_locked(self, email: str, google_meet_name: str):
+        previous = self._email_to_name.get(email)
+        if previous is not None:
+            previous_key = normalize_meet_name(previous)
+            emails = [e for e in self._name_to_emails.get(previous_key, ()) if e != email]
+            if emails:
+                self._name_to_emails[previous_key] = emails
+            else:
+                self._name_to_emails.pop(previous_key, None)
+        self._email_to_name[email] = google_meet_name
+        key = normalize_meet_name(google_meet_name)
+        self._name_to_emails[key] = self._name_to_emails.get(key, []) + [email]
+
+    def _full_load(self, db_client):
+        email_to_name, name_to_emails, last_sync = {}, {}, None
+        for entity in db_client.query(kind=MAPPING_KIND).fetch():
+            email = entity.get("email") or entity.key.name
+            google_meet_name = entity.get("google_meet_name")
+            if not email or not google_meet_name:
+                continue
+            email_to_name[email] = google_meet_name
+            name_to_emails.setdefault(normalize_meet_name(google_meet_name), []).append(email)
+            updated_at = entity.get("updated_at")
+            if updated_at and (last_sync is None or updated_at > last_sync):
+                last_sync = updated_at
+        with self._lock:
+            self._email_to_name = email_to_name
+            self._name_to_emails = name_to_emails
+            self._last_sync = last_sync
+            self.version += 1
+        self._loaded = True
+        self._last_full_load = self._last_refresh = time.monotonic()
+
+    def _incremental_load(self, db_client):
+        if self._last_sync is None:
+            # updated_at を持つエンティティが無い場合は差分を取れないため全件を読み直す
+            self._full_load(db_client)
+            return
+        query = db_client.query(kind=MAPPING_KIND)
+        # 同じ時刻の書き込みと、基準より前の時刻で遅れてコミットされた書き込みを取りこぼさないよう、
+        # sync_overlap_seconds だけ遡って >= で取得する (再適用しても結果は変わらない)
+        since = self._last_sync - timedelta(seconds=self.sync_overlap_seconds)
+        query.add_filter(filter=PropertyFilter("updated_at", ">=", since))
+        last_sync = self._last_sync
+        for entity in query.fetch():
+            email = entity.get("email") or entity.key.name
+            google_meet_name = entity.get("google_meet_name")
+            if email and google_meet_name and self._email_to_name.get(email) != google_meet_name:
+                self.apply(email, google_meet_name)
+            updated_at = entity.get("updated_at")
+            if updated_at and updated_at > last_sync:
+                last_sync = updated_at
+        with self._lock:
+            self._last_sync = last_sync
+        self._last_refresh = time.monotonic()
+
+
+def get_mapping_index(app) -> GoogleMeetMappingIndex:
+    """アプリごとのマッピングインデックスを返す (初回アクセス時に生成)。"""
+    index = app.extensions.get('google_meet_mapping_index')
+    if index is None:
+        index = get_or_create_extension(app, 'google_meet_mapping_index', lambda: GoogleMeetMappingIndex(
+            refresh_seconds=app.config.get('GOOGLE_MEET_MAP_REFRESH_SECONDS', 60),
+            full_reload_seconds=app.config.get('GOOGLE_MEET_MAP_FULL_RELOAD_SECONDS', 3600),
+            sync_overlap_seconds=app.config.get('GOOGLE_MEET_MAP_SYNC_OVERLAP_SECONDS', 30),
+        ))
+    return index
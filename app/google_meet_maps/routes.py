@@ -1,19 +1,26 @@
 # app/google_meet_maps/routes.py
-from flask import request, jsonify # Blueprintもこちらでインポート
-from google.cloud import datastore
+from flask import request, jsonify, current_app # Blueprintもこちらでインポート
+from datetime import datetime, timezone
 import logging
 from flask import Blueprint # routes.pyでBlueprintを定義する場合
 
-# from app.auth import authenticate_request # 必要に応じて
+from .index import get_mapping_index, MAPPING_KIND
+
+from app.auth import authenticate_request
+from app.idempotency import idempotent
+from app.schemas import GOOGLE_MEET_EMPLOYEE_MAP
 
 google_meet_map_bp = Blueprint('google_meet_map', __name__, url_prefix='/google_meet_employee_map')
 
 @google_meet_map_bp.route('/<path:email>', methods=['POST'])
-# @authenticate_request
+@authenticate_request
+@idempotent
 def add_or_update_google_meet_mapping(email):
-    # (前回の回答に記載した実装内容)
-    client = datastore.Client()
-    kind = "google_meet_employee_map"
+    # create_app で生成した共有クライアントを使う (リクエストごとに認証・gRPCチャネルを作らない)
+    client = current_app.db
+    if not client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+    kind = MAPPING_KIND
     key = client.key(kind, email)
 
     data = request.get_json()
@@ -24,14 +31,16 @@ def add_or_update_google_meet_mapping(email):
     if not isinstance(google_meet_name, str) or not google_meet_name.strip():
         return jsonify({"error": "'google_meet_name' は空でない文字列である必要があります"}), 400
 
-    entity = datastore.Entity(key=key)
-    entity.update({
+    updated_at = datetime.now(timezone.utc)
+    entity = GOOGLE_MEET_EMPLOYEE_MAP.to_entity(key, {
         "email": email,
-        "google_meet_name": google_meet_name.strip()
+        "google_meet_name": google_meet_name.strip(),
+        "updated_at": updated_at # インデックスの差分読み込みに使用
     })
 
     try:
         client.put(entity)
+        get_mapping_index(current_app).apply(email, google_meet_name.strip())
         logging.info(f"Google Meetマッピングを保存しました: {email} -> {google_meet_name.strip()}")
         response_data = {
             "message": "Google Meetマッピングが正常に保存されました",
@@ -41,4 +50,46 @@ def add_or_update_google_meet_mapping(email):
         return jsonify(response_data), 200 # または201
     except Exception as e:
         logging.error(f"Datastoreへの保存中にエラーが発生しました (email: {email}): {e}")
-        return jsonify({"error": f"マッピングの保存に失敗しました: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"マッピングの保存に失敗しました: {str(e)}"}), 500
+
+@google_meet_map_bp.route('/<path:email>', methods=['GET'])
+@authenticate_request
+def get_google_meet_mapping(email):
+    """email から Google Meet 表示名を返す (プロセス内インデックスから応答)"""
+    client = current_app.db
+    if not client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+    index = get_mapping_index(current_app)
+    try:
+        index.ensure_fresh(client)
+    except Exception as e:
+        logging.error(f"Google Meetマッピングの読み込みに失敗しました: {e}")
+        return jsonify({"error": f"マッピングの読み込みに失敗しました: {str(e)}"}), 500
+
+    google_meet_name = index.lookup_email(email)
+    if google_meet_name is None:
+        return jsonify({"error": f"{email} のマッピングが見つかりません"}), 404
+    return jsonify({"email": email, "google_meet_name": google_meet_name}), 200
+
+@google_meet_map_bp.route('', methods=['GET'])
+@authenticate_request
+def find_google_meet_mapping_by_name():
+    """Google Meet 表示名 (?google_meet_name=...) から email を返す (表示名は大文字小文字・空白の違いを無視して照合)"""
+    google_meet_name = request.args.get('google_meet_name', '')
+    if not google_meet_name.strip():
+        return jsonify({"error": "クエリパラメータ 'google_meet_name' が必要です"}), 400
+
+    client = current_app.db
+    if not client:
+        return jsonify({"error": "Datastore client not initialized"}), 500
+    index = get_mapping_index(current_app)
+    try:
+        index.ensure_fresh(client)
+    except Exception as e:
+        logging.error(f"Google Meetマッピングの読み込みに失敗しました: {e}")
+        return jsonify({"error": f"マッピングの読み込みに失敗しました: {str(e)}"}), 500
+
+    emails = index.lookup_name(google_meet_name)
+    if not emails:
+        return jsonify({"error": f"'{google_meet_name}' のマッピングが見つかりません"}), 404
+    return jsonify({"google_meet_name": google_meet_name.strip(), "emails": emails}), 200
@@ -0,0 +1,285 @@
+# app/idempotency.py
+
+"""
+POST エンドポイントの Idempotency-Key 対応。
+
+クライアントが `Idempotency-Key: <任意の文字列>` を付けて送った POST は、最初のレスポンスを保存し、
+同じキーでの再送 (タイムアウト後のリトライなど) には処理を実行せずに保存したレスポンスを返す
+(レスポンスヘッダー `Idempotent-Replayed: true`)。
+
+- キーはクライアント (g.api_client_id)・メソッド・パスごとに分かれる。同じキーで本文が異なる再送は 422。
+- 保存先はプロセス内のキャッシュと Datastore (IDEMPOTENCY_KIND, expires_at を過ぎたものは使わない)。
+  Datastore には TTL ポリシー (expires_at) を設定しておくと期限切れのエンティティが自動で削除される。
+- 同じキーのリクエストが同時に届いた場合、後から来たものは先行するリクエストの完了を待って
+  そのレスポンスを返す (別インスタンスで実行中の場合は Datastore をポーリングして待つ)。
+  IDEMPOTENCY_WAIT_SECONDS 以内に終わらなければ 409 を返す。
+- 5xx とストリーミングのレスポンスは保存せず、再送で改めて実行できるようにする。
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from flask import current_app, g, jsonify, make_response, request
+from google.api_core import exceptions as google_exceptions
+
+from app.cache import StatsTTLCache
+from app.extensions import get_or_create_extension
+from app.schemas import IDEMPOTENCY_RECORD
+
+IDEMPOTENCY_KIND = IDEMPOTENCY_RECORD.kind
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# 保存したレスポンスを再現するときに返すヘッダー
+_REPLAYED_HEADERS = ('Content-Type', 'Location')
+# Datastore のエンティティの上限 (1 MiB) に収まらないレスポンスはプロセス内にのみ保存する
+_MAX_PERSISTED_BODY_BYTES = 900 * 1024
+
+_IN_PROGRESS = 'in_progress'
+_COMPLETED = 'completed'
+
+
+@dataclass(slots=True)
+class StoredResponse:
+    status_code: int
+    body: bytes
+    headers: List[Tuple[str, str]]
+    fingerprint: str
+
+    def to_response(self):
+        response = current_app.response_class(self.body, status=self.status_code, headers=self.headers)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """Idempotency-Key ごとの処理状態とレスポンスの保存先 (プロセス内キャッシュ → Datastore)。"""
+
+    def __init__(self, app, ttl: float = 86400, maxsize: int = 1024, wait_seconds: float = 60,
+                 lock_seconds: float = 300):
+        self._app = app
+        self._ttl = ttl
+        self._memory = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._wait_seconds = wait_seconds
+        # 実行中の印がこの秒数を過ぎても完了しない場合は、実行したインスタンスが落ちたとみなして引き継ぐ
+        self._lock_seconds = lock_seconds
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # Datastore で実行中の印を付けられたキー (付けていないキーの印は他のインスタンスのものなので消さない)
+        self._claimed = set()
+
+    def acquire(self, key: str):
+        """
+        保存済みのレスポンスがあれば StoredResponse を返す。
+        無ければこのリクエストが実行権を得て None を返す (complete / release を必ず呼ぶ)。
+        他のリクエストが実行中で待ちきれなかった場合は TimeoutError。
+        """
+        deadline = time.monotonic() + self._wait_seconds
+        while True:
+            stored = self._memory.get(key)
+            if stored is not None:
+                return stored
+
+            with self._lock:
+                flight = self._in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._in_flight[key] = _InFlight()
+            if not leader:
+                # 同じプロセスで実行中: 完了を待ってからキャッシュを見直す (失敗して解放された場合は実行権を取り直す)
+                if not flight.done.wait(max(0, deadline - time.monotonic())):
+                    raise TimeoutError(key)
+                continue
+
+            try:
+                stored = self._claim_persistent(key, deadline)
+            except BaseException:
+                self._finish(key)
+                raise
+            if stored is not None:
+                self._memory.set(key, stored)
+                self._finish(key)
+            return stored
+
+    def complete(self, key: str, stored: StoredResponse):
+        try:
+            self._memory.set(key, stored)
+            self._write(key, stored, claimed=self._pop_claim(key))
+        finally:
+            self._finish(key)
+
+    def release(self, key: str):
+        """レスポンスを保存せずに実行権を手放す (5xx・例外・ストリーミングの場合)。"""
+        try:
+            db_client = self._db()
+            if self._pop_claim(key) and db_client is not None:
+                db_client.delete(db_client.key(IDEMPOTENCY_KIND, key))
+        except Exception as e:
+            self._app.logger.warning(f"Failed to release idempotency key {key[:12]}: {e}")
+        finally:
+            self._finish(key)
+
+    def stats(self):
+        return self._memory.stats()
+
+    def _finish(self, key: str):
+        with self._lock:
+            flight = self._in_flight.pop(key, None)
+        if flight is not None:
+            flight.done.set()
+
+    def _pop_claim(self, key: str) -> bool:
+        with self._lock:
+            if key in self._claimed:
+                self._claimed.discard(key)
+                return True
+            return False
+
+    def _db(self):
+        return getattr(self._app, 'db', None)
+
+    def _claim_persistent(self, key: str, deadline: float) -> Optional[StoredResponse]:
+        """Datastore で実行中の印を付ける。他のインスタンスが実行中であれば完了を待つ。"""
+        db_client = self._db()
+        if not db_client:
+            return None
+        delay = 0.2
+        while True:
+            try:
+                stored, claimed = self._claim_once(db_client, key)
+            except (google_exceptions.Conflict, google_exceptions.Aborted):
+                # 別のインスタンスが同時に実行中の印を付けた: 少し待って読み直す
+                stored, claimed = None, False
+            except Exception as e:
+                # Datastore が使えない場合はプロセス内の保護だけで処理を続ける
+                self._app.logger.warning(f"Idempotency store is unavailable, continuing without it: {e}")
+                return None
+            if claimed:
+                with self._lock:
+                    self._claimed.add(key)
+            if stored is not None or claimed:
+                return stored
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(key)
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    def _claim_once(self, db_client, key: str):
+        now = datetime.now(timezone.utc)
+        with db_client.transaction():
+            entity = db_client.get(db_client.key(IDEMPOTENCY_KIND, key))
+            if entity is not None and entity.get('expires_at') and entity['expires_at'] > now:
+                if entity.get('state') == _COMPLETED:
+                    return _from_entity(entity), False
+                locked_at = entity.get('locked_at')
+                if locked_at and locked_at > now - timedelta(seconds=self._lock_seconds):
+                    return None, False
+            db_client.put(IDEMPOTENCY_RECORD.to_entity(db_client.key(IDEMPOTENCY_KIND, key), {
+                'state': _IN_PROGRESS, 'locked_at': now, 'created_at': now,
+                'expires_at': now + timedelta(seconds=self._ttl),
+            }))
+        return None, True
+
+    def _write(self, key: str, stored: StoredResponse, claimed: bool):
+        db_client = self._db()
+        if not db_client:
+            return
+        if len(stored.body) > _MAX_PERSISTED_BODY_BYTES:
+            # 大きすぎるレスポンスは Datastore に書けないため、実行中の印を消してプロセス内にだけ残す
+            if claimed:
+                try:
+                    db_client.delete(db_client.key(IDEMPOTENCY_KIND, key))
+                except Exception as e:
+                    self._app.logger.warning(f"Failed to release idempotency key {key[:12]}: {e}")
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            db_client.put(IDEMPOTENCY_RECORD.to_entity(db_client.key(IDEMPOTENCY_KIND, key), {
+                'state': _COMPLETED, 'status_code': stored.status_code, 'body': stored.body,
+                'headers': [f"{name}: {value}" for name, value in stored.headers],
+                'fingerprint': stored.fingerprint, 'created_at': now,
+                'expires_at': now + timedelta(seconds=self._ttl),
+            }))
+        except Exception as e:
+            self._app.logger.warning(f"Failed to persist idempotent response {key[:12]}: {e}")
+
+
+def _from_entity(entity) -> StoredResponse:
+    headers = [tuple(header.split(': ', 1)) for header in entity.get('headers') or ()]
+    return StoredResponse(status_code=entity['status_code'], body=entity.get('body') or b'',
+                          headers=headers, fingerprint=entity.get('fingerprint') or '')
+
+
+def get_idempotency_store(app) -> IdempotencyStore:
+    """アプリごとの IdempotencyStore を返す (初回アクセス時に生成)。"""
+    store = app.extensions.get('idempotency')
+    if store is None:
+        store = get_or_create_extension(app, 'idempotency', lambda: IdempotencyStore(
+            app,
+            ttl=app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400),
+            maxsize=app.config.get('IDEMPOTENCY_CACHE_MAXSIZE', 1024),
+            wait_seconds=app.config.get('IDEMPOTENCY_WAIT_SECONDS', 60),
+            lock_seconds=app.config.get('IDEMPOTENCY_LOCK_SECONDS', 300),
+        ))
+    return store
+
+
+def request_body_cached() -> bool:
+    """idempotent がフィンガープリントのためにボディを読み切ったか (True なら request.stream は空で、request.get_data() から読む)。"""
+    return g.get('idempotency_body_cached', False)
+
+
+def idempotent(f):
+    """
+    Idempotency-Key ヘッダーに対応させるデコレータ。@authenticate_request の内側 (下) に付ける。
+    ヘッダーが無いリクエストはそのまま実行する。
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return f(*args, **kwargs)
+        if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return jsonify({"message": f"'{IDEMPOTENCY_HEADER}' must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters"}), 400
+
+        client_id = getattr(g, 'api_client_id', None) or ''
+        key = hashlib.sha256(
+            f"{client_id}\n{request.method}\n{request.path}\n{idempotency_key}".encode('utf-8')).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data(cache=True)).hexdigest()
+        g.idempotency_body_cached = True
+
+        store = get_idempotency_store(current_app._get_current_object())
+        try:
+            stored = store.acquire(key)
+        except TimeoutError:
+            return jsonify({"message": "A request with the same Idempotency-Key is still in progress"}), 409, \
+                {"Retry-After": "5"}
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return jsonify({"message": "Idempotency-Key was already used with a different request body"}), 422
+            return stored.to_response()
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except BaseException:
+            store.release(key)
+            raise
+        if response.is_streamed or response.status_code >= 500:
+            store.release(key)
+            return response
+        store.complete(key, StoredResponse(
+            status_code=response.status_code, body=response.get_data(),
+            headers=[(name, response.headers[name]) for name in _REPLAYED_HEADERS if name in response.headers],
+            fingerprint=fingerprint,
+        ))
+        return response
+    return decorated_function
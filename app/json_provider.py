@@ -0,0 +1,84 @@
+# app/json_provider.py
+
+"""
+Flask の JSON プロバイダ (app.json)。jsonify・request.get_json・app.json.dumps は全てここを通る。
+
+- dataclass (MeetingSummary など) は asdict() で再帰的にコピーせず、フィールドをそのままエンコーダに渡す。
+- datetime / date は ISO 8601 文字列、Datastore の Entity は dict、Key はパスのリスト ([kind, id_or_name, ...]) にする。
+- orjson がインストールされていれば orjson でエンコード/デコードする (標準の json より数倍速い)。
+  orjson が無い環境や、indent などの引数を指定した dumps は標準の json を使う。
+- 出力は JSON_COMPACT (既定: デバッグ時以外はコンパクト) で切り替える。非 ASCII 文字はエスケープせず UTF-8 で出力し、
+  キーの並び替えも行わない。
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson は任意
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+    # google.cloud.datastore.Key (インポートせずに判定する)
+    if hasattr(o, 'flat_path') and hasattr(o, 'kind'):
+        return list(o.flat_path)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    if isinstance(o, bytes):
+        return o.decode('utf-8', errors='replace')
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None
+
+    def _indent(self) -> bool:
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def _orjson_dumps(self, obj, indent=False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs) -> str:
+        # 標準の json 固有の引数 (indent, cls など) が指定された場合は標準の json を使う
+        if self.use_orjson and not kwargs:
+            return self._orjson_dumps(obj).decode('utf-8')
+        if 'indent' not in kwargs:
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # bytes のまま Response に渡し、str へのデコードと再エンコードを省く
+        return self._app.response_class(self._orjson_dumps(obj, indent=self._indent()) + b"\n",
+                                        mimetype=self.mimetype)
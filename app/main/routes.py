@@ -1,9 +1,11 @@
 # app/main/routes.py
 
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, Response
 # 認証デコレータを app/auth.py からインポート
 from app.auth import authenticate_request 
+from app.idempotency import idempotent
 # main_bp は app/main/__init__.py で定義されていると仮定し、そこからインポート
+from app.metrics import render_app_metrics
 from . import main_bp 
 
 
@@ -16,6 +18,7 @@ def hello_world():
 
 @main_bp.route('/data', methods=['POST'])
 @authenticate_request # authenticate_request デコレータを適用
+@idempotent
 def handle_post_data():
     """
     認証付きデータ受信エンドポイント。
@@ -29,3 +32,31 @@ def handle_post_data():
     # authenticate_request デコレータが認証処理を行うため、ここでは認証ロジックは不要
     return jsonify({"message": "Data received successfully (Authenticated)"}), 200
 
+
+@main_bp.route('/_startup/profile', methods=['GET'])
+@authenticate_request
+def get_startup_profile():
+    """
+    create_app() のフェーズごと・モジュールごとの所要時間と、
+    遅延初期化の対象 (Datastoreクライアント, Generative AI) が初期化済みかどうかを返す。
+    """
+    app = current_app._get_current_object()
+    profile = app.extensions.get('startup_profile')
+    if profile is None:
+        return jsonify({"message": "Startup profile is not available"}), 404
+    report = profile.report()
+    report["lazy_initialized"] = {
+        "datastore_client": getattr(app, 'db_initialized', True),
+        "genai": 'genai' in app.extensions,
+    }
+    return jsonify(report), 200
+
+@main_bp.route('/metrics', methods=['GET'])
+@authenticate_request
+def get_metrics():
+    """
+    ルートごとのレイテンシ・ステータス・本文サイズ、Datastore / LLM 呼び出しの回数と所要時間、
+    キャッシュの統計を Prometheus のテキスト形式で返す (METRICS_DIR 指定時は全ワーカーの合算)。
+    """
+    body = render_app_metrics(current_app._get_current_object())
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
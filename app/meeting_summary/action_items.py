@@ -0,0 +1,68 @@
+# app/meeting_summary/action_items.py
+
+"""
+アクションアイテムの索引 (action_items)。
+
+要約 (1on1_summaries) を保存するとき、各 ActionItem を要約のキーを親に持つ個別のエンティティとしても書き込む。
+担当者・期限・状態はインデックスされるため、「X さんの今週期限のもの」のような検索は
+要約の履歴全体ではなく該当するアクションアイテムの件数だけのコストで行える (複合インデックスは index.yaml)。
+
+キー名は要約内での順番 (0, 1, ...) のため、同じ要約を書き直しても重複しない。
+"""
+
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from app.meeting_summary.models import MeetingSummary
+from app.schemas import ACTION_ITEM
+
+ACTION_ITEM_KIND = ACTION_ITEM.kind
+ACTION_ITEM_STATUSES = ('open', 'done')
+
+_DATE_PATTERN = re.compile(r'(\d{4})\s*[-/年.]\s*(\d{1,2})\s*[-/月.]\s*(\d{1,2})')
+
+
+def normalize_due_date(value) -> Optional[str]:
+    """期限の文字列 (2025-06-01 / 2025/6/1 / 2025年6月1日 / ISO 8601 の日時) を YYYY-MM-DD にする。読めなければ None。"""
+    if not value or not isinstance(value, str):
+        return None
+    match = _DATE_PATTERN.search(value)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3))).isoformat()
+    except ValueError:
+        return None
+
+
+def build_action_item_entities(db_client, summary_key, summary: MeetingSummary, now_utc) -> List:
+    """要約のアクションアイテムを、要約のキーを親に持つ action_items のエンティティにする。"""
+    entities = []
+    for index, item in enumerate(summary.action_items):
+        key = db_client.key(ACTION_ITEM_KIND, str(index), parent=summary_key)
+        entities.append(ACTION_ITEM.to_entity(key, {
+            'meeting_id': summary_key.name,
+            'action': item.action,
+            'assignee': (item.assignee or '').strip(),
+            'due_date': normalize_due_date(item.due_date),
+            'due_date_text': item.due_date,
+            'status': 'open',
+            'created_at': now_utc,
+            'updated_at': now_utc,
+        }))
+    return entities
+
+
+def action_item_to_dict(entity) -> Dict:
+    return {
+        "meeting_id": entity.get('meeting_id') or entity.key.parent.name,
+        "index": int(entity.key.name),
+        "action": entity.get('action'),
+        "assignee": entity.get('assignee'),
+        "due_date": entity.get('due_date'),
+        "due_date_text": entity.get('due_date_text'),
+        "status": entity.get('status'),
+        "created_at": entity.get('created_at'),
+        "updated_at": entity.get('updated_at'),
+    }
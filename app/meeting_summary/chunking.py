@@ -0,0 +1,145 @@
+# app/meeting_summary/chunking.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.meeting_summary.models import MeetingSummary, Decision, ActionItem
+
+# 文字起こし中の発言マーカー (例: "source_index: 12", '"source_index": 12', "source_index=12")
+SOURCE_INDEX_PATTERN = re.compile(r'(source_index["\']?\s*[:=]\s*["\']?)(\d+)')
+
+
+@dataclass
+class TranscriptChunk:
+    """長い文字起こしを分割した1チャンク。source_indices[i] がチャンク内のローカル番号 i に対応する元の source_index。"""
+    text: str
+    source_indices: List[int] = field(default_factory=list)
+
+
+def split_utterances(transcript_content: str) -> Tuple[str, List[str]]:
+    """
+    文字起こしを (ヘッダー, 発言のリスト) に分割する。
+    source_index マーカーを含む行を発言の開始とみなし、最初のマーカーより前の行 (会議名・日時・参加者など) をヘッダーとする。
+    マーカーが無い文字起こしは空行以外の各行を1発言として扱う。
+    """
+    lines = transcript_content.replace('\r\n', '\n').split('\n')
+    if not any(SOURCE_INDEX_PATTERN.search(line) for line in lines):
+        return '', [line for line in lines if line.strip()]
+
+    header_lines, utterances, current = [], [], None
+    for line in lines:
+        if SOURCE_INDEX_PATTERN.search(line):
+            if current is not None:
+                utterances.append('\n'.join(current))
+            current = [line]
+        elif current is None:
+            header_lines.append(line)
+        else:
+            current.append(line)
+    if current is not None:
+        utterances.append('\n'.join(current))
+    return '\n'.join(header_lines).strip(), utterances
+
+
+def build_chunks(transcript_content: str, max_chars: int) -> List[TranscriptChunk]:
+    """
+    発言の境界で文字起こしを max_chars 程度のチャンクに分割する。
+    各チャンクの source_index はチャンク内で 0 から振り直し (remap_indices で元に戻す)、ヘッダーは全チャンクの先頭に付ける。
+    """
+    header, utterances = split_utterances(transcript_content)
+    if len(header) > max_chars // 4:
+        # ヘッダーが大きすぎる場合は通常の発言として扱う
+        utterances.insert(0, header)
+        header = ''
+
+    budget = max(1, max_chars - len(header))
+    groups, current, current_len = [], [], 0
+    for utterance in utterances:
+        if current and current_len + len(utterance) + 1 > budget:
+            groups.append(current)
+            current, current_len = [], 0
+        current.append(utterance)
+        current_len += len(utterance) + 1
+    if current:
+        groups.append(current)
+
+    chunks = []
+    for group in groups:
+        source_indices: List[int] = []
+        local_of: Dict[int, int] = {}
+
+        def _to_local(match):
+            global_index = int(match.group(2))
+            if global_index not in local_of:
+                local_of[global_index] = len(source_indices)
+                source_indices.append(global_index)
+            return f"{match.group(1)}{local_of[global_index]}"
+
+        body = '\n'.join(SOURCE_INDEX_PATTERN.sub(_to_local, utterance) for utterance in group)
+        text = f"{header}\n{body}" if header else body
+        chunks.append(TranscriptChunk(text=text, source_indices=source_indices))
+    return chunks
+
+
+def remap_indices(indices: Optional[List], chunk: TranscriptChunk) -> List[int]:
+    """チャンク内のローカルな source_index を元の番号に戻す。範囲外の番号は捨てる。"""
+    if not chunk.source_indices:
+        return list(indices or [])
+    remapped = []
+    for index in indices or []:
+        try:
+            local = int(index)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= local < len(chunk.source_indices):
+            remapped.append(chunk.source_indices[local])
+    return remapped
+
+
+def merge_summaries(parts: List[Tuple[MeetingSummary, TranscriptChunk]]) -> MeetingSummary:
+    """チャンクごとの要約を1つの MeetingSummary にまとめる (決定事項・アクションは重複を除いて連結)。"""
+    employee_names, decisions, action_items, overall = [], [], [], []
+    decisions_by_item, seen_actions = {}, set()
+    purpose = ''
+    meeting_date = ''
+
+    for summary, chunk in parts:
+        meeting_date = meeting_date or summary.meeting_date
+        purpose = purpose or summary.purpose
+        names = summary.employee_name if isinstance(summary.employee_name, list) else [summary.employee_name]
+        for name in names:
+            if name and name not in employee_names:
+                employee_names.append(name)
+        for decision in summary.decisions:
+            indices = remap_indices(decision.source_utterance_indices, chunk)
+            merged = decisions_by_item.get(decision.item)
+            if merged is not None:
+                # 複数チャンクに跨る同じ決定事項は、関連発言の番号をまとめる
+                merged.source_utterance_indices.extend(i for i in indices if i not in merged.source_utterance_indices)
+                continue
+            merged = Decision(
+                item=decision.item,
+                discussion_summary=decision.discussion_summary,
+                source_utterance_indices=indices,
+            )
+            decisions_by_item[decision.item] = merged
+            decisions.append(merged)
+        for action_item in summary.action_items:
+            action_key = (action_item.action, action_item.assignee)
+            if action_key in seen_actions:
+                continue
+            seen_actions.add(action_key)
+            action_items.append(ActionItem(
+                action=action_item.action, assignee=action_item.assignee, due_date=action_item.due_date))
+        if summary.overall_summary:
+            overall.append(summary.overall_summary)
+
+    return MeetingSummary(
+        meeting_date=meeting_date,
+        employee_name=employee_names,
+        purpose=purpose,
+        decisions=decisions,
+        action_items=action_items,
+        overall_summary='\n\n'.join(overall),
+    )
@@ -0,0 +1,110 @@
+# app/meeting_summary/jobs.py
+
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from app.cache import StatsTTLCache
+from app.schemas import MEETING_SUMMARY_JOB
+
+JOB_KIND = 'meeting_summary_jobs'
+
+
+class SummaryJobManager:
+    """
+    議事録要約をバックグラウンドで実行するジョブマネージャ。
+    ワーカー数と待ち行列の長さに上限を持ち、上限を超えた投入は拒否する。
+    ジョブの状態はプロセス内に保持し、Datastore が使える場合は JOB_KIND にも書き込むため、
+    別のワーカー/インスタンスに届いたポーリングにも応答できる。
+    """
+
+    def __init__(self, app, max_workers: int = 2, max_pending: int = 16, ttl: int = 3600):
+        self._app = app
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='meeting-summary-job')
+        # 実行中 + 待機中のジョブ数の上限
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._jobs = StatsTTLCache(maxsize=max(1024, (max_workers + max_pending) * 8), ttl=ttl)
+
+    def submit(self, func: Callable, *args) -> Optional[Dict]:
+        """
+        func(*args) をジョブとして投入する。func は (レスポンス本文, ステータスコード) を返す。
+        待ち行列が満杯の場合は None を返す。
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+
+        now = datetime.now(timezone.utc).isoformat()
+        job = {"job_id": uuid.uuid4().hex, "status": "queued", "created_at": now, "updated_at": now,
+               "http_status": None, "result": None}
+        self._store(job)
+        try:
+            self._executor.submit(self._run, job["job_id"], func, args)
+        except Exception:
+            self._slots.release()
+            raise
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ジョブの状態を返す。プロセス内に無ければ Datastore を参照する。"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+        return self._load(job_id)
+
+    def _run(self, job_id: str, func: Callable, args):
+        try:
+            with self._app.app_context():
+                self._update(job_id, status="running")
+                try:
+                    body, status_code = func(*args)
+                except Exception as e:
+                    self._app.logger.error(f"Meeting summary job {job_id} failed: {e}", exc_info=True)
+                    body, status_code = {"message": f"Internal server error: {str(e)}"}, 500
+                self._update(job_id, status="succeeded" if status_code < 400 else "failed",
+                             http_status=status_code, result=body)
+        finally:
+            self._slots.release()
+
+    def _update(self, job_id: str, **changes):
+        job = self._jobs.get(job_id) or self._load(job_id) or {"job_id": job_id}
+        job = dict(job, **changes)
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        self._store(job)
+
+    def _store(self, job: Dict):
+        self._jobs.set(job["job_id"], job)
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            return
+        try:
+            entity = MEETING_SUMMARY_JOB.to_entity(db_client.key(JOB_KIND, job["job_id"]), {
+                "status": job["status"], "created_at": job["created_at"], "updated_at": job["updated_at"],
+                "http_status": job["http_status"],
+                "result": self._app.json.dumps(job["result"]) if job["result"] is not None else None,
+            })
+            db_client.put(entity)
+        except Exception as e:
+            # 永続化に失敗してもプロセス内の状態でポーリングには応答できるため、ジョブ自体は継続する
+            self._app.logger.warning(f"Failed to persist meeting summary job {job['job_id']}: {e}")
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            return None
+        try:
+            entity = db_client.get(db_client.key(JOB_KIND, job_id))
+        except Exception as e:
+            self._app.logger.warning(f"Failed to load meeting summary job {job_id}: {e}")
+            return None
+        if not entity:
+            return None
+        result = entity.get("result")
+        return {
+            "job_id": job_id, "status": entity.get("status"),
+            "created_at": entity.get("created_at"), "updated_at": entity.get("updated_at"),
+            "http_status": entity.get("http_status"),
+            "result": json.loads(result) if result else None,
+        }
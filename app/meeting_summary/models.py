@@ -1,23 +1,72 @@
 # app/meeting_summary/models.py
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+"""
+会議の要約のモデル。
 
-@dataclass
-class Decision:
+- 大量の要約を読み込んでもメモリを食わないよう、各クラスは __slots__ 付きの dataclass にしている。
+- フィールド名の一覧はクラス定義時に1度だけ求めておき (_FIELDS)、辞書・エンティティとの変換はその表を引くだけで行う
+  (dataclasses.asdict のような再帰的なコピーや、要素ごとの __annotations__ の参照はしない)。
+- to_entity / from_entity は Datastore のエンティティ (決定事項・アクションアイテムは埋め込みエンティティ) との変換。
+  インデックスするプロパティは app/schemas.py の MEETING_SUMMARY に従う。
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Mapping, Optional
+
+from google.cloud import datastore
+
+from app.schemas import MEETING_SUMMARY
+
+
+def _field_table(cls):
+    """クラスのフィールド名のタプル (変換時に毎回 dataclasses.fields() を呼ばないよう、定義時に求める)"""
+    cls._FIELDS = tuple(f.name for f in fields(cls))
+    return cls
+
+
+def _embedded_entity(values: Dict[str, Any]) -> datastore.Entity:
+    # 埋め込みエンティティのプロパティはクエリに使わないため、全てインデックスしない
+    entity = datastore.Entity(exclude_from_indexes=tuple(values))
+    entity.update(values)
+    return entity
+
+
+class _Record:
+    """フィールド表 (_FIELDS) を使った辞書・埋め込みエンティティとの変換 (Decision / ActionItem 共通)"""
+    __slots__ = ()
+
+    @classmethod
+    def from_mapping(cls, data: Mapping):
+        """辞書または埋め込みエンティティから復元する。未知のキーは無視し、欠けたフィールドは既定値にする。"""
+        return cls(**{name: data[name] for name in cls._FIELDS if name in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._FIELDS}
+
+    def to_entity(self) -> datastore.Entity:
+        return _embedded_entity(self.to_dict())
+
+    from_entity = from_mapping
+
+
+@_field_table
+@dataclass(slots=True)
+class Decision(_Record):
     """会議で合意または方向性が示された決定事項を表すクラス。"""
     item: str # 決定事項の具体的な内容
-    discussion_summary: str # その決定事項に至るまでの議論の要約
+    discussion_summary: str = '' # その決定事項に至るまでの議論の要約
     source_utterance_indices: Optional[List[int]] = field(default_factory=list) # 関連する発言の source_index
 
-@dataclass
-class ActionItem:
+@_field_table
+@dataclass(slots=True)
+class ActionItem(_Record):
     """会議で決まった次のアクションを表すクラス。"""
     action: str # 具体的なアクション内容
-    assignee: str # 担当者
+    assignee: str = '' # 担当者
     due_date: Optional[str] = None # 期限 (ISO 8601形式の文字列を想定)
 
-@dataclass
+@_field_table
+@dataclass(slots=True)
 class MeetingSummary:
     """会議の要約全体を表すクラス。普遍的な1on1ミーティングの結果をシンプルに表現。"""
     meeting_date: str # 会議日時 (例: "2025-05-22 17:28 JST" or "2025-05-22T17:28:00+09:00")
@@ -25,4 +74,44 @@ class MeetingSummary:
     purpose: str # 会議の目的
     decisions: List[Decision] # 主要な決定事項のリスト
     action_items: List[ActionItem] # アクションアイテムのリスト
-    overall_summary: str # 会議全体の主要な議論や結論の簡潔なまとめ
\ No newline at end of file
+    overall_summary: str # 会議全体の主要な議論や結論の簡潔なまとめ
+    employee_ids: List[Optional[str]] = field(default_factory=list) # employee_name に対応する従業員ID (見つからない場合は None)
+    speakers: List[Dict] = field(default_factory=list) # 文字起こしに登場した既知の話者 (name, email, employee_id, mentions)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "MeetingSummary":
+        """to_dict() で辞書化した MeetingSummary (または 1on1_summaries のエンティティ) を復元する。"""
+        return cls(
+            meeting_date=data.get('meeting_date', ''),
+            employee_name=data.get('employee_name') or [],
+            purpose=data.get('purpose', ''),
+            decisions=[Decision.from_mapping(d) for d in data.get('decisions') or ()],
+            action_items=[ActionItem.from_mapping(a) for a in data.get('action_items') or ()],
+            overall_summary=data.get('overall_summary', ''),
+            employee_ids=data.get('employee_ids') or [],
+            speakers=[dict(s) for s in data.get('speakers') or ()],
+        )
+
+    # 埋め込みエンティティも辞書として読めるため、復元は from_dict と同じ
+    from_entity = from_dict
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON 化できる辞書にする (決定事項・アクションアイテムだけを辞書にし、それ以外の値はコピーしない)。"""
+        data = {name: getattr(self, name) for name in self._FIELDS}
+        data['decisions'] = [d.to_dict() for d in self.decisions]
+        data['action_items'] = [a.to_dict() for a in self.action_items]
+        return data
+
+    def to_entity(self, key, extra: Optional[Dict[str, Any]] = None) -> datastore.Entity:
+        """
+        1on1_summaries のエンティティにする。決定事項・アクションアイテム・話者は埋め込みエンティティになる。
+        extra には createdAt などのモデル外のプロパティを渡す。
+        """
+        values = {name: getattr(self, name) for name in self._FIELDS}
+        values['employee_name'] = self.employee_name if isinstance(self.employee_name, list) else [self.employee_name]
+        values['decisions'] = [d.to_entity() for d in self.decisions]
+        values['action_items'] = [a.to_entity() for a in self.action_items]
+        values['speakers'] = [_embedded_entity(s) for s in self.speakers]
+        if extra:
+            values.update(extra)
+        return MEETING_SUMMARY.to_entity(key, values, coerce=False)
@@ -0,0 +1,176 @@
+# app/meeting_summary/preprocessing.py
+
+"""
+要約の前に文字起こしを整形・圧縮する前処理と、入力トークン数の見積もり。
+
+Google Meet の文字起こしには、タイムスタンプだけの行・フィラー (えー, あのー など)・同じ話者の連続する発言ごとの
+話者名・余分な空白が含まれ、そのまま Gemini に送るとトークン数 (= 待ち時間と費用) が増える。
+ここで要約に不要な部分を取り除いてから送る。source_index の発言マーカーと、日時を含むヘッダー行は残す。
+
+手順 (TRANSCRIPT_PREPROCESSING でカンマ区切りに指定, 空にすると前処理しない):
+  whitespace: Unicode NFC・改行の統一・空白の圧縮・空行の削除
+  timestamps: タイムスタンプだけの行 (00:12:34) と行頭のタイムスタンプ ([00:12:34]) の削除
+  fillers:    フィラーの削除 (句読点・空白が続くものだけ)
+  speakers:   同じ話者の連続する発言の結合 (2行目以降の「話者名:」を省く。source_index を含む行は結合しない)
+
+fingerprint は手順の組み合わせと PREPROCESSING_VERSION から求め、要約キャッシュのキーに含める
+(前処理を変えたときに古い要約を返さないため)。
+"""
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from app.meeting_summary.chunking import SOURCE_INDEX_PATTERN
+
+# 前処理の内容を変更したら上げる (要約キャッシュのキーに含まれる)
+PREPROCESSING_VERSION = '1'
+PREPROCESSING_STEPS = ('whitespace', 'timestamps', 'fillers', 'speakers')
+
+_HORIZONTAL_WHITESPACE = re.compile(r'[ \t　]+')
+_TIMESTAMP_LINE = re.compile(r'^\[?\(?\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?\)?\]?$')
+_LEADING_TIMESTAMP = re.compile(r'^[\[(]\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?[\])]\s*')
+# 直後に句読点・空白・行末が続く場合だけフィラーとみなす (「あの人」「まあまあ」などは残す)
+_FILLERS = re.compile(
+    r'(?:^|(?<=[\s、。,.!?！？「」:：]))'
+    r'(?:えーっと|えーと|えっと|ええと|えー+|あのー+|あの|うーん|うーむ|んー+|まあ|なんか|そのー+|'
+    r'[Uu]h+m?|[Uu]m+|[Ee]r+m?)'
+    r'(?:[、,…]+\s*|\s+|$)'
+)
+# 行頭の「話者名: 」(時刻の 17:28 のようにコロンの後が数字のものは話者名とみなさない)
+_SPEAKER_PREFIX = re.compile(r'^(?P<speaker>[^:：\n]{1,40})[:：](?!\d)\s*(?P<text>.*)$')
+
+# トークン数の見積もり: ASCII はおよそ 4 文字で 1 トークン、日本語などの非 ASCII 文字はおよそ 1 文字 1 トークン
+_ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    入力トークン数の概算 (count_tokens の RPC を呼ばずに見積もる)。
+    日本語はほぼ 1 文字 1 トークンになるため多めに見積もる側に倒している。
+    """
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return (len(text) - ascii_chars) + (ascii_chars + _ASCII_CHARS_PER_TOKEN - 1) // _ASCII_CHARS_PER_TOKEN
+
+
+def parse_steps(value: Optional[str]) -> Tuple[str, ...]:
+    """TRANSCRIPT_PREPROCESSING の値 (カンマ区切り) を手順のタプルにする。未知の手順は ValueError。"""
+    steps = tuple(step.strip().lower() for step in (value or '').split(',') if step.strip())
+    unknown = [step for step in steps if step not in PREPROCESSING_STEPS]
+    if unknown:
+        raise ValueError(f"Unknown transcript preprocessing steps: {', '.join(unknown)}")
+    # 適用順は PREPROCESSING_STEPS の順に固定する
+    return tuple(step for step in PREPROCESSING_STEPS if step in steps)
+
+
+def preprocessing_fingerprint(steps: Iterable[str]) -> str:
+    steps = tuple(steps)
+    if not steps:
+        return 'raw'
+    return hashlib.sha256(f"{PREPROCESSING_VERSION}:{','.join(steps)}".encode('utf-8')).hexdigest()[:12]
+
+
+@dataclass(slots=True)
+class PreparedTranscript:
+    """前処理後の文字起こしと、圧縮の前後の文字数・見積もりトークン数。"""
+    text: str
+    original_chars: int
+    original_tokens: int
+    estimated_tokens: int
+    fingerprint: str
+
+    @property
+    def processed_chars(self) -> int:
+        return len(self.text)
+
+    @property
+    def compression_ratio(self) -> float:
+        """前処理後の見積もりトークン数 / 前処理前 (1.0 未満ほど削減できている)"""
+        return self.estimated_tokens / self.original_tokens if self.original_tokens else 1.0
+
+    def to_dict(self):
+        return {
+            "original_chars": self.original_chars, "processed_chars": self.processed_chars,
+            "original_tokens": self.original_tokens, "estimated_tokens": self.estimated_tokens,
+            "compression_ratio": round(self.compression_ratio, 3), "fingerprint": self.fingerprint,
+        }
+
+
+def _normalize_whitespace(lines: List[str]) -> List[str]:
+    stripped = (_HORIZONTAL_WHITESPACE.sub(' ', line).strip() for line in lines)
+    return [line for line in stripped if line]
+
+
+def _remove_timestamps(lines: List[str]) -> List[str]:
+    result = []
+    for line in lines:
+        if _TIMESTAMP_LINE.match(line.strip()):
+            continue
+        result.append(_LEADING_TIMESTAMP.sub('', line))
+    return result
+
+
+def _remove_fillers(lines: List[str]) -> List[str]:
+    result = []
+    for line in lines:
+        cleaned = _FILLERS.sub('', line).rstrip()
+        if not cleaned:
+            continue
+        # フィラーだけの発言 (「話者名:」だけが残った行) は捨てる。source_index を含む行は番号を参照されるため残す
+        match = _SPEAKER_PREFIX.match(cleaned)
+        if match is not None and not match.group('text') and not SOURCE_INDEX_PATTERN.search(cleaned):
+            continue
+        result.append(cleaned)
+    return result
+
+
+def _merge_speaker_turns(lines: List[str]) -> List[str]:
+    result = []
+    previous_speaker = None
+    for line in lines:
+        if SOURCE_INDEX_PATTERN.search(line):
+            result.append(line)
+            previous_speaker = None
+            continue
+        match = _SPEAKER_PREFIX.match(line)
+        if match is None:
+            result.append(line)
+            continue
+        speaker, text = match.group('speaker').strip(), match.group('text')
+        if speaker == previous_speaker and result and text:
+            result[-1] = f"{result[-1]} {text}"
+            continue
+        result.append(line)
+        previous_speaker = speaker
+    return result
+
+
+_STEP_FUNCTIONS = {
+    'timestamps': _remove_timestamps,
+    'fillers': _remove_fillers,
+    'speakers': _merge_speaker_turns,
+}
+
+
+def preprocess_transcript(transcript_content: str, steps: Iterable[str] = PREPROCESSING_STEPS) -> PreparedTranscript:
+    """文字起こしに前処理の手順を適用し、見積もりトークン数と合わせて返す。steps が空の場合はそのまま返す。"""
+    steps = tuple(steps)
+    original_tokens = estimate_tokens(transcript_content)
+    if not steps:
+        return PreparedTranscript(text=transcript_content, original_chars=len(transcript_content),
+                                  original_tokens=original_tokens, estimated_tokens=original_tokens,
+                                  fingerprint=preprocessing_fingerprint(steps))
+
+    text = unicodedata.normalize('NFC', transcript_content) if 'whitespace' in steps else transcript_content
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if 'whitespace' in steps:
+        lines = _normalize_whitespace(lines)
+    for step in steps:
+        step_function = _STEP_FUNCTIONS.get(step)
+        if step_function is not None:
+            lines = step_function(lines)
+    text = '\n'.join(lines)
+    return PreparedTranscript(text=text, original_chars=len(transcript_content), original_tokens=original_tokens,
+                              estimated_tokens=estimate_tokens(text), fingerprint=preprocessing_fingerprint(steps))
@@ -0,0 +1,77 @@
+# app/meeting_summary/progress.py
+
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# 受信側が終了 (finish) を確かめる間隔 (秒)
+_FINISH_POLL_SECONDS = 0.1
+
+
+class ProgressChannel:
+    """
+    要約ジョブ (送信側) から SSE の応答 (受信側) へ進捗イベントを渡す、上限付きのキュー。
+    受信側が put_timeout 秒のうちに受け取らず上限 (maxsize) を超えたイベントは捨て、件数を dropped に記録する。
+    接続が切れたら受信側が close() し、以降のイベントは捨てる (ジョブは続き、結果は GET /jobs/<job_id> で取得できる)。
+    最後の結果 (set_result) はキューに入れずに保持し、受信側がキューを読み切った後に受け取るため捨てない。
+    """
+
+    def __init__(self, maxsize: int = 64, put_timeout: float = 1.0):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._put_timeout = put_timeout
+        self._closed = threading.Event()
+        self._finished = threading.Event()
+        self.result: Optional[Tuple[str, Dict]] = None
+        self.dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def publish(self, event: str, data: Dict):
+        """送信側: イベントを追加する。close() 済み、または受信側が追いつかない場合は捨てる。"""
+        if self._closed.is_set():
+            return
+        try:
+            self._queue.put((event, data), timeout=self._put_timeout)
+        except queue.Full:
+            self.dropped += 1
+
+    def set_result(self, event: str, data: Dict):
+        """送信側: 最後の結果を設定する。キューが一杯でも捨てず、受信側は get() が None を返した後に result を読む。"""
+        self.result = (event, data)
+
+    def finish(self):
+        """送信側: これ以上イベントが無いことを通知する。"""
+        self._finished.set()
+        if self._closed.is_set():
+            return
+        try:
+            self._queue.put(None, timeout=self._put_timeout)
+        except queue.Full:
+            # 終了の印が入らなくても、受信側はキューを読み切った時点で _finished を見て終了する
+            pass
+
+    def get(self, timeout: float) -> Optional[Tuple[str, Dict]]:
+        """受信側: 次のイベントを返す。終了していれば None、timeout 秒以内に届かなければ queue.Empty。"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._finished.is_set() and self._queue.empty():
+                return None
+            # 終了の印がキューに入らなかった場合も早く終われるよう、_finished を短い間隔で確かめながら待つ
+            remaining = deadline - time.monotonic()
+            try:
+                return self._queue.get(timeout=max(0.0, min(remaining, _FINISH_POLL_SECONDS)))
+            except queue.Empty:
+                if remaining <= _FINISH_POLL_SECONDS:
+                    raise
+
+    def close(self):
+        """受信側: 受け取りをやめ、溜まっているイベントを捨てる。"""
+        self._closed.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
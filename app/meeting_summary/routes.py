@@ -1,23 +1,36 @@
 # app/meeting_summary/routes.py
 
+import functools
+import itertools
 import os
-import requests
+import logging
 import json
-from datetime import datetime, timezone
-from typing import List, Dict
-from dataclasses import asdict
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+from typing import List, Dict, Optional, Callable
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for, Response, stream_with_context
 from app.auth import authenticate_request 
-import google.generativeai as genai
-import google.generativeai.types as genai_types
-from google.cloud import datastore 
-from datetime import datetime, timezone 
-import json
-from typing import List, Dict, Optional 
-from dataclasses import asdict 
+from app.idempotency import idempotent
 
 from app.meeting_summary.models import MeetingSummary, Decision, ActionItem
+from app.meeting_summary.jobs import SummaryJobManager
+from app.meeting_summary.progress import ProgressChannel
+from app.meeting_summary.slack import SlackDispatcher, SLACK_POST_MESSAGE_URL
+from app.meeting_summary.summary_cache import SummaryCache, summary_cache_key
+from app.meeting_summary.chunking import build_chunks, merge_summaries
+from app.meeting_summary.preprocessing import PreparedTranscript, parse_steps, preprocess_transcript
+from app.meeting_summary.action_items import (ACTION_ITEM_KIND, ACTION_ITEM_STATUSES, action_item_to_dict,
+                                              build_action_item_entities)
+from app.meeting_summary.speakers import get_speaker_resolver
+from app.genai_client import get_genai, llm_slot, LLMBusyError
+from app.metrics import RATIO_BUCKETS, TOKEN_BUCKETS, get_registry, track_call
+from app.extensions import get_or_create_extension
+from app.schemas import MEETING_SUMMARY, SchemaError, timestamp as parse_timestamp
+from google.cloud.datastore.query import PropertyFilter
+from google.api_core import exceptions as google_exceptions
 
 # Blueprintの定義
 bp = Blueprint('meeting_summary', __name__) 
@@ -55,37 +68,32 @@ def _format_summary_for_slack(summary: MeetingSummary) -> str:
     return text.strip()
 
 
-def _post_summary_to_slack(summary: MeetingSummary):
-    """整形された議事録サマリーをSlackに投稿する"""
-    slack_token = os.getenv('SLACK_TOKEN')
-    slack_channel = os.getenv('SLACK_CHANNEL')
-
-    if not slack_token or not slack_channel:
+def _get_slack_dispatcher() -> Optional[SlackDispatcher]:
+    """アプリごとのSlackディスパッチャを返す。SLACK_TOKEN / SLACK_CHANNEL が未設定の場合は None。"""
+    dispatcher = current_app.extensions.get('slack_dispatcher')
+    if dispatcher is None:
+        slack_token = os.getenv('SLACK_TOKEN')
+        slack_channel = os.getenv('SLACK_CHANNEL')
+        if not slack_token or not slack_channel:
+            return None
+        config = current_app.config
+        dispatcher = get_or_create_extension(current_app, 'slack_dispatcher', lambda: SlackDispatcher(
+            current_app._get_current_object(), slack_token, slack_channel,
+            api_url=config.get('SLACK_API_URL', SLACK_POST_MESSAGE_URL),
+            max_queue=config.get('SLACK_QUEUE_SIZE', 100),
+            max_retries=config.get('SLACK_MAX_RETRIES', 5),
+            timeout=config.get('SLACK_TIMEOUT_SECONDS', 10.0),
+        ))
+    return dispatcher
+
+def _post_summary_to_slack(summary: MeetingSummary) -> bool:
+    """整形された議事録サマリーをSlackの送信キューに追加する (送信はバックグラウンドで行う)。キューに入れられたら True"""
+    dispatcher = _get_slack_dispatcher()
+    if dispatcher is None:
         current_app.logger.warning("SLACK_TOKEN or SLACK_CHANNEL is not set. Skipping Slack post.")
-        return
+        return False
 
-    message_text = _format_summary_for_slack(summary)
-    
-    headers = {
-        "Authorization": f"Bearer {slack_token}",
-        "Content-Type": "application/json; charset=utf-8"
-    }
-    payload = {
-        "channel": slack_channel,
-        "text": message_text,
-        "unfurl_links": False, # リンクのプレビューを無効化
-    }
-    
-    try:
-        response = requests.post("https://slack.com/api/chat.postMessage", headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        response_data = response.json()
-        if response_data.get("ok"):
-            current_app.logger.info(f"Successfully posted summary to Slack channel {slack_channel}")
-        else:
-            current_app.logger.error(f"Slack API error: {response_data.get('error')}")
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Failed to post message to Slack: {e}")
+    return dispatcher.enqueue(_format_summary_for_slack(summary))
 
 # --- Function Calling用のツール関数の定義 ---
 def create_meeting_summary_tool_function(
@@ -122,14 +130,419 @@ def _to_plain_python_types(obj):
     else:
         return obj
 
+class SummarizationError(Exception):
+    """要約処理の失敗。HTTPレスポンスとして返す本文とステータスコードを保持する。"""
+
+    def __init__(self, body: Dict, status_code: int = 500):
+        super().__init__(body.get("message"))
+        self.body = body
+        self.status_code = status_code
+
+SUMMARY_MODEL_NAME = 'gemini-2.0-flash'
+# LLM の同時実行数が上限に達した場合に返す Retry-After (秒)
+LLM_BUSY_RETRY_AFTER_SECONDS = 15
+# プロンプトや抽出ロジックを変更したら上げる (要約キャッシュのキーに含まれる)
+SUMMARY_PROMPT_VERSION = '1'
+
+def _build_summary_prompt(transcript_content: str, part: Optional[tuple] = None) -> str:
+    """要約用のプロンプトを組み立てる。part=(k, n) の場合は長い文字起こしを分割した k/n 番目として指示する"""
+    part_note = ""
+    if part:
+        part_note = (f"\n    ※ これは長い会議の文字起こしを分割した一部 ({part[0]}/{part[1]}) です。"
+                     "この部分に含まれる内容だけを要約し、`source_index` はこの部分に記載された番号で答えてください。\n")
+    return f"""
+    以下の1on1会議の文字起こしデータから、指定された形式で情報を抽出し、要約してください。
+    出力は`create_meeting_summary_tool_function`関数を呼び出す形式で出力してください。
+{part_note}
+    ---
+    会議の文字起こしデータ:
+    {transcript_content}
+    ---
+
+    抽出・要約する項目は以下の通りです。
+    1.  **会議日時**: 文字起こしファイル名または内容から正確な日時を抽出してください。フォーマットは"YYYY-MM-DD HH:MM JST"または"YYYY-MM-DDTHH:MM:SS+09:00"のように、可能な限りISO 8601に近い形でお願いします。
+    2.  **社員名**: このミーティングの参加者の名前を厳密に抽出してください。**森口裕之は上司なので除外してください。**
+    3.  **会議の目的**: 会議の目的を具体的に要約してください。
+    4.  **決定事項**: 会議で合意された、あるいは方向性が示された主要な決定事項をリストアップしてください。各決定事項について、内容、そしてその決定に至るまでの議論の要約を含めてください。関連する発言の`source_index`（のxの値）があれば整数値のリストで含めてください。
+       **決定事項の各項目は、`item` (内容)、`discussion_summary` (議論の要約)、`source_utterance_indices` (関連インデックス) のキーを持つ辞書として記述してください。**
+    5.  **全体要約**: 会議全体の主要なポイント、結論、方向性、および主要な議論の要約を簡潔にまとめてください。
+    6.  **アクションアイテム**: 会議で決まった具体的な次のアクションをリストアップしてください。担当者も明確にしてください。期限があれば"YYYY-MM-DD"形式で記載してください。
+       **アクションアイテムの各項目は、`action` (内容)、`assignee` (担当者)、`due_date` (期限) のキーを持つ辞書として記述してください。**
+
+    """
+
+def _summary_from_function_call_args(function_call_args_plain: Dict) -> MeetingSummary:
+    """Function Callingの引数 (プレーンな辞書) から MeetingSummary を組み立てる"""
+    decisions_raw = function_call_args_plain.get('decisions', [])
+    decisions = []
+    for d_item in decisions_raw:
+        decisions.append(Decision(
+            item=d_item.get('item') or d_item.get('content', ''),
+            discussion_summary=d_item.get('discussion_summary', ''),
+            source_utterance_indices=d_item.get('source_utterance_indices', []),
+        ))
+
+    action_items_raw = function_call_args_plain.get('action_items', [])
+    action_items = []
+    for a_item in action_items_raw:
+        action_items.append(ActionItem.from_mapping(a_item))
+
+    return MeetingSummary(
+        meeting_date=datetime.now(timezone.utc).strftime('%Y-%m-%d %Z')  , #　本日日付を文字列に変換
+        employee_name=function_call_args_plain.get('employee_name', ''), # ★変更
+        purpose=function_call_args_plain.get('purpose', ''),
+        decisions=decisions,
+        overall_summary=function_call_args_plain.get('overall_summary', ''),
+        action_items=action_items,
+    )
+
+# 進捗通知のコールバック (イベント名, データ)。SSE エンドポイントで使用する
+ProgressCallback = Callable[[str, Dict], None]
+
+# LLM の Function Calling の引数から作る要約の項目 (SSE の section イベントの name)
+LLM_SUMMARY_SECTIONS = ('meeting_date', 'employee_name', 'purpose', 'decisions', 'action_items', 'overall_summary')
+SUMMARY_SECTIONS = ('meeting_date', 'employee_name', 'employee_ids', 'speakers', 'purpose',
+                    'decisions', 'action_items', 'overall_summary')
+
+def _notify(progress: Optional[ProgressCallback], event: str, data: Optional[Dict] = None):
+    if progress is not None:
+        progress(event, data or {})
+
+class _SectionProgress:
+    """progress を包み、送信済みの section を記録して同じ値の section を二度送らないようにする"""
+
+    def __init__(self, progress: ProgressCallback):
+        self._progress = progress
+        self._sent = {}
+
+    def __call__(self, event: str, data: Dict):
+        if event == "section":
+            encoded = current_app.json.dumps(data["value"])
+            if self._sent.get(data["name"]) == encoded:
+                return
+            self._sent[data["name"]] = encoded
+        self._progress(event, data)
+
+def _function_call_args(response) -> Optional[Dict]:
+    """ストリーミングの1チャンクに Function Calling の引数が含まれていれば、プレーンな辞書で返す"""
+    for candidate in getattr(response, 'candidates', None) or []:
+        content = getattr(candidate, 'content', None)
+        for part in getattr(content, 'parts', None) or []:
+            function_call = getattr(part, 'function_call', None)
+            if function_call and function_call.args:
+                return _to_plain_python_types(function_call.args)
+    return None
+
+def _generate_meeting_summary(transcript_content: str, part: Optional[tuple] = None,
+                              progress: Optional[ProgressCallback] = None) -> MeetingSummary:
+    """
+    Google Generative AIのFunction Callingで議事録を要約し、MeetingSummary を返す。
+    要約できなかった場合は SummarizationError を送出する。
+    progress が指定された場合はストリーミングで生成し、受信したチャンクごとに進捗を通知する。
+    """
+    try:
+        genai = get_genai(current_app._get_current_object())
+        model = genai.GenerativeModel(
+            SUMMARY_MODEL_NAME, 
+            tools=[create_meeting_summary_tool_function]
+        )
+    except Exception as e:
+        current_app.logger.error(f"Failed to initialize GenerativeModel: {e}")
+        raise SummarizationError({"message": "Internal server error: Could not initialize AI model"}, 500)
+
+    prompt = _build_summary_prompt(transcript_content, part)
+    app = current_app._get_current_object()
+    registry = get_registry(app)
+    try:
+        with llm_slot(app):
+            if progress is None:
+                with track_call(registry, "llm", "generate_content"):
+                    response = model.generate_content(prompt)
+            else:
+                _notify(progress, "llm_started", {"model": SUMMARY_MODEL_NAME})
+                # ストリーミングの場合は全チャンクを受信し終えるまでを1回の呼び出しとして計測する
+                # 引数が届いた項目は応答の完了を待たずに section として通知する
+                with track_call(registry, "llm", "generate_content_stream"):
+                    response = model.generate_content(prompt, stream=True)
+                    received = 0
+                    for chunk in response:
+                        received += 1
+                        args = _function_call_args(chunk)
+                        sections = [name for name in LLM_SUMMARY_SECTIONS if args and name in args]
+                        if sections:
+                            partial = _summary_from_function_call_args(args)
+                            for name in sections:
+                                _notify(progress, "section", {"name": name, "value": getattr(partial, name)})
+                        _notify(progress, "llm_chunk", {"chunks_received": received, "sections": sections})
+    except LLMBusyError:
+        current_app.logger.warning("LLM concurrency limit reached. Rejecting summary request.")
+        raise SummarizationError({"message": "Too many summaries in progress. Please retry later.",
+                                  "retry_after": LLM_BUSY_RETRY_AFTER_SECONDS}, 503)
+
+    if not response.candidates:
+        current_app.logger.warning("Generative AI response had no candidates. Likely blocked by safety settings.")
+        raise SummarizationError({"message": "Could not summarize meeting transcript. AI response was blocked or empty.", "raw_response": str(response)}, 500)
+
+    candidate = response.candidates[0]
+    if candidate.finish_reason == 'SAFETY' or (candidate.finish_reason and candidate.safety_ratings):
+        current_app.logger.warning("Generative AI response was blocked due to safety settings.")
+        safety_details = []
+        if candidate.safety_ratings:
+            for rating in candidate.safety_ratings:
+                safety_details.append(f"{rating.category.name}: {rating.probability.name}")
+        raise SummarizationError({
+            "message": "Could not summarize. AI response blocked due to safety settings.", 
+            "details": "Please check transcript content for sensitive information.",
+            "safety_ratings": safety_details,
+            "raw_response": str(candidate)
+        }, 400)
+
+    if not (candidate.content and candidate.content.parts):
+        current_app.logger.warning("Generative AI response candidate has no content or parts.")
+        raise SummarizationError({"message": "Could not summarize meeting transcript. AI response was empty or malformed.", "raw_response": str(candidate)}, 500)
+
+    part = candidate.content.parts[0]
+    if not part.function_call:
+        current_app.logger.warning("Generative AI did not produce a function call. It returned text content instead.")
+        text_response = part.text if hasattr(part, 'text') else 'No text part'
+        current_app.logger.info(f"AI raw text response: {text_response}")
+        raise SummarizationError({"message": "Could not summarize meeting transcript as expected. AI returned text instead of function call.", "raw_response": text_response}, 500)
+
+    function_call_args_plain = _to_plain_python_types(part.function_call.args)
+    # 引数全体のダンプは大きいため DEBUG の場合のみ出力する
+    if current_app.logger.isEnabledFor(logging.DEBUG):
+        current_app.logger.debug(f"Function Call Args (Plain): {current_app.json.dumps(function_call_args_plain)}")
+    return _summary_from_function_call_args(function_call_args_plain)
+
+def _get_chunk_executor() -> ThreadPoolExecutor:
+    """チャンク要約用の共有スレッドプール (同時実行数はプロセス全体で MEETING_SUMMARY_CHUNK_CONCURRENCY まで)"""
+    executor = current_app.extensions.get('meeting_summary_chunk_executor')
+    if executor is None:
+        executor = get_or_create_extension(current_app, 'meeting_summary_chunk_executor', lambda: ThreadPoolExecutor(
+            max_workers=current_app.config.get('MEETING_SUMMARY_CHUNK_CONCURRENCY', 4),
+            thread_name_prefix='meeting-summary-chunk',
+        ))
+    return executor
+
+def _prepare_transcript(transcript_content: str, chunked: Optional[bool], preprocess: bool = True) -> PreparedTranscript:
+    """
+    文字起こしを前処理し (TRANSCRIPT_PREPROCESSING)、見積もりトークン数と圧縮率をメトリクスに記録する。
+    MEETING_SUMMARY_MAX_INPUT_TOKENS を超える場合と、chunked=False で1回の呼び出しの上限を超える場合は
+    Gemini を呼ぶ前に SummarizationError (413) を送出する。
+    """
+    steps = parse_steps(current_app.config.get('TRANSCRIPT_PREPROCESSING', '')) if preprocess else ()
+    prepared = preprocess_transcript(transcript_content, steps)
+
+    registry = get_registry(current_app._get_current_object())
+    registry.observe("transcript_estimated_tokens", {}, prepared.estimated_tokens, buckets=TOKEN_BUCKETS)
+    registry.observe("transcript_compression_ratio", {}, prepared.compression_ratio, buckets=RATIO_BUCKETS)
+    current_app.logger.info(
+        f"Transcript preprocessed: {prepared.original_chars} -> {prepared.processed_chars} chars, "
+        f"~{prepared.original_tokens} -> ~{prepared.estimated_tokens} tokens (ratio {prepared.compression_ratio:.2f})")
+
+    max_tokens = current_app.config.get('MEETING_SUMMARY_MAX_INPUT_TOKENS', 500000)
+    if prepared.estimated_tokens > max_tokens:
+        raise SummarizationError({"message": "Transcript is too large to summarize.",
+                                  "estimated_tokens": prepared.estimated_tokens, "max_tokens": max_tokens}, 413)
+    single_call_max_tokens = current_app.config.get('MEETING_SUMMARY_SINGLE_CALL_MAX_TOKENS', 60000)
+    if chunked is False and prepared.estimated_tokens > single_call_max_tokens:
+        raise SummarizationError({"message": "Transcript is too large to summarize in one call. "
+                                             "Omit 'chunked' or set it to true to use the long transcript mode.",
+                                  "estimated_tokens": prepared.estimated_tokens,
+                                  "max_tokens": single_call_max_tokens}, 413)
+    return prepared
+
+def _use_chunked_mode(prepared: PreparedTranscript, chunked: Optional[bool]) -> bool:
+    """長文モードを使うかどうか。chunked が None の場合は前処理後の文字数と見積もりトークン数で自動判定する"""
+    if chunked is not None:
+        return chunked
+    return (prepared.processed_chars > current_app.config.get('LONG_TRANSCRIPT_THRESHOLD_CHARS', 60000)
+            or prepared.estimated_tokens > current_app.config.get('MEETING_SUMMARY_SINGLE_CALL_MAX_TOKENS', 60000))
+
+def _generate_chunked_summary(transcript_content: str, progress: Optional[ProgressCallback] = None) -> MeetingSummary:
+    """
+    長い文字起こしを発言の境界でチャンクに分割し、チャンクごとの要約を並列に実行してから1つにまとめる (map-reduce)。
+    所要時間は文字起こし全体ではなくチャンクの大きさに比例する。
+    """
+    chunks = build_chunks(transcript_content, current_app.config.get('LONG_TRANSCRIPT_CHUNK_CHARS', 30000))
+    if len(chunks) <= 1:
+        return _generate_meeting_summary(transcript_content, progress=progress)
+
+    app = current_app._get_current_object()
+
+    def _summarize_chunk(number, chunk):
+        with app.app_context():
+            return _generate_meeting_summary(chunk.text, part=(number, len(chunks)))
+
+    current_app.logger.info(f"Summarizing long transcript in {len(chunks)} chunks.")
+    _notify(progress, "llm_started", {"model": SUMMARY_MODEL_NAME, "chunks": len(chunks)})
+    futures = {_get_chunk_executor().submit(_summarize_chunk, number, chunk): number
+               for number, chunk in enumerate(chunks, start=1)}
+    try:
+        results = {}
+        # 終わったチャンクから順に、そのチャンクの要約 (source_index は元の番号) を通知する
+        for future in as_completed(futures):
+            number = futures[future]
+            results[number] = future.result()
+            if progress is not None:
+                partial = merge_summaries([(results[number], chunks[number - 1])])
+                _notify(progress, "chunk_done", {"chunk": number, "chunks": len(chunks), "completed": len(results),
+                                                 "summary": partial.to_dict()})
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    return merge_summaries([(results[number], chunk) for number, chunk in enumerate(chunks, start=1)])
+
+def _save_summary(summary_data: MeetingSummary) -> str:
+    """
+    要約を Datastore の 1on1_summaries に保存し、保存したIDを返す。
+    アクションアイテムは検索用に action_items (要約のキーが親) にも同じ put_multi で書き込む。
+    """
+    db_client = current_app.db 
+    if not db_client:
+        current_app.logger.error("Datastore client not initialized for saving summary.")
+        raise SummarizationError({"message": "Internal server error: Datastore client not initialized"}, 500)
+
+    kind = MEETING_SUMMARY.kind
+    # 複数スレッドで同時に保存しても衝突しないよう、時刻にランダムな接尾辞を付ける
+    meeting_id_str = f"1on1_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}"
+    key = db_client.key(kind, meeting_id_str) 
+
+    now_utc = datetime.now(timezone.utc)
+    # 要約本文・決定事項・アクションアイテムはインデックスしない (app/schemas.py)
+    entity = summary_data.to_entity(key, extra={"createdAt": now_utc})
+    
+    db_client.put_multi([entity] + build_action_item_entities(db_client, key, summary_data, now_utc))
+    current_app.logger.info(f"Meeting summary saved to Datastore: {meeting_id_str}")
+    return meeting_id_str
+
+def _attach_speakers(summary_data: MeetingSummary, transcript_content: str):
+    """
+    文字起こしに登場する既知の話者と、employee_name に対応する従業員IDを要約に付与する。
+    名前の照合はマッピング/従業員一覧から作ったオートマトンで行い、LLMは呼ばない。失敗しても要約自体は返す。
+    """
+    if not current_app.config.get('SPEAKER_RESOLUTION_ENABLED', True) or not current_app.db:
+        return
+    try:
+        resolver = get_speaker_resolver(current_app._get_current_object())
+        summary_data.speakers = resolver.resolve_transcript(transcript_content)
+        names = summary_data.employee_name if isinstance(summary_data.employee_name, list) else [summary_data.employee_name]
+        summary_data.employee_ids = resolver.resolve_names(names)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to resolve speakers for meeting summary: {e}")
+
+def _get_summary_cache() -> SummaryCache:
+    """アプリごとの要約キャッシュを返す (初回アクセス時に生成)。"""
+    cache = current_app.extensions.get('meeting_summary_cache')
+    if cache is None:
+        cache = get_or_create_extension(current_app, 'meeting_summary_cache', lambda: SummaryCache(
+            current_app._get_current_object(),
+            maxsize=current_app.config.get('MEETING_SUMMARY_CACHE_MAXSIZE', 256),
+            ttl=current_app.config.get('MEETING_SUMMARY_CACHE_TTL_SECONDS', 3600),
+            persistent_ttl=current_app.config.get('MEETING_SUMMARY_CACHE_PERSISTENT_TTL_SECONDS', 7 * 24 * 3600),
+        ))
+    return cache
+
+def _run_summarization(transcript_content: str, save_to_firestore: bool, post_to_slack: bool,
+                       use_cache: bool = True, chunked: Optional[bool] = None,
+                       progress: Optional[ProgressCallback] = None, prepared: Optional[PreparedTranscript] = None):
+    """
+    要約・Slack投稿・保存までの一連の処理を実行し、(レスポンス本文, ステータスコード) を返す。
+    同期リクエストと非同期ジョブの両方から呼ばれるため、request には依存しない (アプリコンテキストは必要)。
+    Gemini には前処理後の文字起こし (prepared, 省略時はここで前処理する) を送る。
+    同じ前処理後の文字起こし (正規化後) と前処理/プロンプト/モデルの組み合わせは要約キャッシュから返し、Geminiを呼ばない。
+    chunked が True (None の場合は長さで自動判定) のときは長文モードで分割要約する。
+    progress を渡すと各段階 (LLM開始, 受信, 要約の各項目, Slack投稿, 保存) を通知する。
+    """
+    if progress is not None:
+        progress = _SectionProgress(progress)
+    try:
+        if prepared is None:
+            prepared = _prepare_transcript(transcript_content, chunked)
+        use_chunked = _use_chunked_mode(prepared, chunked)
+        if use_chunked:
+            generate, prompt_version = _generate_chunked_summary, f"{SUMMARY_PROMPT_VERSION}-chunked"
+        else:
+            generate, prompt_version = _generate_meeting_summary, SUMMARY_PROMPT_VERSION
+
+        if use_cache:
+            cache_key = summary_cache_key(prepared.text, SUMMARY_MODEL_NAME, prompt_version,
+                                          preprocessing=prepared.fingerprint)
+            summary_data, cached = _get_summary_cache().get_or_compute(
+                cache_key, lambda: generate(prepared.text, progress=progress))
+        else:
+            summary_data, cached = generate(prepared.text, progress=progress), False
+
+        # 話者の登場回数は前処理で話者名を省く前の文字起こしで数える
+        _attach_speakers(summary_data, transcript_content)
+
+        if progress is not None:
+            _notify(progress, "summary_ready", {"cached": cached})
+            # ストリーミング中に送った項目は値が変わっていなければ送らない (話者・キャッシュからの要約はここで送る)
+            for section in SUMMARY_SECTIONS:
+                _notify(progress, "section", {"name": section, "value": getattr(summary_data, section)})
+
+        if post_to_slack:
+            if _post_summary_to_slack(summary_data):
+                _notify(progress, "slack_posted")
+
+        input_stats = dict(prepared.to_dict(), chunked=use_chunked)
+        if save_to_firestore:
+            meeting_id = _save_summary(summary_data)
+            _notify(progress, "saved", {"meeting_id": meeting_id})
+            return {"message": "Meeting summary generated and saved", "summary": summary_data, "cached": cached,
+                    "meeting_id": meeting_id, "input": input_stats}, 200
+        return {"message": "Meeting summary generated", "summary": summary_data, "cached": cached,
+                "input": input_stats}, 200
+
+    except SummarizationError as e:
+        return e.body, e.status_code
+    except Exception as e:
+        # genai は遅延インポートのため、例外の型は名前で判定する (ここで genai を読み込むと、その失敗で元の例外が失われる)
+        if type(e).__name__ == 'BlockedPromptException':
+            current_app.logger.error(f"Prompt was blocked by safety settings: {e}")
+            return {"message": "Prompt was blocked by safety settings.", "details": str(e)}, 400
+        current_app.logger.error(f"Error summarizing meeting transcript: {e}", exc_info=True)
+        return {"message": f"Internal server error: {str(e)}"}, 500
+
+def _get_job_manager() -> SummaryJobManager:
+    """アプリごとの非同期要約ジョブマネージャを返す (初回アクセス時に生成)。"""
+    manager = current_app.extensions.get('meeting_summary_jobs')
+    if manager is None:
+        manager = get_or_create_extension(current_app, 'meeting_summary_jobs', lambda: SummaryJobManager(
+            current_app._get_current_object(),
+            max_workers=current_app.config.get('MEETING_SUMMARY_JOB_WORKERS', 2),
+            max_pending=current_app.config.get('MEETING_SUMMARY_JOB_QUEUE_SIZE', 16),
+            ttl=current_app.config.get('MEETING_SUMMARY_JOB_TTL_SECONDS', 3600),
+        ))
+    return manager
+
+def _prepare_request_transcript(transcript_content, chunked: Optional[bool], preprocess):
+    """
+    リクエストの文字起こしを前処理する。戻り値は (PreparedTranscript, None) または (None, エラーレスポンス)。
+    大きすぎる文字起こしはジョブに投入せずにここで 413 を返す。
+    """
+    if not isinstance(transcript_content, str):
+        return None, (jsonify({"message": "Invalid request body: 'transcript_content' must be a string"}), 400)
+    if not isinstance(preprocess, bool):
+        return None, (jsonify({"message": "Invalid request body: 'preprocess' must be a boolean"}), 400)
+    try:
+        return _prepare_transcript(transcript_content, chunked, preprocess), None
+    except SummarizationError as e:
+        return None, (jsonify(e.body), e.status_code)
+
 # --- 要約エンドポイント ---
 @bp.route('/meeting', methods=['POST'])
 @authenticate_request # 認証を適用
+@idempotent
 def summarize_meeting():
     """
     1on1議事録テキストを受け取り、Google Generative AIのFunction Callingを用いて要約を生成し、
     その結果をJSONで返すエンドポイント。
     オプションでFirestoreにも保存する。
+    リクエストボディの "async": true (またはクエリ ?async=true) を指定すると、要約をバックグラウンドの
+    ワーカーに投入して 202 とジョブIDを即座に返す。結果は GET /meeting-summary/jobs/<job_id> で取得する。
     """
     data = request.get_json()
     if not data or 'transcript_content' not in data:
@@ -142,129 +555,263 @@ def summarize_meeting():
     #post_to_slack = data.get('post_to_slack', False)
     post_to_slack = True # ★変更: Slackへの投稿を常に有効化
 
+    use_cache = data.get('use_cache', True) is not False
+    chunked = data.get('chunked')
+    if chunked is not None and not isinstance(chunked, bool):
+        return jsonify({"message": "Invalid request body: 'chunked' must be a boolean"}), 400
+    prepared, error = _prepare_request_transcript(transcript_content, chunked, data.get('preprocess', True))
+    if error is not None:
+        return error
+
+    run_async = data.get('async') is True or request.args.get('async', '').lower() in ('1', 'true', 'yes')
+    if run_async:
+        job = _get_job_manager().submit(functools.partial(_run_summarization, prepared=prepared), transcript_content,
+                                        save_to_firestore, post_to_slack, use_cache, chunked)
+        if job is None:
+            current_app.logger.warning("Meeting summary job queue is full. Rejecting request.")
+            return jsonify({"message": "Too many summary jobs in progress. Please retry later."}), 503, {"Retry-After": "30"}
+        status_url = url_for('.get_summary_job', job_id=job['job_id'])
+        return jsonify({"message": "Meeting summary job accepted", "job_id": job['job_id'],
+                        "status": job['status'], "status_url": status_url}), 202, {"Location": status_url}
+
+    body, status_code = _run_summarization(transcript_content, save_to_firestore, post_to_slack, use_cache, chunked,
+                                           prepared=prepared)
+    if status_code == 503 and "retry_after" in body:
+        return jsonify(body), status_code, {"Retry-After": str(body["retry_after"])}
+    return jsonify(body), status_code
+
+@bp.route('/jobs/<string:job_id>', methods=['GET'])
+@authenticate_request
+def get_summary_job(job_id):
+    """非同期要約ジョブの状態 (queued / running / succeeded / failed) と、完了していれば結果を返す。"""
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"message": f"Job {job_id} not found"}), 404
+    return jsonify(job), 200
+
+# --- 保存済み要約の読み取り ---
+SUMMARY_LIST_DEFAULT_LIMIT = 50
+SUMMARY_LIST_MAX_LIMIT = 1000
+
+def _summary_record(entity) -> Dict:
+    """1on1_summaries のエンティティをレスポンス用の辞書にする (要約本体は MeetingSummary のままエンコーダに渡す)"""
+    return {"meeting_id": entity.key.name, "created_at": entity.get('createdAt'),
+            "summary": MeetingSummary.from_entity(entity)}
+
+@bp.route('/summaries/<string:meeting_id>', methods=['GET'])
+@authenticate_request
+def get_saved_summary(meeting_id):
+    """save_to_firestore で保存した要約を1件返す。"""
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"message": "Internal server error: Datastore client not initialized"}), 500
+    entity = db_client.get(db_client.key(MEETING_SUMMARY.kind, meeting_id))
+    if entity is None:
+        return jsonify({"message": f"Summary {meeting_id} not found"}), 404
+    return jsonify(_summary_record(entity)), 200
+
+@bp.route('/summaries', methods=['GET'])
+@authenticate_request
+def list_saved_summaries():
+    """
+    保存した要約を新しい順に返す。
+    クエリパラメータ:
+      employee_id: 従業員IDで絞り込み (要約の employee_ids に含まれるもの)
+      since / until: 保存日時の範囲 (ISO 8601, since <= createdAt < until)
+      limit: 1ページの件数 (既定50, 最大1000)
+      cursor: 前ページのレスポンスに含まれる next_cursor
+      stream: 'true' または Accept: application/x-ndjson の場合、全件を NDJSON でストリーム返却
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"message": "Internal server error: Datastore client not initialized"}), 500
+
+    args = request.args
+    stream = args.get('stream', '').lower() in ('1', 'true', 'yes') or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
     try:
-        model = genai.GenerativeModel(
-            'gemini-2.0-flash', 
-            tools=[create_meeting_summary_tool_function]
-        )
+        limit = args.get('limit', type=int)
+        if limit is None and not stream:
+            limit = SUMMARY_LIST_DEFAULT_LIMIT
+        if limit is not None and not 1 <= limit <= SUMMARY_LIST_MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {SUMMARY_LIST_MAX_LIMIT}")
+        since = parse_timestamp(args['since']) if args.get('since') else None
+        until = parse_timestamp(args['until']) if args.get('until') else None
+    except (ValueError, SchemaError) as e:
+        return jsonify({"message": f"Invalid query parameter: {e}"}), 400
+
+    query = db_client.query(kind=MEETING_SUMMARY.kind)
+    if args.get('employee_id'):
+        query.add_filter(filter=PropertyFilter('employee_ids', '=', args['employee_id']))
+    if since:
+        query.add_filter(filter=PropertyFilter('createdAt', '>=', since))
+    if until:
+        query.add_filter(filter=PropertyFilter('createdAt', '<', until))
+    query.order = ['-createdAt']
+    cursor = args.get('cursor') or None
+
+    if stream:
+        try:
+            # 不正なカーソルを 200 の送信開始後ではなく 400 で返せるよう、最初のページは応答を返す前に読む
+            pages = query.fetch(limit=limit, start_cursor=cursor).pages
+            first_page = list(next(pages, []))
+        except (ValueError, TypeError, google_exceptions.BadRequest) as e:
+            return jsonify({"message": f"Invalid cursor: {e}"}), 400
+        except Exception as e:
+            current_app.logger.error(f"Error listing meeting summaries: {e}")
+            return jsonify({"message": "Internal server error"}), 500
+        json_provider = current_app.json
+
+        def generate():
+            # 1件ずつ MeetingSummary に復元して書き出すため、全件をメモリに保持しない
+            for page in itertools.chain([first_page], pages):
+                for entity in page:
+                    yield json_provider.dumps(_summary_record(entity)) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        iterator = query.fetch(limit=limit, start_cursor=cursor)
+        page = next(iterator.pages, [])
+        summaries = [_summary_record(entity) for entity in page]
+        next_cursor = iterator.next_page_token
+        if isinstance(next_cursor, bytes):
+            next_cursor = next_cursor.decode('ascii')
+    except (ValueError, TypeError, google_exceptions.BadRequest) as e:
+        return jsonify({"message": f"Invalid cursor: {e}"}), 400
     except Exception as e:
-        current_app.logger.error(f"Failed to initialize GenerativeModel: {e}")
-        return jsonify({"message": "Internal server error: Could not initialize AI model"}), 500
-    
-    prompt = f"""
-    以下の1on1会議の文字起こしデータから、指定された形式で情報を抽出し、要約してください。
-    出力は`create_meeting_summary_tool_function`関数を呼び出す形式で出力してください。
+        current_app.logger.error(f"Error listing meeting summaries: {e}")
+        return jsonify({"message": "Internal server error"}), 500
 
-    ---
-    会議の文字起こしデータ:
-    {transcript_content}
-    ---
+    return jsonify({"summaries": summaries, "next_cursor": next_cursor}), 200
 
-    抽出・要約する項目は以下の通りです。
-    1.  **会議日時**: 文字起こしファイル名または内容から正確な日時を抽出してください。フォーマットは"YYYY-MM-DD HH:MM JST"または"YYYY-MM-DDTHH:MM:SS+09:00"のように、可能な限りISO 8601に近い形でお願いします。
-    2.  **社員名**: このミーティングの参加者の名前を厳密に抽出してください。**森口裕之は上司なので除外してください。**
-    3.  **会議の目的**: 会議の目的を具体的に要約してください。
-    4.  **決定事項**: 会議で合意された、あるいは方向性が示された主要な決定事項をリストアップしてください。各決定事項について、内容、そしてその決定に至るまでの議論の要約を含めてください。関連する発言の`source_index`（のxの値）があれば整数値のリストで含めてください。
-       **決定事項の各項目は、`item` (内容)、`discussion_summary` (議論の要約)、`source_utterance_indices` (関連インデックス) のキーを持つ辞書として記述してください。**
-    5.  **全体要約**: 会議全体の主要なポイント、結論、方向性、および主要な議論の要約を簡潔にまとめてください。
-    6.  **アクションアイテム**: 会議で決まった具体的な次のアクションをリストアップしてください。担当者も明確にしてください。期限があれば"YYYY-MM-DD"形式で記載してください。
-       **アクションアイテムの各項目は、`action` (内容)、`assignee` (担当者)、`due_date` (期限) のキーを持つ辞書として記述してください。**
+# --- アクションアイテムの検索 ---
+ACTION_ITEM_LIST_DEFAULT_LIMIT = 100
+ACTION_ITEM_LIST_MAX_LIMIT = 1000
 
+@bp.route('/action-items', methods=['GET'])
+@authenticate_request
+def list_action_items():
     """
+    保存した要約のアクションアイテムを期限の早い順に返す (action_items の複合インデックスを使う)。
+    クエリパラメータ:
+      assignee: 担当者 (完全一致)
+      due_before: この日付より前が期限のもの (YYYY-MM-DD, 含まない)。期限が読めなかったものは含まれない
+      status: 'open' または 'done'
+      limit: 1ページの件数 (既定100, 最大1000)
+      cursor: 前ページのレスポンスに含まれる next_cursor
+    """
+    db_client = current_app.db
+    if not db_client:
+        return jsonify({"message": "Internal server error: Datastore client not initialized"}), 500
 
+    args = request.args
     try:
-        response = model.generate_content(prompt)
-
-        if response.candidates:
-            candidate = response.candidates[0]
-            if candidate.finish_reason == 'SAFETY' or (candidate.finish_reason and candidate.safety_ratings):
-                current_app.logger.warning("Generative AI response was blocked due to safety settings.")
-                safety_details = []
-                if candidate.safety_ratings:
-                    for rating in candidate.safety_ratings:
-                        safety_details.append(f"{rating.category.name}: {rating.probability.name}")
-                return jsonify({
-                    "message": "Could not summarize. AI response blocked due to safety settings.", 
-                    "details": "Please check transcript content for sensitive information.",
-                    "safety_ratings": safety_details,
-                    "raw_response": str(candidate)
-                }), 400
-            
-            if candidate.content and candidate.content.parts:
-                part = candidate.content.parts[0]
-                if part.function_call:
-                    function_call_args_plain = _to_plain_python_types(part.function_call.args)
-                    current_app.logger.info(f"Function Call Args (Plain): {json.dumps(function_call_args_plain, indent=2, ensure_ascii=False)}")
-
-                    decisions_raw = function_call_args_plain.get('decisions', [])
-                    decisions = []
-                    for d_item in decisions_raw:
-                        mapped_d = {
-                            'item': d_item.get('item') or d_item.get('content', ''), 
-                            'discussion_summary': d_item.get('discussion_summary', ''),
-                            'source_utterance_indices': d_item.get('source_utterance_indices', [])
-                        }
-                        filtered_d = {k: v for k, v in mapped_d.items() if k in Decision.__annotations__}
-                        decisions.append(Decision(**filtered_d))
-
-                    action_items_raw = function_call_args_plain.get('action_items', [])
-                    action_items = []
-                    for a_item in action_items_raw:
-                        filtered_a = {k: v for k, v in a_item.items() if k in ActionItem.__annotations__}
-                        action_items.append(ActionItem(**filtered_a))
-
-                    # 現在の年月日を取得し、文字列に変換
-                    
-                    summary_data = MeetingSummary(
-                        meeting_date=datetime.now(timezone.utc).strftime('%Y-%m-%d %Z')  , #　本日日付を文字列に変換
-                        employee_name=function_call_args_plain.get('employee_name', ''), # ★変更
-                        purpose=function_call_args_plain.get('purpose', ''),
-                        decisions=decisions,
-                        overall_summary=function_call_args_plain.get('overall_summary', ''),
-                        action_items=action_items,
-                    )
-                    print("Posting summary to Slack...",post_to_slack)
-                    if post_to_slack:
-                        
-                        _post_summary_to_slack(summary_data)
-
-                    if save_to_firestore:
-                        db_client = current_app.db 
-                        if not db_client:
-                            current_app.logger.error("Datastore client not initialized for saving summary.")
-                            return jsonify({"message": "Internal server error: Datastore client not initialized"}), 500
-
-                        kind = '1on1_summaries' 
-                        meeting_id_str = f"1on1_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}" 
-                        key = db_client.key(kind, meeting_id_str) 
-
-                        entity = datastore.Entity(key=key) 
-                        
-                        doc_data = asdict(summary_data)
-                        doc_data["createdAt"] = datetime.now(timezone.utc) 
-
-                        entity.update(doc_data)
-                        
-                        db_client.put(entity) 
-                        current_app.logger.info(f"Meeting summary saved to Datastore: {meeting_id_str}")
-                        return jsonify({"message": "Meeting summary generated and saved", "summary": summary_data.__dict__}), 200
-                    else:
-                        return jsonify({"message": "Meeting summary generated", "summary": summary_data.__dict__}), 200
-                else:
-                    current_app.logger.warning("Generative AI did not produce a function call. It returned text content instead.")
-                    text_response = part.text if hasattr(part, 'text') else 'No text part'
-                    current_app.logger.info(f"AI raw text response: {text_response}")
-                    return jsonify({"message": "Could not summarize meeting transcript as expected. AI returned text instead of function call.", "raw_response": text_response}), 500
-            else:
-                current_app.logger.warning("Generative AI response candidate has no content or parts.")
-                return jsonify({"message": "Could not summarize meeting transcript. AI response was empty or malformed.", "raw_response": str(candidate)}), 500
-        else:
-            current_app.logger.warning("Generative AI response had no candidates. Likely blocked by safety settings.")
-            return jsonify({"message": "Could not summarize meeting transcript. AI response was blocked or empty.", "raw_response": str(response)}), 500
+        limit = args.get('limit', default=ACTION_ITEM_LIST_DEFAULT_LIMIT, type=int)
+        if not 1 <= limit <= ACTION_ITEM_LIST_MAX_LIMIT:
+            raise ValueError(f"'limit' must be between 1 and {ACTION_ITEM_LIST_MAX_LIMIT}")
+        due_before = date.fromisoformat(args['due_before']).isoformat() if args.get('due_before') else None
+    except ValueError as e:
+        return jsonify({"message": f"Invalid query parameter: {e}"}), 400
+    status = args.get('status')
+    if status and status not in ACTION_ITEM_STATUSES:
+        return jsonify({"message": f"'status' must be one of {', '.join(ACTION_ITEM_STATUSES)}"}), 400
+
+    query = db_client.query(kind=ACTION_ITEM_KIND)
+    if args.get('assignee'):
+        query.add_filter(filter=PropertyFilter('assignee', '=', args['assignee'].strip()))
+    if status:
+        query.add_filter(filter=PropertyFilter('status', '=', status))
+    if due_before:
+        query.add_filter(filter=PropertyFilter('due_date', '<', due_before))
+    query.order = ['due_date']
 
-    except genai.types.BlockedPromptException as e:
-        current_app.logger.error(f"Prompt was blocked by safety settings: {e}")
-        return jsonify({"message": "Prompt was blocked by safety settings.", "details": str(e)}), 400
+    try:
+        iterator = query.fetch(limit=limit, start_cursor=args.get('cursor') or None)
+        page = next(iterator.pages, [])
+        action_items = [action_item_to_dict(entity) for entity in page]
+        next_cursor = iterator.next_page_token
+        if isinstance(next_cursor, bytes):
+            next_cursor = next_cursor.decode('ascii')
+    except (ValueError, TypeError, google_exceptions.BadRequest) as e:
+        return jsonify({"message": f"Invalid cursor: {e}"}), 400
     except Exception as e:
-        current_app.logger.error(f"Error summarizing meeting transcript: {e}", exc_info=True)
-        return jsonify({"message": f"Internal server error: {str(e)}"}), 500
+        current_app.logger.error(f"Error listing action items: {e}")
+        return jsonify({"message": "Internal server error"}), 500
+
+    return jsonify({"action_items": action_items, "next_cursor": next_cursor}), 200
+
+def _format_sse(event: str, data) -> str:
+    """Server-Sent Events の1イベント分の文字列を組み立てる"""
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+@bp.route('/meeting/stream', methods=['POST'])
+@authenticate_request
+@idempotent
+def summarize_meeting_stream():
+    """
+    /meeting と同じ要約を Server-Sent Events で進捗を流しながら実行するエンドポイント。
+    イベント: queued, llm_started, llm_chunk, chunk_done, summary_ready, section (要約の各項目),
+    slack_posted, saved, result (同期モードと同じレスポンス本文と status), done。
+    section は LLM の応答から項目が届いた時点で送る (応答全体の完了を待たない)。長文モードでは chunk_done に
+    そのチャンクの要約が含まれる。
+    LLMの応答待ちの間も一定間隔でコメント行を送り、プロキシのアイドルタイムアウトを防ぐ。
+    進捗は上限付きのキュー (SSE_EVENT_QUEUE_SIZE) で渡し、接続が切れたら以降の進捗は捨てる
+    (受信が遅く捨てた進捗の件数は done の dropped_events。result と done は捨てない)。
+    処理はジョブとしても登録されるため、接続が切れても GET /meeting-summary/jobs/<job_id> で結果を取得できる。
+    """
+    data = request.get_json()
+    if not data or 'transcript_content' not in data:
+        current_app.logger.error("Invalid request body: 'transcript_content' is required.")
+        return jsonify({"message": "Invalid request body: 'transcript_content' is required"}), 400
+
+    transcript_content = data['transcript_content']
+    save_to_firestore = data.get('save_to_firestore', False)
+    post_to_slack = True # /meeting と同様にSlackへの投稿を常に有効化
+    use_cache = data.get('use_cache', True) is not False
+    chunked = data.get('chunked')
+    if chunked is not None and not isinstance(chunked, bool):
+        return jsonify({"message": "Invalid request body: 'chunked' must be a boolean"}), 400
+    prepared, error = _prepare_request_transcript(transcript_content, chunked, data.get('preprocess', True))
+    if error is not None:
+        return error
+
+    events = ProgressChannel(maxsize=current_app.config.get('SSE_EVENT_QUEUE_SIZE', 64))
+
+    def _run_with_progress():
+        try:
+            body, status_code = _run_summarization(transcript_content, save_to_firestore, post_to_slack,
+                                                   use_cache, chunked, progress=events.publish, prepared=prepared)
+            events.set_result("result", {"status": status_code, "body": body})
+            return body, status_code
+        finally:
+            events.finish()
+
+    job = _get_job_manager().submit(_run_with_progress)
+    if job is None:
+        current_app.logger.warning("Meeting summary job queue is full. Rejecting request.")
+        return jsonify({"message": "Too many summary jobs in progress. Please retry later."}), 503, {"Retry-After": "30"}
+
+    heartbeat_seconds = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+
+    def generate():
+        try:
+            yield _format_sse("queued", {"job_id": job['job_id']})
+            while True:
+                try:
+                    item = events.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _format_sse(*item)
+            # result と done は進捗とは違いキューが一杯でも捨てず、進捗を読み切った後に送る
+            if events.result is not None:
+                yield _format_sse(*events.result)
+            yield _format_sse("done", {"job_id": job['job_id'], "dropped_events": events.dropped})
+        finally:
+            # 接続が切れた場合 (GeneratorExit) も含め、以降の進捗はキューに溜めずに捨てる
+            events.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
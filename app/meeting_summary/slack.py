@@ -0,0 +1,219 @@
+# app/meeting_summary/slack.py
+
+import atexit
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.schemas import SLACK_DEAD_LETTER, SLACK_UNDELIVERED
+
+SLACK_POST_MESSAGE_URL = "https://slack.com/api/chat.postMessage"
+UNDELIVERED_KIND = SLACK_UNDELIVERED.kind
+DEAD_LETTER_KIND = SLACK_DEAD_LETTER.kind
+
+# 再送しても成功しない Slack API のエラー
+_PERMANENT_ERRORS = {
+    "invalid_auth", "not_authed", "account_inactive", "token_revoked",
+    "channel_not_found", "not_in_channel", "is_archived", "msg_too_long", "no_text",
+}
+# 429 以外の 4xx (保存済みのエラーは "HTTP 403" の形式。以前の raise_for_status の "403 Client Error: ..." も含む)
+_PERMANENT_HTTP_ERROR = re.compile(r'^(?:HTTP )?4(?!29)\d\d\b')
+
+
+def _is_permanent_error(error: Optional[str]) -> bool:
+    return bool(error) and (error in _PERMANENT_ERRORS or _PERMANENT_HTTP_ERROR.match(error) is not None)
+
+
+class _PermanentError(Exception):
+    """再送しても成功しない失敗 (429 以外の 4xx、_PERMANENT_ERRORS)"""
+
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlackDispatcher:
+    """
+    Slack への投稿をバックグラウンドスレッドで行うディスパッチャ。
+    keep-alive 付きの requests.Session を使い回し、上限付きのキューからメッセージを1件ずつ送信する。
+    429 / ratelimited では Retry-After に従い、一時的な失敗は指数バックオフで再送する。
+    再送を使い切ったメッセージやキューに入りきらなかったメッセージは Datastore (UNDELIVERED_KIND) に保存し、
+    次回ディスパッチャ起動時に再投入する。429 以外の 4xx や恒久的な Slack API のエラー (トークン不正・チャンネル無し等) は
+    再送せず、再投入しない DEAD_LETTER_KIND に保存する。
+    """
+
+    def __init__(self, app, token: str, channel: str, api_url: str = SLACK_POST_MESSAGE_URL,
+                 max_queue: int = 100, max_retries: int = 5, timeout: float = 10.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self._app = app
+        self._token = token
+        self._channel = channel
+        self._api_url = api_url
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json; charset=utf-8",
+        })
+        self._lock = threading.Lock()
+        self._thread = None
+        atexit.register(self._persist_pending)
+
+    def enqueue(self, text: str) -> bool:
+        """メッセージを送信キューに追加する。キューが満杯の場合は保存だけ行い False を返す。"""
+        self._ensure_started()
+        payload = {"channel": self._channel, "text": text, "unfurl_links": False}
+        try:
+            self._queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            self._app.logger.warning("Slack delivery queue is full. Persisting message for later delivery.")
+            self._persist(payload, "queue_full", 0)
+            return False
+
+    def _ensure_started(self):
+        # スレッドは初回投稿時に起動する (gunicorn の fork 前に起動しないため)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="slack-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        self._requeue_persisted()
+        while True:
+            payload = self._queue.get()
+            try:
+                self._deliver(payload)
+            except Exception as e:
+                self._app.logger.error(f"Unexpected error in Slack dispatcher: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, payload):
+        last_error = None
+        for attempt in range(self._max_retries + 1):
+            try:
+                self._post(payload)
+                self._app.logger.info(f"Successfully posted summary to Slack channel {payload['channel']}")
+                return
+            except _PermanentError as e:
+                self._app.logger.error(f"Slack rejected the message permanently: {e}")
+                self._persist(payload, str(e), attempt + 1, schema=SLACK_DEAD_LETTER)
+                return
+            except _RetryableError as e:
+                last_error = str(e)
+                if attempt >= self._max_retries:
+                    break
+                delay = e.retry_after if e.retry_after is not None else self._backoff(attempt)
+                self._app.logger.warning(f"Slack post failed ({last_error}). Retrying in {delay:.1f}s (attempt {attempt + 1}/{self._max_retries}).")
+                time.sleep(delay)
+            except Exception as e:
+                last_error = str(e)
+                self._app.logger.error(f"Slack API error: {last_error}")
+                break
+        self._persist(payload, last_error, attempt + 1)
+
+    def _post(self, payload):
+        try:
+            response = self._session.post(self._api_url, json=payload, timeout=self._timeout)
+        except requests.exceptions.RequestException as e:
+            raise _RetryableError(f"request failed: {e}")
+
+        if response.status_code == 429:
+            raise _RetryableError("rate limited (HTTP 429)", self._retry_after(response))
+        if response.status_code >= 500:
+            raise _RetryableError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise _PermanentError(f"HTTP {response.status_code}")
+
+        response_data = response.json()
+        if response_data.get("ok"):
+            return
+        error = response_data.get("error")
+        if error == "ratelimited":
+            raise _RetryableError("ratelimited", self._retry_after(response))
+        if error in _PERMANENT_ERRORS:
+            raise _PermanentError(error)
+        raise _RetryableError(f"Slack API error: {error}")
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return min(float(value), self._backoff_max) if value is not None else None
+        except ValueError:
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        # 指数バックオフ (フルジッター)
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * (2 ** attempt)))
+
+    def _persist(self, payload, error: Optional[str], attempts: int, schema=SLACK_UNDELIVERED):
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            self._app.logger.error(f"Slack message could not be delivered and Datastore is unavailable: {error}")
+            return
+        try:
+            entity = schema.to_entity(db_client.key(schema.kind), {
+                "channel": payload["channel"], "text": payload["text"],
+                "error": error, "attempts": attempts, "created_at": datetime.now(timezone.utc),
+            })
+            db_client.put(entity)
+            self._app.logger.warning(f"Persisted undelivered Slack message to {schema.kind} ({error}).")
+        except Exception as e:
+            self._app.logger.error(f"Failed to persist undelivered Slack message: {e}")
+
+    def _persist_pending(self):
+        """プロセス終了時、未送信のメッセージを保存する"""
+        while True:
+            try:
+                payload = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._persist(payload, "shutdown", 0)
+
+    def _requeue_persisted(self, limit: int = 100):
+        """保存済みの未送信メッセージをキューに戻す (恒久的なエラーで保存されていたものは DEAD_LETTER_KIND に移す)"""
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            return
+        try:
+            entities = list(db_client.query(kind=UNDELIVERED_KIND).fetch(limit=limit))
+        except Exception as e:
+            self._app.logger.warning(f"Failed to load undelivered Slack messages: {e}")
+            return
+        requeued = []
+        dead_letters = []
+        for entity in entities:
+            if _is_permanent_error(entity.get("error")):
+                dead_letters.append(entity)
+                continue
+            try:
+                self._queue.put_nowait({"channel": entity.get("channel") or self._channel,
+                                        "text": entity.get("text"), "unfurl_links": False})
+            except queue.Full:
+                break
+            requeued.append(entity.key)
+        if dead_letters:
+            try:
+                db_client.put_multi([SLACK_DEAD_LETTER.to_entity(db_client.key(DEAD_LETTER_KIND), dict(entity))
+                                     for entity in dead_letters])
+                db_client.delete_multi([entity.key for entity in dead_letters])
+            except Exception as e:
+                self._app.logger.warning(f"Failed to move undeliverable Slack messages: {e}")
+        if requeued:
+            db_client.delete_multi(requeued)
+            self._app.logger.info(f"Requeued {len(requeued)} undelivered Slack messages.")
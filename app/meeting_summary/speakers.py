@@ -0,0 +1,233 @@
+# app/meeting_summary/speakers.py
+
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+from app.google_meet_maps.index import get_mapping_index, normalize_meet_name
+from app.extensions import get_or_create_extension
+from app.schemas import EMPLOYEE
+
+# これより短い名前は誤検出が多いためパターンに含めない
+MIN_PATTERN_LENGTH = 2
+
+
+# 非ASCII文字 (日本語の姓名など) の間の空白。"山田 太郎" と "山田太郎" を同じ名前として扱うために取り除く
+_SPACE_BETWEEN_NON_ASCII = re.compile(r'(?<=[^\x00-\x7f]) (?=[^\x00-\x7f])')
+
+
+def _match_key(text: str) -> str:
+    """照合用の文字列 (表示名の正規化 + 日本語の姓名間の空白除去)"""
+    return _SPACE_BETWEEN_NON_ASCII.sub('', normalize_meet_name(text))
+
+
+def _is_ascii_alnum(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+class AhoCorasick:
+    """
+    複数パターンを1回の線形走査で検索する Aho-Corasick オートマトン。
+    英数字で始まる/終わるパターンは、前後が英数字の場合 (単語の途中) は一致とみなさない。
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # 幅優先で失敗遷移を構築する
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def count_matches(self, text: str) -> Counter:
+        """text 中の各パターンの出現回数を返す (キーはパターンの番号)"""
+        counts = Counter()
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        text_length = len(text)
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                pattern = patterns[pattern_id]
+                start = position - len(pattern) + 1
+                if _is_ascii_alnum(pattern[0]) and start > 0 and _is_ascii_alnum(text[start - 1]):
+                    continue
+                if _is_ascii_alnum(pattern[-1]) and position + 1 < text_length and _is_ascii_alnum(text[position + 1]):
+                    continue
+                counts[pattern_id] += 1
+        return counts
+
+
+class SpeakerResolver:
+    """
+    google_meet_employee_map の表示名と employees の氏名から作った Aho-Corasick オートマトンで、
+    文字起こし中の既知の名前を1回の走査で見つけて従業員IDに対応付ける。
+    """
+
+    def __init__(self, meet_names: Dict[str, str], employees: List[Tuple[str, Optional[str], Optional[str]]]):
+        # employees: (employee_id, name, email)
+        employee_id_by_email = {email: employee_id for employee_id, _, email in employees if email}
+        targets: Dict[str, Dict] = {}
+        for email, meet_name in meet_names.items():
+            key = _match_key(meet_name)
+            if len(key) >= MIN_PATTERN_LENGTH:
+                targets.setdefault(key, {"name": meet_name, "email": email,
+                                         "employee_id": employee_id_by_email.get(email)})
+        for employee_id, name, email in employees:
+            if not name:
+                continue
+            key = _match_key(name)
+            if len(key) >= MIN_PATTERN_LENGTH:
+                targets.setdefault(key, {"name": name, "email": email, "employee_id": employee_id})
+        keys = list(targets)
+        self._targets = [targets[key] for key in keys]
+        self._pattern_ids = {key: pattern_id for pattern_id, key in enumerate(keys)}
+        self._automaton = AhoCorasick(keys)
+
+    def resolve_transcript(self, transcript_content: str) -> List[Dict]:
+        """文字起こしに登場する既知の話者と出現回数を、出現回数の多い順に返す"""
+        counts = self._automaton.count_matches(_match_key(transcript_content))
+        speakers = []
+        for pattern_id, mentions in counts.most_common():
+            speakers.append(dict(self._targets[pattern_id], mentions=mentions))
+        return speakers
+
+    def resolve_names(self, names: List[str]) -> List[Optional[str]]:
+        """LLMが抽出した氏名のリストを従業員IDのリストに変換する (見つからない名前は None)"""
+        employee_ids = []
+        for name in names:
+            key = _match_key(name or '')
+            employee_id = None
+            if key in self._pattern_ids:
+                employee_id = self._targets[self._pattern_ids[key]]["employee_id"]
+            else:
+                counts = self._automaton.count_matches(key)
+                for pattern_id, _ in counts.most_common():
+                    employee_id = self._targets[pattern_id]["employee_id"]
+                    if employee_id:
+                        break
+            employee_ids.append(employee_id)
+        return employee_ids
+
+
+class SpeakerResolverHolder:
+    """
+    SpeakerResolver を保持し、マッピングと従業員一覧が変わった場合だけ作り直す。
+
+    - 作り直しの確認はバックグラウンドのスレッドで行い、リクエストは確認中も今の SpeakerResolver を使う
+      (まだ1つも無い初回だけは、そのリクエストで作るのを待つ)。
+    - 確認はマッピングインデックスの version が変わったとき、または check_seconds ごとに行う。
+      従業員一覧は employee_refresh_seconds ごとに projection クエリ (name, email だけ) で読み直す。
+    - 照合に使う入力 (表示名・氏名・email・従業員ID) のハッシュが変わらなければオートマトンは作り直さない。
+    """
+
+    def __init__(self, employee_refresh_seconds: float = 300, check_seconds: float = 60):
+        self.employee_refresh_seconds = employee_refresh_seconds
+        self.check_seconds = check_seconds
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._resolver: Optional[SpeakerResolver] = None
+        self._fingerprint = None
+        self._mapping_version = None
+        self._employees = None
+        self._employees_loaded_at = 0.0
+        self._checked_at = 0.0
+        self._refreshing = False
+
+    def get(self, app) -> SpeakerResolver:
+        resolver = self._resolver
+        if resolver is None:
+            with self._build_lock:
+                if self._resolver is None:
+                    self._refresh(app)
+            return self._resolver
+        if (time.monotonic() - self._checked_at >= self.check_seconds or
+                get_mapping_index(app).version != self._mapping_version):
+            self._start_refresh(app)
+        return resolver
+
+    def _start_refresh(self, app):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, args=(app,), name="speaker-resolver-refresh",
+                         daemon=True).start()
+
+    def _refresh_in_background(self, app):
+        try:
+            with self._build_lock:
+                self._refresh(app)
+        except Exception as e:
+            app.logger.warning(f"Failed to refresh speaker resolver: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh(self, app):
+        db_client = app.db
+        mapping_index = get_mapping_index(app)
+        mapping_index.ensure_fresh(db_client)
+        mapping_version = mapping_index.version
+        if self._employees is None or time.monotonic() - self._employees_loaded_at >= self.employee_refresh_seconds:
+            self._employees = _load_employees(db_client)
+            self._employees_loaded_at = time.monotonic()
+        meet_names = mapping_index.snapshot()
+        fingerprint = _resolver_fingerprint(meet_names, self._employees)
+        if self._resolver is None or fingerprint != self._fingerprint:
+            self._resolver = SpeakerResolver(meet_names, self._employees)
+            self._fingerprint = fingerprint
+            self.rebuilds += 1
+        self._mapping_version = mapping_version
+        self._checked_at = time.monotonic()
+
+
+def _load_employees(db_client) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """従業員の (従業員ID, 氏名, email) の一覧。projection クエリでインデックスから name と email だけを読む"""
+    query = db_client.query(kind=EMPLOYEE.kind, projection=['name', 'email'])
+    return [(entity.key.name, entity.get("name"), entity.get("email")) for entity in query.fetch()]
+
+
+def _resolver_fingerprint(meet_names: Dict[str, str], employees) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr(sorted(meet_names.items())).encode('utf-8'))
+    digest.update(repr(sorted(employees, key=repr)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_speaker_resolver(app) -> SpeakerResolver:
+    """アプリごとの話者解決器を返す (必要な場合だけ再構築される)"""
+    holder = app.extensions.get('speaker_resolver')
+    if holder is None:
+        holder = get_or_create_extension(app, 'speaker_resolver', lambda: SpeakerResolverHolder(
+            employee_refresh_seconds=app.config.get('SPEAKER_RESOLVER_EMPLOYEE_REFRESH_SECONDS', 300),
+            check_seconds=app.config.get('GOOGLE_MEET_MAP_REFRESH_SECONDS', 60)))
+    return holder.get(app)
@@ -0,0 +1,130 @@
+# app/meeting_summary/summary_cache.py
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Tuple
+
+from app.cache import StatsTTLCache
+from app.meeting_summary.models import MeetingSummary
+from app.schemas import MEETING_SUMMARY_CACHE
+
+CACHE_KIND = 'meeting_summary_cache'
+
+_HORIZONTAL_WHITESPACE = re.compile(r'[ \t　]+')
+
+
+def normalize_transcript(transcript_content: str) -> str:
+    """キャッシュキー計算用に文字起こしを正規化する (Unicode NFC, 改行統一, 空白の圧縮)"""
+    text = unicodedata.normalize('NFC', transcript_content).replace('\r\n', '\n').replace('\r', '\n')
+    lines = (_HORIZONTAL_WHITESPACE.sub(' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def summary_cache_key(transcript_content: str, model_name: str, prompt_version: str, preprocessing: str = '') -> str:
+    """
+    正規化した文字起こし・モデル名・プロンプトのバージョンから、要約結果のキャッシュキーを計算する。
+    preprocessing には前処理の fingerprint (app/meeting_summary/preprocessing.py) を渡す。
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model_name}\n{prompt_version}\n".encode('utf-8'))
+    if preprocessing:
+        digest.update(f"{preprocessing}\n".encode('utf-8'))
+    digest.update(normalize_transcript(transcript_content).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SummaryCache:
+    """
+    要約結果の2段キャッシュ (プロセス内LRU → Datastore の CACHE_KIND)。
+    同じキーの要約が同時に要求された場合は、最初の1件だけが compute を実行し、
+    残りはその結果を待って共有する (single-flight)。
+    """
+
+    def __init__(self, app, maxsize: int = 256, ttl: int = 3600, persistent_ttl: int = 7 * 24 * 3600):
+        self._app = app
+        self._memory = StatsTTLCache(maxsize=maxsize, ttl=ttl)
+        self._persistent_ttl = persistent_ttl
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def get_or_compute(self, key: str, compute: Callable[[], MeetingSummary]) -> Tuple[MeetingSummary, bool]:
+        """
+        キャッシュから要約を返す。無ければ compute() を実行して保存する。
+        戻り値は (MeetingSummary, キャッシュヒットかどうか)。呼び出し側が変更しても良いよう毎回新しいオブジェクトを返す。
+        """
+        cached = self._memory.get(key)
+        if cached is not None:
+            return MeetingSummary.from_dict(cached), True
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return MeetingSummary.from_dict(flight.result), True
+
+        try:
+            summary_dict = self._load(key)
+            hit = summary_dict is not None
+            if not hit:
+                summary_dict = compute().to_dict()
+                self._save(key, summary_dict)
+            self._memory.set(key, summary_dict)
+            flight.result = summary_dict
+            return MeetingSummary.from_dict(summary_dict), hit
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    def stats(self):
+        return self._memory.stats()
+
+    def _load(self, key: str):
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            return None
+        try:
+            entity = db_client.get(db_client.key(CACHE_KIND, key))
+        except Exception as e:
+            self._app.logger.warning(f"Failed to read meeting summary cache {key}: {e}")
+            return None
+        if not entity or not entity.get('summary'):
+            return None
+        created_at = entity.get('created_at')
+        if created_at and created_at < datetime.now(timezone.utc) - timedelta(seconds=self._persistent_ttl):
+            return None
+        return json.loads(entity['summary'])
+
+    def _save(self, key: str, summary_dict):
+        db_client = getattr(self._app, 'db', None)
+        if not db_client:
+            return
+        try:
+            entity = MEETING_SUMMARY_CACHE.to_entity(db_client.key(CACHE_KIND, key), {
+                'summary': json.dumps(summary_dict, ensure_ascii=False),
+                'created_at': datetime.now(timezone.utc),
+            })
+            db_client.put(entity)
+        except Exception as e:
+            # キャッシュの書き込み失敗は要約結果には影響させない
+            self._app.logger.warning(f"Failed to write meeting summary cache {key}: {e}")
@@ -0,0 +1,497 @@
+# app/metrics.py
+
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from flask import g, has_request_context, request
+from app.extensions import get_or_create_extension
+
+# 秒単位のレイテンシ用バケット (LLM呼び出しの数十秒まで)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# リクエスト/レスポンス本文のバイト数用バケット
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+# 1リクエストあたりの外部呼び出し回数用バケット
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# 要約に送る文字起こしの見積もりトークン数と、前処理による圧縮率 (前処理後 / 前処理前) 用バケット
+TOKEN_BUCKETS = (1000, 5000, 10_000, 30_000, 60_000, 100_000, 300_000, 1_000_000)
+RATIO_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+# Datastore クライアントのうち RPC を伴うメソッド
+DATASTORE_RPC_METHODS = ('get', 'get_multi', 'put', 'put_multi', 'delete', 'delete_multi', 'allocate_ids')
+# トランザクション・バッチの中ではコミットまで送られないメソッド
+_BATCHED_METHODS = ('put', 'put_multi', 'delete', 'delete_multi')
+
+_HELP = {
+    "http_requests_total": ("counter", "HTTP requests by route and status."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route."),
+    "http_request_size_bytes": ("histogram", "HTTP request body size by route."),
+    "http_response_size_bytes": ("histogram", "HTTP response body size by route."),
+    "http_request_external_calls": ("histogram", "Datastore RPCs / LLM calls made while serving one request."),
+    "external_calls_total": ("counter", "Datastore RPCs and LLM calls by outcome."),
+    "external_call_duration_seconds": ("histogram", "Datastore RPC and LLM call latency."),
+    "cache_events_total": ("counter", "In-process cache hits, misses, evictions and expirations."),
+    "cache_entries": ("gauge", "In-process cache size (summed across workers)."),
+    "transcript_estimated_tokens": ("histogram", "Estimated input tokens of transcripts sent for summarization."),
+    "transcript_compression_ratio": ("histogram", "Estimated tokens after / before transcript preprocessing."),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    プロセス内のカウンタ・ヒストグラム・ゲージ。
+    gunicorn の複数ワーカーで集計できるよう、metrics_dir が指定されている場合は
+    ワーカーごとのスナップショットを <metrics_dir>/metrics-<pid>.json に書き出し、
+    /metrics の応答時に全ワーカーのファイルを合算する。
+    終了したワーカーのカウンタとヒストグラムは合算し続ける (累積値が減らないように) が、
+    ゲージ (現在値) は終了時に retire() で消し、プロセスが残っていないファイルのゲージも合算しない。
+    """
+
+    def __init__(self, metrics_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self.metrics_dir = metrics_dir or None
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Dict] = {}
+        self._last_flush = 0.0
+        # スナップショットの直前に呼ぶ関数 (キャッシュ統計の取り込みなど)。fork 後も同じアプリを参照するため reset では消さない
+        self._collectors = []
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+
+    def reset(self):
+        """全ての値とロックを初期化する (fork 後の子プロセス用)"""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def add_collector(self, collector):
+        """スナップショットを書き出す (または /metrics で読む) 直前に collector(registry) を呼ぶ。"""
+        self._collectors.append(collector)
+
+    def _run_collectors(self):
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception:
+                continue
+
+    def inc(self, name: str, labels: Dict, value: float = 1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_counter(self, name: str, labels: Dict, value: float):
+        """プロセス内で累積済みの値 (キャッシュのヒット数など) をそのままカウンタとして記録する。"""
+        with self._lock:
+            self._counters[(name, _label_key(labels))] = value
+
+    def set_gauge(self, name: str, labels: Dict, value: float):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, labels: Dict, value: float, buckets=LATENCY_BUCKETS):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": list(buckets), "counts": [0] * (len(buckets) + 1),
+                                                     "sum": 0.0, "count": 0}
+            # counts[i] は buckets[i] 以下 (最後は +Inf) の観測数 (累積は出力時に計算する)
+            histogram["counts"][bisect_left(histogram["buckets"], value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],
+                "histograms": [[name, dict(labels), dict(h, counts=list(h["counts"]))]
+                               for (name, labels), h in self._histograms.items()],
+            }
+
+    def maybe_flush(self, force: bool = False, collect: bool = True):
+        """
+        flush_interval ごと (force の場合は常に) にこのワーカーのスナップショットを書き出す。
+        collect の場合は書き出す前に add_collector の関数を呼ぶ (どのワーカーのキャッシュ統計も合算されるように)。
+        """
+        if not self.metrics_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        # 同じワーカーの複数スレッドが同時に書き出さないようにする (書き出し中なら通常の flush は省略)
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            if collect:
+                self._run_collectors()
+            path = os.path.join(self.metrics_dir, f"metrics-{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            # 読み手が書きかけのファイルを読まないよう rename で置き換える
+            os.replace(tmp_path, path)
+        finally:
+            self._flush_lock.release()
+
+    def retire(self):
+        """ワーカーの終了時: ゲージを消して最後のスナップショットを書き出す (カウンタとヒストグラムは残す)。"""
+        with self._lock:
+            self._gauges = {}
+        self.maybe_flush(force=True, collect=False)
+
+    def collect(self) -> Dict:
+        """全ワーカーのスナップショットを合算する (metrics_dir が無い場合はこのプロセスの値)。"""
+        if not self.metrics_dir:
+            self._run_collectors()
+            return self.snapshot()
+        self.maybe_flush(force=True)
+        counters, gauges, histograms = {}, {}, {}
+        for path in glob.glob(os.path.join(self.metrics_dir, "metrics-*.json")):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in snapshot.get("counters", []):
+                key = (name, _label_key(labels))
+                counters[key] = counters.get(key, 0) + value
+            # retire() できずに終了したワーカー (強制終了など) のゲージは合算しない
+            gauges_alive = _process_alive(_snapshot_pid(path))
+            for name, labels, value in (snapshot.get("gauges", []) if gauges_alive else []):
+                key = (name, _label_key(labels))
+                gauges[key] = gauges.get(key, 0) + value
+            for name, labels, h in snapshot.get("histograms", []):
+                key = (name, _label_key(labels))
+                merged = histograms.get(key)
+                if merged is None or merged["buckets"] != h["buckets"]:
+                    histograms[key] = dict(h, counts=list(h["counts"]))
+                    continue
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], h["counts"])]
+                merged["sum"] += h["sum"]
+                merged["count"] += h["count"]
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            "gauges": [[name, dict(labels), value] for (name, labels), value in gauges.items()],
+            "histograms": [[name, dict(labels), h] for (name, labels), h in histograms.items()],
+        }
+
+
+def _snapshot_pid(path: str) -> Optional[int]:
+    name = os.path.basename(path)[len("metrics-"):-len(".json")]
+    return int(name) if name.isdigit() else None
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 別ユーザーのプロセスとして存在している
+        return True
+    return True
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict, extra: Optional[Dict] = None) -> str:
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label_value(v)}"' for k, v in items) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus(collected: Dict) -> str:
+    """collect() の結果を Prometheus のテキスト形式 (version 0.0.4) に変換する。"""
+    series: Dict[str, list] = {}
+    for kind in ("counters", "gauges"):
+        for name, labels, value in sorted(collected[kind], key=lambda item: (item[0], _label_key(item[1]))):
+            series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for name, labels, h in sorted(collected["histograms"], key=lambda item: (item[0], _label_key(item[1]))):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for upper, count in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, {'le': upper})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(h['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+
+    output = []
+    for name in sorted(series):
+        metric_type, help_text = _HELP.get(name, ("untyped", name))
+        output.append(f"# HELP {name} {help_text}")
+        output.append(f"# TYPE {name} {metric_type}")
+        output.extend(series[name])
+    return '\n'.join(output) + '\n'
+
+
+def get_registry(app) -> MetricsRegistry:
+    """アプリごとのメトリクスレジストリを返す (初回アクセス時に生成)。"""
+    registry = app.extensions.get('metrics')
+    if registry is None:
+        registry = get_or_create_extension(app, 'metrics', lambda: MetricsRegistry(
+            metrics_dir=app.config.get('METRICS_DIR'),
+            flush_interval=app.config.get('METRICS_FLUSH_SECONDS', 5.0),
+        ))
+    return registry
+
+
+@contextmanager
+def track_call(registry: MetricsRegistry, system: str, operation: str):
+    """
+    外部呼び出し (Datastore RPC / LLM) の回数と所要時間を記録する。
+    リクエスト処理中であれば、そのリクエストの呼び出し回数にも加算する。
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        _record_call(registry, system, operation, outcome, time.perf_counter() - started)
+
+
+def _record_call(registry: MetricsRegistry, system: str, operation: str, outcome: str, elapsed: float):
+    labels = {"system": system, "operation": operation}
+    registry.inc("external_calls_total", dict(labels, outcome=outcome))
+    registry.observe("external_call_duration_seconds", labels, elapsed)
+    if has_request_context():
+        per_request = g.get('_external_calls')
+        if per_request is not None:
+            calls = per_request.setdefault(system, [0, 0.0])
+            calls[0] += 1
+            calls[1] += elapsed
+
+
+class _InstrumentedIterator:
+    """query.fetch() の戻り値のプロキシ。公開 API の pages / __iter__ でページ (RunQuery RPC) の取得を計測する"""
+
+    def __init__(self, iterator, registry):
+        self._iterator = iterator
+        self._registry = registry
+
+    @property
+    def pages(self):
+        pages = self._iterator.pages
+        while True:
+            started = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                # 最後のページの後は RPC を伴わないため記録しない
+                return
+            except Exception:
+                _record_call(self._registry, "datastore", "run_query", "error", time.perf_counter() - started)
+                raise
+            _record_call(self._registry, "datastore", "run_query", "ok", time.perf_counter() - started)
+            yield page
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+    def __getattr__(self, name):
+        return getattr(self._iterator, name)
+
+
+class _InstrumentedQuery:
+    """query.fetch() の結果を _InstrumentedIterator で包むプロキシ"""
+
+    def __init__(self, query, registry):
+        self._query = query
+        self._registry = registry
+
+    def fetch(self, *args, **kwargs):
+        return _InstrumentedIterator(self._query.fetch(*args, **kwargs), self._registry)
+
+    def __getattr__(self, name):
+        return getattr(self._query, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_query', '_registry'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._query, name, value)
+
+
+class _InstrumentedTransaction:
+    """
+    client.transaction() の戻り値のプロキシ。with 文の開始 (BeginTransaction) と終了 (Commit / Rollback)、
+    および begin() / commit() / rollback() の直接呼び出しを計測する。
+    """
+
+    def __init__(self, transaction, registry):
+        self._transaction = transaction
+        self._registry = registry
+
+    def __enter__(self):
+        with track_call(self._registry, "datastore", "begin_transaction"):
+            self._transaction.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with track_call(self._registry, "datastore", "commit" if exc_type is None else "rollback"):
+            return self._transaction.__exit__(exc_type, exc_value, traceback)
+
+    def begin(self, *args, **kwargs):
+        with track_call(self._registry, "datastore", "begin_transaction"):
+            return self._transaction.begin(*args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        with track_call(self._registry, "datastore", "commit"):
+            return self._transaction.commit(*args, **kwargs)
+
+    def rollback(self, *args, **kwargs):
+        with track_call(self._registry, "datastore", "rollback"):
+            return self._transaction.rollback(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._transaction, name)
+
+
+class InstrumentedDatastoreClient:
+    """
+    datastore.Client のプロキシ。RPC を伴うメソッド・クエリのページ取得・トランザクションの開始とコミットを計測する。
+    計測は公開 API の呼び出しを包んで行う (ライブラリの内部メソッドは差し替えない)。
+    トランザクション・バッチの中の put / delete は RPC を伴わない (コミット時に送られる) ため計測しない。
+    それ以外 (key() など) はそのまま元のクライアントに委譲する。
+    """
+
+    def __init__(self, client, registry: MetricsRegistry):
+        self._client = client
+        self._registry = registry
+
+    @property
+    def wrapped(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in DATASTORE_RPC_METHODS:
+            def _timed(*args, **kwargs):
+                if name in _BATCHED_METHODS and getattr(self._client, 'current_batch', None) is not None:
+                    return attr(*args, **kwargs)
+                with track_call(self._registry, "datastore", name):
+                    return attr(*args, **kwargs)
+            return _timed
+        return attr
+
+    def query(self, *args, **kwargs):
+        return _InstrumentedQuery(self._client.query(*args, **kwargs), self._registry)
+
+    def transaction(self, *args, **kwargs):
+        return _InstrumentedTransaction(self._client.transaction(*args, **kwargs), self._registry)
+
+
+def instrument_datastore_client(client, registry: MetricsRegistry):
+    if client is None or isinstance(client, InstrumentedDatastoreClient):
+        return client
+    return InstrumentedDatastoreClient(client, registry)
+
+
+def _collect_cache_stats(app, registry: MetricsRegistry):
+    """
+    app.extensions のキャッシュ (stats() を持つもの) の統計を累積値として記録する。
+    init_app で collector として登録し、各ワーカーがスナップショットを書き出すたびに呼ばれる。
+    """
+    for extension_name, extension in list(app.extensions.items()):
+        stats_method = getattr(extension, 'stats', None)
+        if not callable(stats_method):
+            continue
+        try:
+            stats = stats_method()
+        except Exception:
+            continue
+        named_stats = {extension_name: stats} if 'hits' in stats else \
+            {f"{extension_name}.{sub}": value for sub, value in stats.items() if isinstance(value, dict)}
+        for cache_name, values in named_stats.items():
+            for event in ("hits", "misses", "evictions", "expirations"):
+                if event in values:
+                    registry.set_counter("cache_events_total", {"cache": cache_name, "event": event}, values[event])
+            if "size" in values:
+                registry.set_gauge("cache_entries", {"cache": cache_name}, values["size"])
+
+
+def init_app(app):
+    """リクエストごとの計測フックを登録する。"""
+    registry = get_registry(app)
+    registry.add_collector(functools.partial(_collect_cache_stats, app))
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_started = time.perf_counter()
+        g._external_calls = {}
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.get('_metrics_started')
+        if started is None:
+            return response
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        # 登録名にはプロセスIDが含まれるものがあるため、ワーカー間で集計できるよう Blueprint 自体の名前を使う
+        blueprint = app.blueprints.get(request.blueprint) if request.blueprint else None
+        labels = {"blueprint": blueprint.name if blueprint is not None else "", "route": rule, "method": request.method}
+        request_size = request.content_length
+        external_calls = g.get('_external_calls') or {}
+        status = response.status_code
+        streamed = response.is_streamed
+
+        def _record():
+            elapsed = time.perf_counter() - started
+            registry.inc("http_requests_total", dict(labels, status=str(status)))
+            registry.observe("http_request_duration_seconds", labels, elapsed)
+            if request_size is not None:
+                registry.observe("http_request_size_bytes", labels, request_size, SIZE_BUCKETS)
+            if not streamed and response.content_length is not None:
+                registry.observe("http_response_size_bytes", labels, response.content_length, SIZE_BUCKETS)
+            for system in ("datastore", "llm"):
+                calls = external_calls.get(system, (0, 0.0))
+                registry.observe("http_request_external_calls", dict(labels, system=system), calls[0], COUNT_BUCKETS)
+            registry.maybe_flush()
+
+        if streamed:
+            # ストリーミング応答は本文を送り終えた時点の所要時間を記録する
+            response.call_on_close(_record)
+        else:
+            _record()
+        return response
+
+    return registry
+
+
+def render_app_metrics(app) -> str:
+    """全ワーカーの合算 (キャッシュ統計は collector で取り込み済み) を Prometheus 形式で返す。"""
+    return render_prometheus(get_registry(app).collect())
@@ -0,0 +1,277 @@
+# app/schemas.py
+
+"""
+Datastore に書き込むエンティティのスキーマ (kind ごとのプロパティの型とインデックス有無)。
+
+Datastore はプロパティを既定で全てインデックスするため、本文や JSON などの長い値にも書き込みのたびに
+インデックス行の更新が発生し、1500 バイトを超える文字列はインデックスできずに書き込みが失敗する。
+ここで宣言したスキーマを通して Entity を組み立て、クエリ (フィルタ・並び替え) に使うプロパティだけをインデックスする。
+
+  entity = EMPLOYEE_EVENT.to_entity(key, {...})
+
+- indexed=True のプロパティ以外は exclude_from_indexes に入る (スキーマに無いプロパティもインデックスしない)。
+- 値は coerce で保存用の型に変換する (例: ISO 8601 文字列 → UTC の datetime, dict → JSON 文字列)。
+- 既存のエンティティは `invoke migrate-entity-schemas` で現在のスキーマに合わせて書き直す。
+
+インデックスするプロパティを追加した場合は、既存のエンティティを書き直すまでそのプロパティのクエリに載らない点に注意する。
+"""
+
+import json
+from dataclasses import dataclass, field
+from functools import cached_property
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from google.cloud import datastore
+
+
+class SchemaError(ValueError):
+    """値をスキーマの型に変換できない"""
+
+
+# --- 型の変換 (None はそのまま保存する) ---
+
+def _nullable(coerce: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def _coerce(value):
+        return None if value is None else coerce(value)
+    _coerce.__name__ = coerce.__name__
+    return _coerce
+
+
+@_nullable
+def string(value) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+@_nullable
+def integer(value) -> int:
+    if isinstance(value, bool):
+        raise SchemaError(f"Expected an integer, got {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise SchemaError(f"Expected an integer, got {value!r}")
+
+
+@_nullable
+def boolean(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+@_nullable
+def timestamp(value) -> datetime:
+    """datetime または ISO 8601 文字列を UTC の datetime にする (タイムゾーンなしは UTC とみなす)。"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise SchemaError(f"Expected an ISO 8601 timestamp, got {value!r}")
+    if not isinstance(value, datetime):
+        raise SchemaError(f"Expected a datetime, got {value!r}")
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@_nullable
+def json_text(value) -> str:
+    """dict / list を JSON 文字列にする (既に文字列の場合はそのまま)。"""
+    if isinstance(value, str):
+        return value
+    try:
+        return json.dumps(value, ensure_ascii=False)
+    except TypeError as e:
+        raise SchemaError(f"Value is not JSON serializable: {e}")
+
+
+@_nullable
+def string_list(value) -> list:
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return [None if item is None else string(item) for item in value]
+
+
+@_nullable
+def embedded(value):
+    """dict (と dict のリスト) を埋め込みエンティティにする。埋め込み側のプロパティもインデックスしない。"""
+    if isinstance(value, (list, tuple)):
+        return [embedded(item) for item in value]
+    if isinstance(value, dict):
+        entity = datastore.Entity(exclude_from_indexes=tuple(value.keys()))
+        entity.update({name: embedded(item) for name, item in value.items()})
+        return entity
+    return value
+
+
+def _identity(value):
+    return value
+
+
+@dataclass(frozen=True)
+class Property:
+    coerce: Callable[[Any], Any] = _identity
+    indexed: bool = False
+
+
+@dataclass(frozen=True)
+class EntitySchema:
+    kind: str
+    properties: Dict[str, Property] = field(default_factory=dict)
+
+    @cached_property
+    def indexed_properties(self):
+        return frozenset(name for name, prop in self.properties.items() if prop.indexed)
+
+    def coerce(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        coerced = {}
+        for name, value in values.items():
+            prop = self.properties.get(name)
+            try:
+                coerced[name] = prop.coerce(value) if prop else value
+            except SchemaError as e:
+                raise SchemaError(f"{self.kind}.{name}: {e}")
+        return coerced
+
+    def to_entity(self, key, values: Dict[str, Any], coerce: bool = True) -> datastore.Entity:
+        """
+        key と値から、インデックス設定と型変換を適用した Entity を作る。
+        値が既に保存用の型になっている場合 (モデルの to_entity など) は coerce=False で型変換を省く。
+        """
+        if key.kind != self.kind:
+            raise SchemaError(f"Key kind '{key.kind}' does not match schema '{self.kind}'")
+        coerced = self.coerce(values) if coerce else values
+        entity = datastore.Entity(key=key, exclude_from_indexes=tuple(
+            name for name in coerced if name not in self.indexed_properties))
+        entity.update(coerced)
+        return entity
+
+    def conform(self, entity: datastore.Entity) -> datastore.Entity:
+        """既存のエンティティを現在のスキーマで組み立て直す (マイグレーション用)。"""
+        return self.to_entity(entity.key, dict(entity))
+
+    def conforms(self, entity: datastore.Entity) -> bool:
+        """インデックス設定がスキーマと一致しているか (読み込んだエンティティは exclude_from_indexes を保持している)。"""
+        expected = {name for name in entity if name not in self.indexed_properties}
+        return set(entity.exclude_from_indexes) == expected
+
+
+# --- kind ごとのスキーマ ---
+# indexed=True はクエリのフィルタ・並び替え (index.yaml を含む) に使うプロパティのみ。
+
+EMPLOYEE = EntitySchema('employees', {
+    # 話者の解決 (app/meeting_summary/speakers.py) の projection クエリ (name, email) で読む
+    'name': Property(string, indexed=True),
+    'email': Property(string, indexed=True),
+    'role': Property(string),
+})
+
+EMPLOYEE_EVENT = EntitySchema('employee_event', {
+    # GET /employees/<id>/events のフィルタと並び替え (index.yaml)
+    'timestamp': Property(timestamp, indexed=True),
+    'event_type': Property(string, indexed=True),
+    'description': Property(string),
+    'details': Property(json_text),
+    'created_at': Property(timestamp),
+    'updated_at': Property(timestamp),
+})
+
+EMPLOYEE_EVENT_ROLLUP = EntitySchema('employee_event_rollup', {
+    # 月ごと・シャードごとに1つ (キー名 <YYYY-MM>-s<n>)。読み取りは ancestor クエリのため month はインデックスしない
+    'month': Property(string),
+    'total': Property(integer),
+    'counts': Property(json_text),
+    'updated_at': Property(timestamp),
+})
+
+GOOGLE_MEET_EMPLOYEE_MAP = EntitySchema('google_meet_employee_map', {
+    'email': Property(string),
+    'google_meet_name': Property(string),
+    # 双方向インデックスの差分読み込み (updated_at >= 前回の同期時刻)
+    'updated_at': Property(timestamp, indexed=True),
+})
+
+MEETING_SUMMARY = EntitySchema('1on1_summaries', {
+    'meeting_date': Property(string),
+    'employee_name': Property(string_list),
+    # GET /meeting-summary/summaries のフィルタと並び替え (index.yaml)
+    'employee_ids': Property(string_list, indexed=True),
+    'purpose': Property(string),
+    'overall_summary': Property(string),
+    'decisions': Property(embedded),
+    'action_items': Property(embedded),
+    'speakers': Property(embedded),
+    'createdAt': Property(timestamp, indexed=True),
+})
+
+ACTION_ITEM = EntitySchema('action_items', {
+    # GET /meeting-summary/action-items のフィルタと並び替え (index.yaml)
+    'assignee': Property(string, indexed=True),
+    'due_date': Property(string, indexed=True),  # YYYY-MM-DD (読めない期限は None)
+    'status': Property(string, indexed=True),
+    'meeting_id': Property(string),
+    'action': Property(string),
+    'due_date_text': Property(string),  # LLM が出力したままの期限
+    'created_at': Property(timestamp),
+    'updated_at': Property(timestamp),
+})
+
+MEETING_SUMMARY_JOB = EntitySchema('meeting_summary_jobs', {
+    # ジョブはキー (job_id) でのみ読む
+    'status': Property(string),
+    # ジョブの時刻はレスポンスでそのまま返す ISO 8601 文字列で保存する
+    'created_at': Property(string),
+    'updated_at': Property(string),
+    'http_status': Property(integer),
+    'result': Property(json_text),
+})
+
+MEETING_SUMMARY_CACHE = EntitySchema('meeting_summary_cache', {
+    'summary': Property(json_text),
+    # 読み込み時に有効期限の判定に使う (キーでのみ読むためインデックスしない)
+    'created_at': Property(timestamp),
+})
+
+SLACK_UNDELIVERED = EntitySchema('slack_undelivered', {
+    'channel': Property(string),
+    'text': Property(string),
+    'error': Property(string),
+    'attempts': Property(integer),
+    'created_at': Property(timestamp),
+})
+
+# 再送しても成功しない (429 以外の 4xx・恒久的な Slack API エラー) ため再投入しないメッセージ
+SLACK_DEAD_LETTER = EntitySchema('slack_dead_letters', dict(SLACK_UNDELIVERED.properties))
+
+IDEMPOTENCY_RECORD = EntitySchema('idempotency_keys', {
+    'state': Property(string),  # in_progress / completed
+    'status_code': Property(integer),
+    'body': Property(),  # レスポンス本文 (bytes)
+    'headers': Property(string_list),  # "Name: value"
+    'fingerprint': Property(string),  # リクエスト本文の SHA-256
+    'locked_at': Property(timestamp),
+    'created_at': Property(timestamp),
+    # TTL ポリシーの対象 (期限切れのエンティティは Datastore が削除する)
+    'expires_at': Property(timestamp),
+})
+
+API_KEY = EntitySchema('api_keys', {
+    # invoke revoke-api-keys のフィルタ
+    'client_id': Property(string, indexed=True),
+    'description': Property(string),
+    'disabled': Property(boolean),
+    'disabled_at': Property(timestamp),
+    'created_at': Property(timestamp),
+    'expires_at': Property(timestamp),
+})
+
+SCHEMAS = {schema.kind: schema for schema in (
+    EMPLOYEE, EMPLOYEE_EVENT, EMPLOYEE_EVENT_ROLLUP, GOOGLE_MEET_EMPLOYEE_MAP, MEETING_SUMMARY, ACTION_ITEM,
+    MEETING_SUMMARY_JOB, MEETING_SUMMARY_CACHE, SLACK_UNDELIVERED, SLACK_DEAD_LETTER, IDEMPOTENCY_RECORD,
+    API_KEY,
+)}
+
+
+def get_schema(kind: str) -> Optional[EntitySchema]:
+    return SCHEMAS.get(kind)
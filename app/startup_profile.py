@@ -0,0 +1,51 @@
+# app/startup_profile.py
+
+import importlib
+import sys
+import time
+from typing import Dict, List
+
+
+class StartupProfile:
+    """
+    create_app() の所要時間をフェーズ (設定読み込み・Blueprint登録など) ごと、
+    およびフェーズ内で読み込んだモジュールごとに記録する。
+    記録は app.extensions['startup_profile'] に保存され、GET /_startup/profile で参照できる。
+    """
+
+    def __init__(self):
+        self._started = self._last_mark = time.perf_counter()
+        self._finished = None
+        self.phases: List[Dict] = []
+        self.imports: List[Dict] = []
+
+    def mark(self, phase: str):
+        """直前の mark() (最初は生成時) からの経過時間を phase の所要時間として記録する。"""
+        now = time.perf_counter()
+        self.phases.append({"phase": phase, "ms": round((now - self._last_mark) * 1000, 2)})
+        self._last_mark = now
+
+    def import_module(self, name: str):
+        """モジュールをインポートし、所要時間と新たに読み込まれた (依存先を含む) モジュール数を記録する。"""
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports.append({
+            "module": name,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "new_modules": len(sys.modules) - modules_before,
+        })
+        return module
+
+    def finish(self):
+        self._finished = time.perf_counter()
+        if self._finished > self._last_mark:
+            self.mark("other")
+
+    def report(self) -> Dict:
+        finished = self._finished if self._finished is not None else time.perf_counter()
+        return {
+            "total_ms": round((finished - self._started) * 1000, 2),
+            "phases": list(self.phases),
+            "imports": sorted(self.imports, key=lambda item: item["ms"], reverse=True),
+        }
@@ -0,0 +1,121 @@
+# gunicorn.conf.py
+#
+# 使い方: gunicorn -c gunicorn.conf.py "app:create_app()"
+#
+# - preload_app: マスターで create_app() とモジュールのインポートを1回だけ行い、ワーカーは fork で
+#   コピーオンライトに共有する (ワーカーごとのメモリが減る)。
+# - gRPC のチャネルは fork をまたいで使えないため、Datastore クライアントと Generative AI の設定は
+#   post_fork で各ワーカーに作り直させる (app.reset_after_fork)。
+# - ワーカー数は CPU 数 (cgroup のクォータを考慮) と、メモリ上限 / GUNICORN_WORKER_MEMORY_MB の小さい方。
+#   スレッド数は GUNICORN_MAX_CONCURRENCY (インスタンス全体の同時リクエスト数) をワーカーで分ける。
+# - ワーカーごとの LLM の同時呼び出し数 (LLM_MAX_CONCURRENCY) も同じ予算から、スレッド数の LLM_THREAD_SHARE とする。
+
+import gc
+import glob
+import math
+import os
+
+
+def _read_first_line(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _available_cpus():
+    """cgroup の CPU クォータ (v2: cpu.max, v1: cfs_quota_us) と CPU アフィニティから使える CPU 数を求める。"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota, period = None, None
+    cpu_max = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if cpu_max and not cpu_max.startswith('max'):
+        quota, period = (int(v) for v in cpu_max.split()[:2])
+    else:
+        v1_quota = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        v1_period = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if v1_quota and v1_period and int(v1_quota) > 0:
+            quota, period = int(v1_quota), int(v1_period)
+    if quota and period:
+        cpus = min(cpus, max(1, math.ceil(quota / period)))
+    return max(1, cpus)
+
+
+def _memory_limit_mb():
+    """cgroup のメモリ上限 (MB)。上限が無い場合は None。"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read_first_line(path)
+        if value and value != 'max':
+            limit = int(value)
+            # cgroup v1 の「無制限」は非常に大きな値になる
+            if limit < 1 << 50:
+                return limit // (1024 * 1024)
+    return None
+
+
+def _derive_workers():
+    if os.environ.get('GUNICORN_WORKERS'):
+        return int(os.environ['GUNICORN_WORKERS'])
+    workers = _available_cpus()
+    memory_mb = _memory_limit_mb()
+    if memory_mb:
+        per_worker_mb = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 256))
+        # マスターとモジュールの共有分として1ワーカー分を残す
+        workers = min(workers, max(1, memory_mb // per_worker_mb - 1))
+    return max(1, workers)
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = True
+worker_class = 'gthread'
+workers = _derive_workers()
+threads = int(os.environ.get('GUNICORN_THREADS') or
+              max(4, math.ceil(int(os.environ.get('GUNICORN_MAX_CONCURRENCY', 40)) / workers)))
+# LLM_MAX_CONCURRENCY が指定されていなければスレッド数の LLM_THREAD_SHARE (既定 0.6) とし、短いリクエスト用のスレッドを
+# 最低 1 つ残す。ワーカー数に関わらずインスタンス全体で GUNICORN_MAX_CONCURRENCY を超えない。
+# preload_app の create_app() はこのファイルの読み込み後に実行されるため、環境変数で渡す
+llm_max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY') or
+                          max(1, min(threads - 1, math.ceil(threads * float(os.environ.get('LLM_THREAD_SHARE', 0.6))))))
+os.environ['LLM_MAX_CONCURRENCY'] = str(llm_max_concurrency)
+# 応答しなくなったワーカーを再起動するまでの秒数。最も長い要約 (Cloud Run のリクエストタイムアウト 300 秒,
+# cloudbuild.yaml) より長くし、処理中の要約を打ち切らないようにする。0 で無効
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 360))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# ハートビート用の一時ファイルをディスクではなくメモリに置く (コンテナのオーバーレイFSでの遅延を避ける)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+accesslog = '-'
+
+
+def on_starting(server):
+    # 前回の起動時のワーカーのメトリクスを合算しないよう、スナップショットを消しておく
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    server.log.info(f"Starting with {workers} worker(s) x {threads} thread(s), "
+                    f"{llm_max_concurrency} LLM call(s) per worker "
+                    f"(cpus: {_available_cpus()}, memory limit: {_memory_limit_mb()} MB)")
+
+
+def pre_fork(server, worker):
+    # 読み込み済みのオブジェクトを GC の対象から外し、GC がワーカー側で共有ページに書き込まないようにする
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import reset_after_fork
+    reset_after_fork(worker.app.wsgi())
+
+
+def worker_exit(server, worker):
+    # 終了したワーカーのゲージ (キャッシュのエントリ数など) が合算され続けないよう消しておく
+    metrics = worker.app.wsgi().extensions.get('metrics')
+    if metrics is not None:
+        metrics.retire()
@@ -466,4 +466,524 @@ def test_google_meet_map_local(c):
         body = response.text if response and hasattr(response, 'text') else "No response object"
         print(f"Google Meet mapping API (LOCAL) FAILED. Status: {status}")
         print(f"Response body: {body}")
-        return False
\ No newline at end of file
+        return False
+
+# --- 起動時間の計測 ---
+
+_STARTUP_PROFILE_SCRIPT = (
+    "import json, time; t = time.perf_counter(); "
+    "from app import create_app; app = create_app(); "
+    "report = app.extensions['startup_profile'].report(); "
+    "report['import_and_create_ms'] = round((time.perf_counter() - t) * 1000, 2); "
+    "print('STARTUP_PROFILE ' + json.dumps(report))"
+)
+
+
+def _parse_importtime(stderr_text):
+    """python -X importtime の出力を [{module, self_us, cumulative_us}] に変換する"""
+    modules = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            modules.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                            "top_level": not name.startswith('   ')})
+        except ValueError:
+            continue
+    return modules
+
+
+@task(help={
+    'top': "表示するモジュール数 (累積時間の大きい順)",
+    'output': "結果をJSONで書き出すファイル",
+    'max_ms': "import + create_app() の合計がこの値 (ms) を超えたら失敗させる (回帰テスト用)",
+})
+def startup_profile(c, top=20, output=None, max_ms=None):
+    """Measures cold-start time: per-module import time and create_app() phases."""
+    import sys
+    env_vars = os.environ.copy()
+    env_vars['PYTHONDONTWRITEBYTECODE'] = '1'
+    result = c.run(f'"{sys.executable}" -X importtime -c "{_STARTUP_PROFILE_SCRIPT}"',
+                   env=env_vars, hide=True, warn=True)
+    if not result.ok:
+        print(f"create_app() failed:\n{result.stderr[-2000:]}")
+        sys.exit(1)
+
+    report = None
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_PROFILE '):
+            report = json.loads(line[len('STARTUP_PROFILE '):])
+    if report is None:
+        print("Startup profile was not reported by create_app().")
+        sys.exit(1)
+
+    modules = _parse_importtime(result.stderr)
+    # 直接インポートされたパッケージ (インデントの浅いもの) を累積時間順に並べる
+    top_level = sorted((m for m in modules if m["top_level"]), key=lambda m: m["cumulative_us"], reverse=True)
+    report["modules"] = [{"module": m["module"], "cumulative_ms": round(m["cumulative_us"] / 1000, 2),
+                          "self_ms": round(m["self_us"] / 1000, 2)} for m in top_level[:int(top)]]
+    report["loaded_modules"] = len(modules)
+
+    print(f"import + create_app(): {report['import_and_create_ms']} ms (create_app: {report['total_ms']} ms)")
+    for phase in report["phases"]:
+        print(f"  {phase['phase']:<32} {phase['ms']:>10.2f} ms")
+    print("Slowest imports (cumulative):")
+    for module in report["modules"]:
+        print(f"  {module['module']:<48} {module['cumulative_ms']:>10.2f} ms")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Wrote startup profile to {output}")
+
+    if max_ms is not None and report['import_and_create_ms'] > float(max_ms):
+        print(f"Startup time {report['import_and_create_ms']} ms exceeds the budget of {max_ms} ms.")
+        sys.exit(1)
+
+
+# --- APIキーの管理 ---
+
+def _datastore_client():
+    from google.cloud import datastore
+    project_id = os.getenv('GOOGLE_CLOUD_PROJECT')
+    return datastore.Client(project=project_id) if project_id else datastore.Client()
+
+
+@task(help={
+    'client_id': "キーを発行するクライアントの識別子 (ログや g.api_client_id に使われる)",
+    'description': "キーの用途のメモ",
+    'expires_days': "有効期限 (日数)。省略時は無期限",
+})
+def create_api_key(c, client_id, description='', expires_days=None):
+    """Issues a new API key for a client and stores its SHA-256 hash in Datastore (api_keys)."""
+    import secrets
+    from datetime import timedelta
+    from app.auth import API_KEY_KIND, hash_api_key
+    from app.schemas import API_KEY
+
+    raw_key = secrets.token_urlsafe(32)
+    db_client = _datastore_client()
+    now = datetime.now(timezone.utc)
+    entity = API_KEY.to_entity(db_client.key(API_KEY_KIND, hash_api_key(raw_key)), {
+        "client_id": client_id,
+        "description": description,
+        "disabled": False,
+        "created_at": now,
+        "expires_at": now + timedelta(days=int(expires_days)) if expires_days else None,
+    })
+    db_client.put(entity)
+    print(f"Created API key for client '{client_id}'. Store it now; it cannot be shown again:")
+    print(raw_key)
+
+
+@task(help={'client_id': "無効にするクライアントの識別子 (そのクライアントの全てのキーが対象)"})
+def revoke_api_keys(c, client_id):
+    """Disables every API key of a client (takes effect within AUTH_KEY_CACHE_TTL_SECONDS)."""
+    from google.cloud.datastore.query import PropertyFilter
+    from app.auth import API_KEY_KIND
+    from app.schemas import API_KEY
+
+    db_client = _datastore_client()
+    query = db_client.query(kind=API_KEY_KIND)
+    query.add_filter(filter=PropertyFilter("client_id", "=", client_id))
+    entities = [API_KEY.to_entity(entity.key, dict(entity, disabled=True, disabled_at=datetime.now(timezone.utc)))
+                for entity in query.fetch() if not entity.get("disabled")]
+    if entities:
+        db_client.put_multi(entities)
+    print(f"Disabled {len(entities)} API key(s) for client '{client_id}'.")
+
+
+# --- アクションアイテムの索引 ---
+
+@task(help={
+    'batch_size': "1回の put_multi で書き込むアクションアイテムの最大件数 (最大 500)",
+    'dry_run': "書き込まずに、追加されるアクションアイテムの件数だけを表示する",
+})
+def backfill_action_items(c, batch_size=500, dry_run=False):
+    """Writes action_items entities for summaries saved before the action-item index existed."""
+    from app.meeting_summary.action_items import build_action_item_entities
+    from app.meeting_summary.models import MeetingSummary
+    from app.schemas import MEETING_SUMMARY
+
+    db_client = _datastore_client()
+    now = datetime.now(timezone.utc)
+    batch_size = min(int(batch_size), 500)
+    scanned, written = 0, 0
+
+    def _flush(entities):
+        # 既にあるもの (状態を更新済みのものを含む) は上書きしない
+        existing = {entity.key for entity in db_client.get_multi([entity.key for entity in entities])}
+        missing = [entity for entity in entities if entity.key not in existing]
+        if missing and not dry_run:
+            db_client.put_multi(missing)
+        return len(missing)
+
+    pending = []
+    for summary_entity in db_client.query(kind=MEETING_SUMMARY.kind).fetch():
+        scanned += 1
+        summary = MeetingSummary.from_entity(summary_entity)
+        pending.extend(build_action_item_entities(db_client, summary_entity.key, summary, now))
+        while len(pending) >= batch_size:
+            written += _flush(pending[:batch_size])
+            pending = pending[batch_size:]
+    if pending:
+        written += _flush(pending)
+    action = "would write" if dry_run else "wrote"
+    print(f"Scanned {scanned} summaries, {action} {written} action item(s).")
+
+
+# --- 従業員イベントの集計 ---
+
+@task(help={
+    'employee_id': "集計を作り直す従業員の ID。省略時は全従業員",
+    'utc_offset_hours': "日付の集計に使う UTC からの時差 (アプリの EVENT_ROLLUP_UTC_OFFSET_HOURS と同じ値にする)",
+})
+def rebuild_event_rollups(c, employee_id=None, utc_offset_hours=None):
+    """Recounts employee events and rewrites the per-employee monthly rollups (employee_event_rollup)."""
+    from app.employees.rollups import rebuild_rollup
+
+    utc_offset_hours = int(utc_offset_hours or os.getenv('EVENT_ROLLUP_UTC_OFFSET_HOURS', 9))
+    db_client = _datastore_client()
+    if employee_id:
+        employee_ids = [employee_id]
+    else:
+        query = db_client.query(kind='employees')
+        query.keys_only()
+        employee_ids = [entity.key.name for entity in query.fetch()]
+
+    now = datetime.now(timezone.utc)
+    for target_id in employee_ids:
+        total = rebuild_rollup(db_client, target_id, utc_offset_hours, now)
+        print(f"Rebuilt event rollup for employee '{target_id}': {total} event(s).")
+    print(f"Rebuilt event rollups for {len(employee_ids)} employee(s).")
+
+
+# --- エンティティのスキーマ (app/schemas.py) ---
+
+@task(help={
+    'kind': "対象の kind (省略時は app/schemas.py の全ての kind)",
+    'batch_size': "1トランザクションで書き直す件数 (最大 500)",
+    'dry_run': "書き込まずに、書き直しが必要な件数だけを表示する",
+})
+def migrate_entity_schemas(c, kind=None, batch_size=500, dry_run=False):
+    """Rewrites existing entities with the index settings and value types declared in app/schemas.py."""
+    import sys
+    from app.schemas import SCHEMAS, SchemaError
+
+    if kind and kind not in SCHEMAS:
+        print(f"Unknown kind '{kind}'. Known kinds: {', '.join(sorted(SCHEMAS))}")
+        sys.exit(1)
+    batch_size = min(int(batch_size), 500)
+    db_client = _datastore_client()
+
+    def _needs_rewrite(schema, entity):
+        return not schema.conforms(entity) or schema.coerce(dict(entity)) != dict(entity)
+
+    def _rewrite(schema, keys):
+        # 読み込みと書き込みの間に更新されたエンティティを古い値で上書きしないよう、トランザクション内で読み直す
+        with db_client.transaction():
+            entities = [schema.conform(entity) for entity in db_client.get_multi(keys)
+                        if _needs_rewrite(schema, entity)]
+            if entities:
+                db_client.put_multi(entities)
+        return len(entities)
+
+    for schema in ([SCHEMAS[kind]] if kind else SCHEMAS.values()):
+        scanned, pending, rewritten, failed = 0, [], 0, 0
+        for entity in db_client.query(kind=schema.kind).fetch():
+            scanned += 1
+            try:
+                if not _needs_rewrite(schema, entity):
+                    continue
+            except SchemaError as e:
+                failed += 1
+                print(f"  {entity.key.flat_path}: {e}")
+                continue
+            pending.append(entity.key)
+            if len(pending) >= batch_size:
+                rewritten += len(pending) if dry_run else _rewrite(schema, pending)
+                pending = []
+        if pending:
+            rewritten += len(pending) if dry_run else _rewrite(schema, pending)
+        action = "would rewrite" if dry_run else "rewrote"
+        print(f"{schema.kind}: scanned {scanned}, {action} {rewritten}, failed {failed}.")
+
+
+# --- 負荷試験 (Datastore エミュレータ + スタブ LLM / Slack) ---
+#
+# 1. invoke datastore-emulator           (別ターミナル, gcloud の Datastore エミュレータ)
+# 2. invoke stub-slack                   (別ターミナル, Slack API の代わりに {"ok": true} を返す)
+# 3. invoke run-bench-server             (別ターミナル, GENAI_BACKEND=stub でサーバーを起動)
+# 4. invoke load-test --endpoint all --output bench/current.json
+# 5. invoke bench-compare --baseline bench/baseline.json --current bench/current.json
+
+BENCH_PROJECT_ID = os.getenv('BENCH_PROJECT_ID', 'myutil-bench')
+BENCH_EMULATOR_HOST = os.getenv('BENCH_EMULATOR_HOST', 'localhost:8081')
+BENCH_SLACK_PORT = int(os.getenv('BENCH_SLACK_PORT', 8099))
+BENCH_SCENARIOS = ('employees', 'events', 'google_meet_map', 'meeting_summary')
+
+
+@task(help={'host_port': "エミュレータの待ち受けアドレス"})
+def datastore_emulator(c, host_port=BENCH_EMULATOR_HOST):
+    """Starts the Datastore emulator (in memory) for load tests."""
+    print(f"Starting Datastore emulator on {host_port} (project: {BENCH_PROJECT_ID})...")
+    c.run(f'gcloud beta emulators datastore start --host-port={host_port} --no-store-on-disk '
+          f'--consistency=1.0 --project={BENCH_PROJECT_ID}', pty=True)
+
+
+@task(help={'port': "待ち受けポート", 'latency': "応答までの待ち時間 (秒)"})
+def stub_slack(c, port=BENCH_SLACK_PORT, latency=0.05):
+    """Runs a local stand-in for the Slack chat.postMessage API that always answers ok."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import time as _time
+
+    class _SlackHandler(BaseHTTPRequestHandler):
+        received = 0
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            _time.sleep(float(latency))
+            _SlackHandler.received += 1
+            body = json.dumps({"ok": True, "ts": f"{_time.time():.6f}"}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if _SlackHandler.received % 100 == 0:
+                print(f"stub-slack: {_SlackHandler.received} messages received")
+
+    print(f"Stub Slack API listening on http://127.0.0.1:{port}/api/chat.postMessage")
+    ThreadingHTTPServer(('127.0.0.1', int(port)), _SlackHandler).serve_forever()
+
+
+@task(help={
+    'port': "サーバーのポート",
+    'workers': "gunicorn のワーカー数",
+    'llm_latency': "スタブ LLM の応答時間 (秒)",
+})
+def run_bench_server(c, port=None, workers=1, llm_latency=0.5):
+    """Starts the API with gunicorn against the Datastore emulator, the stub LLM and the stub Slack API."""
+    port = port or (API_BASE_URL.split(':')[-1] if ':' in API_BASE_URL else '5000')
+    env_vars = os.environ.copy()
+    env_vars.update({
+        'DATASTORE_EMULATOR_HOST': BENCH_EMULATOR_HOST,
+        'GOOGLE_CLOUD_PROJECT': BENCH_PROJECT_ID,
+        'GENAI_BACKEND': 'stub',
+        'GENAI_STUB_LATENCY_SECONDS': str(llm_latency),
+        'SLACK_API_URL': f'http://127.0.0.1:{BENCH_SLACK_PORT}/api/chat.postMessage',
+        'SLACK_TOKEN': 'xoxb-stub',
+        'SLACK_CHANNEL': 'bench',
+        'SECRET_AUTH_KEY': str(SECRET_AUTH_KEY) if SECRET_AUTH_KEY else '',
+    })
+    print(f"Starting bench server on :{port} (emulator: {BENCH_EMULATOR_HOST}, LLM latency: {llm_latency}s)...")
+    env_vars.update({'PORT': str(port), 'GUNICORN_WORKERS': str(workers)})
+    c.run('gunicorn -c gunicorn.conf.py "app:create_app()"', env=env_vars, pty=True)
+
+
+def _percentile(sorted_values, percent):
+    """最近傍順位法による百分位数"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-percent * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _bench_transcript(i, run_id):
+    lines = [f"会議名: 負荷試験 {run_id}-{i}", "日時: 2025-01-15"]
+    for n in range(20):
+        lines.append(f"source_index: {n} 話者{n % 2}: 進捗の報告 {i}-{n} です。")
+    return '\n'.join(lines)
+
+
+def _bench_requests(scenario, count, run_id):
+    """シナリオごとのリクエスト列 [(method, path, json_body)] を作る。前半は書き込み、後半は読み取り。"""
+    requests_list = []
+    writes = max(1, count // 2)
+    for i in range(count):
+        n = i % writes
+        employee_id = f"bench_{run_id}_{n}"
+        if scenario == 'employees':
+            if i < writes:
+                requests_list.append(('POST', f"/employees/{employee_id}",
+                                      {"name": f"Bench {n}", "email": f"bench.{run_id}.{n}@example.com", "role": "bench"}))
+            else:
+                requests_list.append(('GET', f"/employees/{employee_id}", None))
+        elif scenario == 'events':
+            employee_id = f"bench_{run_id}_{n % 10}"
+            if i < writes:
+                requests_list.append(('POST', f"/employees/{employee_id}/events",
+                                      {"event_type": "Bench", "description": f"load test event {i}"}))
+            else:
+                requests_list.append(('GET', f"/employees/{employee_id}/events?limit=20", None))
+        elif scenario == 'google_meet_map':
+            email = f"bench.{run_id}.{n}@example.com"
+            if i < writes:
+                requests_list.append(('POST', f"/google_meet_employee_map/{email}", {"google_meet_name": f"Bench User {n}"}))
+            else:
+                requests_list.append(('GET', f"/google_meet_employee_map?google_meet_name=Bench%20User%20{n}", None))
+        elif scenario == 'meeting_summary':
+            # 要約キャッシュに当たらないよう、リクエストごとに異なる文字起こしを送る
+            requests_list.append(('POST', "/meeting-summary/meeting",
+                                  {"transcript_content": _bench_transcript(i, run_id), "save_to_firestore": True}))
+    return requests_list
+
+
+def _bench_setup(scenario, base_url, auth_key, run_id):
+    """events シナリオ用に、イベントを登録する従業員を先に作成する。"""
+    if scenario != 'events':
+        return
+    records = [{"id": f"bench_{run_id}_{n}", "name": f"Bench {n}", "email": f"bench.{run_id}.{n}@example.com"}
+               for n in range(10)]
+    requests.post(f"{base_url}/employees:batch", json=records, headers={"X-Auth-Key": auth_key}, timeout=30)
+
+
+def _run_load(base_url, auth_key, scenario, request_count, concurrency, run_id, timeout):
+    import threading
+    import time as _time
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    _bench_setup(scenario, base_url, auth_key, run_id)
+    planned = _bench_requests(scenario, request_count, run_id)
+    local = threading.local()
+
+    def _send(item):
+        method, path, body = item
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.headers.update({"X-Auth-Key": auth_key})
+        started = _time.perf_counter()
+        try:
+            response = session.request(method, f"{base_url}{path}", json=body, timeout=timeout)
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            status = f"error:{type(e).__name__}"
+        return (_time.perf_counter() - started) * 1000, status
+
+    # 書き込みを先に終えてから読み取りを流す (読み取り対象が存在するように)
+    writes = [item for item in planned if item[0] == 'POST']
+    reads = [item for item in planned if item[0] != 'POST']
+    results = []
+    started = _time.perf_counter()
+    with ThreadPoolExecutor(max_workers=int(concurrency)) as executor:
+        for phase in (writes, reads):
+            results.extend(executor.map(_send, phase))
+    duration = _time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    statuses = Counter(str(status) for _, status in results)
+    failures = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+    return {
+        "scenario": scenario,
+        "requests": len(results),
+        "concurrency": int(concurrency),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(results) / duration, 2) if duration else None,
+        "latency_ms": {
+            "min": round(latencies[0], 2) if latencies else None,
+            "p50": round(_percentile(latencies, 50), 2) if latencies else None,
+            "p95": round(_percentile(latencies, 95), 2) if latencies else None,
+            "p99": round(_percentile(latencies, 99), 2) if latencies else None,
+            "max": round(latencies[-1], 2) if latencies else None,
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        },
+        "status_counts": dict(statuses),
+        "error_rate": round(failures / len(results), 4) if results else None,
+    }
+
+
+@task(help={
+    'endpoint': f"対象のシナリオ ({', '.join(BENCH_SCENARIOS)} または all)",
+    'requests_count': "シナリオごとのリクエスト数",
+    'concurrency': "同時接続数",
+    'base_url': "対象サーバー (省略時は API_BASE_URL)",
+    'output': "結果を書き出す JSON ファイル",
+    'timeout': "1リクエストのタイムアウト (秒)",
+})
+def load_test(c, endpoint='all', requests_count=200, concurrency=10, base_url=None, output=None, timeout=60):
+    """Drives concurrent load against the local server and reports throughput and p50/p95/p99 latency."""
+    import subprocess
+    import sys
+    import uuid
+
+    base_url = base_url or API_BASE_URL
+    scenarios = BENCH_SCENARIOS if endpoint == 'all' else tuple(s.strip() for s in endpoint.split(','))
+    unknown = [s for s in scenarios if s not in BENCH_SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)}. Choose from {', '.join(BENCH_SCENARIOS)} or all.")
+        sys.exit(1)
+
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        git_commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        git_commit = None
+    report = {
+        "run_id": run_id,
+        "git_commit": git_commit,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "runs": [],
+    }
+
+    for scenario in scenarios:
+        print(f"\n--- Load test: {scenario} ({requests_count} requests, concurrency {concurrency}) ---")
+        result = _run_load(base_url, SECRET_AUTH_KEY, scenario, int(requests_count), int(concurrency), run_id, float(timeout))
+        report["runs"].append(result)
+        latency = result["latency_ms"]
+        print(f"throughput: {result['throughput_rps']} req/s   p50: {latency['p50']} ms   p95: {latency['p95']} ms   "
+              f"p99: {latency['p99']} ms   errors: {result['error_rate']}")
+        print(f"status: {result['status_counts']}")
+
+    if output:
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nWrote results to {output}")
+
+
+@task(help={
+    'baseline': "基準となる load-test の JSON",
+    'current': "比較する load-test の JSON",
+    'max_regression': "p95 の悪化・スループットの低下をこの割合まで許容する (0.15 = 15%)",
+})
+def bench_compare(c, baseline, current, max_regression=0.15):
+    """Compares two load-test result files and fails if p95 latency or throughput regressed."""
+    import sys
+
+    with open(baseline, encoding='utf-8') as f:
+        baseline_runs = {run["scenario"]: run for run in json.load(f)["runs"]}
+    with open(current, encoding='utf-8') as f:
+        current_runs = {run["scenario"]: run for run in json.load(f)["runs"]}
+
+    tolerance = float(max_regression)
+    regressions = []
+    print(f"{'scenario':<18} {'p95 base':>10} {'p95 now':>10} {'change':>8}   {'rps base':>9} {'rps now':>9} {'change':>8}")
+    for scenario, run in current_runs.items():
+        base = baseline_runs.get(scenario)
+        if base is None:
+            print(f"{scenario:<18} (no baseline)")
+            continue
+        p95_base, p95_now = base["latency_ms"]["p95"], run["latency_ms"]["p95"]
+        rps_base, rps_now = base["throughput_rps"], run["throughput_rps"]
+        p95_change = (p95_now - p95_base) / p95_base if p95_base else 0.0
+        rps_change = (rps_now - rps_base) / rps_base if rps_base else 0.0
+        print(f"{scenario:<18} {p95_base:>10} {p95_now:>10} {p95_change:>+8.1%}   {rps_base:>9} {rps_now:>9} {rps_change:>+8.1%}")
+        if p95_change > tolerance:
+            regressions.append(f"{scenario}: p95 latency {p95_change:+.1%}")
+        if rps_change < -tolerance:
+            regressions.append(f"{scenario}: throughput {rps_change:+.1%}")
+
+    if regressions:
+        print("\nRegressions beyond tolerance:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\nNo regressions beyond tolerance.")
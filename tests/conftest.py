@@ -0,0 +1,54 @@
+# tests/conftest.py
+
+import time
+
+import pytest
+
+from app import create_app
+from tests.fakes import FakeDatastoreClient
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # Gemini の代わりに app/genai_stub.py を使い、待ち時間なしで応答させる
+    monkeypatch.setenv('GENAI_BACKEND', 'stub')
+    monkeypatch.setenv('GENAI_STUB_LATENCY_SECONDS', '0')
+    monkeypatch.setenv('SECRET_AUTH_KEY', 'test-secret')
+    monkeypatch.delenv('METRICS_DIR', raising=False)
+    # Slack には投稿しない (投稿するテストは SlackDispatcher を直接使う)
+    monkeypatch.delenv('SLACK_TOKEN', raising=False)
+    monkeypatch.delenv('SLACK_CHANNEL', raising=False)
+    # 従業員 ID の集合をバックグラウンドで読み直さない (Datastore の呼び出しを数えるテストが揺れないように)
+    monkeypatch.setenv('EMPLOYEE_ID_SET_REFRESH_SECONDS', '0')
+    app_instance = create_app()
+    app_instance.config['TESTING'] = True
+    app_instance.db = FakeDatastoreClient()
+    return app_instance
+
+
+@pytest.fixture
+def fake_db(app):
+    return app.db.wrapped
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    return {'X-Auth-Key': app.config['SECRET_AUTH_KEY']}
+
+
+@pytest.fixture
+def wait_for_job(client, auth_headers):
+    """非同期要約ジョブが終わるまでポーリングし、最後の状態を返す。"""
+    def _wait(job_id, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = client.get(f'/meeting-summary/jobs/{job_id}', headers=auth_headers).json
+            if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                return job
+            time.sleep(0.01)
+    return _wait
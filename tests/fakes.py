@@ -0,0 +1,233 @@
+# tests/fakes.py
+
+"""
+テスト用のインメモリ Datastore クライアント (google.cloud.datastore.Client の一部のみ)。
+
+本物の Key / Entity を使い、アプリが使う API (get / get_multi / put / put_multi / delete / query / transaction)
+だけを実装する。calls に RPC 相当の呼び出しを記録するため、RPC 回数をテストできる。
+"""
+
+import itertools
+import operator
+import threading
+
+from google.api_core import exceptions as google_exceptions
+from google.cloud import datastore
+from google.cloud.datastore.key import Key
+
+_OPERATORS = {'=': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+class FakeIterator:
+    def __init__(self, query, limit, start_cursor, page_size):
+        self._query = query
+        self._limit = limit
+        self._start_cursor = start_cursor
+        self._page_size = page_size
+        self.next_page_token = None
+
+    def _offset(self):
+        if not self._start_cursor:
+            return 0
+        cursor = self._start_cursor.decode('ascii') if isinstance(self._start_cursor, bytes) else self._start_cursor
+        if not cursor.isdigit():
+            # 本物と同じく、不正なカーソルは最初のページを読むときに失敗する
+            raise google_exceptions.BadRequest(f"Invalid cursor: {cursor}")
+        return int(cursor)
+
+    @property
+    def pages(self):
+        entities = self._query._matching()
+        start = self._offset()
+        end = len(entities) if self._limit is None else min(len(entities), start + self._limit)
+        position = start
+        while True:
+            page_end = min(end, position + self._page_size)
+            self._query._client.calls.append(('run_query', self._query.kind))
+            page = [self._query._project(entity) for entity in entities[position:page_end]]
+            position = page_end
+            self.next_page_token = str(position).encode('ascii') if position < len(entities) else None
+            yield iter(page)
+            if position >= end:
+                return
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+
+class FakeQuery:
+    def __init__(self, client, kind=None, ancestor=None, projection=()):
+        self._client = client
+        self.kind = kind
+        self.ancestor = ancestor
+        self.filters = []
+        self._order = []
+        self.projection = list(projection)
+        self._keys_only = False
+
+    def add_filter(self, *args, filter=None):
+        if filter is not None:
+            self.filters.append((filter.property_name, filter.operator, filter.value))
+        else:
+            self.filters.append(tuple(args))
+        return self
+
+    def keys_only(self):
+        self._keys_only = True
+
+    @property
+    def order(self):
+        return self._order
+
+    @order.setter
+    def order(self, value):
+        self._order = [value] if isinstance(value, str) else list(value)
+
+    def _matching(self):
+        with self._client.lock:
+            entities = [entity for key, entity in self._client.store.items()
+                        if key.kind == self.kind and (self.ancestor is None or _is_descendant(key, self.ancestor))]
+        for name, op, value in self.filters:
+            compare = _OPERATORS[op]
+            entities = [entity for entity in entities if _matches(entity.get(name), compare, value)]
+        for order in reversed(self._order):
+            name = order.lstrip('-')
+            # Datastore と同じく null は他の値より前に並ぶ
+            entities.sort(key=lambda entity: (entity.get(name) is not None, entity.get(name)), reverse=order.startswith('-'))
+        if self.projection:
+            # projection クエリはインデックスされたプロパティを持つエンティティだけを返す
+            entities = [entity for entity in entities
+                        if all(name in entity and name not in entity.exclude_from_indexes for name in self.projection)]
+        return entities
+
+    def _project(self, entity):
+        if self._keys_only:
+            return datastore.Entity(key=entity.key)
+        if self.projection:
+            projected = datastore.Entity(key=entity.key)
+            projected.update({name: entity[name] for name in self.projection})
+            return projected
+        return _copy(entity)
+
+    def fetch(self, limit=None, start_cursor=None, **kwargs):
+        return FakeIterator(self, limit, start_cursor, page_size=self._client.page_size)
+
+
+class FakeTransaction:
+    def __init__(self, client):
+        self._client = client
+
+    def __enter__(self):
+        self._client.calls.append(('begin_transaction',))
+        self._client._local.transaction = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._client._local.transaction = None
+        self._client.calls.append(('rollback',) if exc_type else ('commit',))
+        return False
+
+    def put(self, entity):
+        self._client.put(entity)
+
+
+class FakeDatastoreClient:
+    project = 'test-project'
+
+    def __init__(self, page_size=300):
+        self.store = {}
+        self.calls = []
+        self.page_size = page_size
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1000)
+        self._local = threading.local()
+
+    def key(self, *path, parent=None):
+        return Key(*path, parent=parent, project=self.project)
+
+    def _in_transaction(self):
+        return getattr(self._local, 'transaction', None) is not None
+
+    @property
+    def current_transaction(self):
+        return getattr(self._local, 'transaction', None)
+
+    @property
+    def current_batch(self):
+        # 本物と同じく、トランザクションもバッチとして扱う
+        return self.current_transaction
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def get(self, key, **kwargs):
+        self.calls.append(('lookup', key.kind))
+        with self.lock:
+            entity = self.store.get(key)
+        return _copy(entity) if entity is not None else None
+
+    def get_multi(self, keys, **kwargs):
+        self.calls.append(('lookup', len(keys)))
+        with self.lock:
+            return [_copy(self.store[key]) for key in keys if key in self.store]
+
+    def put(self, entity):
+        if not self._in_transaction():
+            self.calls.append(('commit_put', entity.key.kind))
+        self._store(entity)
+
+    def put_multi(self, entities):
+        entities = list(entities)
+        if not self._in_transaction():
+            self.calls.append(('commit_put', len(entities)))
+        for entity in entities:
+            self._store(entity)
+
+    def delete(self, key):
+        if not self._in_transaction():
+            self.calls.append(('commit_delete', key.kind))
+        with self.lock:
+            self.store.pop(key, None)
+
+    def delete_multi(self, keys):
+        keys = list(keys)
+        if not self._in_transaction():
+            self.calls.append(('commit_delete', len(keys)))
+        with self.lock:
+            for key in keys:
+                self.store.pop(key, None)
+
+    def query(self, kind=None, ancestor=None, projection=(), **kwargs):
+        return FakeQuery(self, kind=kind, ancestor=ancestor, projection=projection)
+
+    def kind_entities(self, kind):
+        with self.lock:
+            return [entity for key, entity in self.store.items() if key.kind == kind]
+
+    def _store(self, entity):
+        with self.lock:
+            if entity.key.is_partial:
+                entity.key = entity.key.completed_key(next(self._ids))
+            self.store[entity.key] = _copy(entity)
+
+
+def _is_descendant(key, ancestor):
+    parent = key.parent
+    while parent is not None:
+        if parent == ancestor:
+            return True
+        parent = parent.parent
+    return key == ancestor
+
+
+def _matches(actual, compare, value):
+    if isinstance(actual, list):
+        return any(item is not None and compare(item, value) for item in actual)
+    return actual is not None and compare(actual, value)
+
+
+def _copy(entity):
+    copied = datastore.Entity(key=entity.key, exclude_from_indexes=tuple(entity.exclude_from_indexes))
+    copied.update(entity)
+    return copied
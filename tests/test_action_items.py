@@ -0,0 +1,87 @@
+# tests/test_action_items.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.meeting_summary.action_items import ACTION_ITEM_KIND, build_action_item_entities, normalize_due_date
+from app.meeting_summary.models import ActionItem, MeetingSummary
+from app.schemas import MEETING_SUMMARY
+
+TRANSCRIPT = "2025-01-15 1on1\n山田: 来週までに資料を作ります。\n佐藤: お願いします。"
+
+
+@pytest.mark.parametrize('value, expected', [
+    ("2025-06-01", "2025-06-01"),
+    ("2025/6/1", "2025-06-01"),
+    ("2025年6月1日", "2025-06-01"),
+    ("2025-06-01T17:00:00+09:00", "2025-06-01"),
+    ("来週中", None),
+    ("2025-02-30", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_due_date(value, expected):
+    assert normalize_due_date(value) == expected
+
+
+@pytest.fixture
+def action_items(fake_db):
+    """2件の要約に分かれたアクションアイテムを保存する"""
+    now = datetime(2025, 1, 15, tzinfo=timezone.utc)
+    for meeting_id, items in (
+        ("m1", [ActionItem("資料作成", "山田", "2025-01-22"), ActionItem("日程調整", "佐藤", "2025/1/20")]),
+        ("m2", [ActionItem("レビュー", "山田", "2025年1月17日"), ActionItem("共有", "山田", "来週中")]),
+    ):
+        summary = MeetingSummary(meeting_date="2025-01-15", employee_name=["山田"], purpose="", decisions=[],
+                                 action_items=items, overall_summary="")
+        fake_db.put_multi(build_action_item_entities(fake_db, fake_db.key(MEETING_SUMMARY.kind, meeting_id),
+                                                     summary, now))
+
+
+def _list(client, auth_headers, **params):
+    response = client.get('/meeting-summary/action-items', headers=auth_headers, query_string=params)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_saving_a_summary_indexes_its_action_items(client, auth_headers, fake_db):
+    response = client.post('/meeting-summary/meeting', headers=auth_headers,
+                           json={"transcript_content": TRANSCRIPT, "save_to_firestore": True, "use_cache": False})
+
+    assert response.status_code == 200
+    items = fake_db.kind_entities(ACTION_ITEM_KIND)
+    assert len(items) == 1
+    assert items[0]['status'] == 'open'
+    assert items[0].key.parent.kind == MEETING_SUMMARY.kind
+
+
+def test_list_by_assignee_orders_by_due_date(client, auth_headers, action_items):
+    result = _list(client, auth_headers, assignee="山田")
+
+    # 期限が読めなかったもの (due_date が None) は Datastore の並び順で先頭になる
+    assert [(item["meeting_id"], item["index"], item["due_date"]) for item in result["action_items"]] == [
+        ("m2", 1, None), ("m2", 0, "2025-01-17"), ("m1", 0, "2025-01-22")]
+
+
+def test_list_due_before(client, auth_headers, action_items):
+    result = _list(client, auth_headers, due_before="2025-01-21")
+
+    assert [item["action"] for item in result["action_items"]] == ["レビュー", "日程調整"]
+
+
+def test_filter_by_status(client, auth_headers, fake_db, action_items):
+    [item] = [entity for entity in fake_db.kind_entities(ACTION_ITEM_KIND) if entity['action'] == "資料作成"]
+    item['status'] = 'done'
+    fake_db.put(item)
+
+    assert [item["action"] for item in _list(client, auth_headers, status="done")["action_items"]] == ["資料作成"]
+    assert [item["action"] for item in _list(client, auth_headers, assignee="山田", status="open")["action_items"]] == \
+        ["共有", "レビュー"]
+
+
+@pytest.mark.parametrize('query', ['status=closed', 'due_before=tomorrow', 'limit=0'])
+def test_invalid_requests(client, auth_headers, action_items, query):
+    response = client.get(f'/meeting-summary/action-items?{query}', headers=auth_headers)
+
+    assert response.status_code == 400
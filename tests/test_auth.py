@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.auth import API_KEY_KIND, ApiKeyVerifier, hash_api_key
+from app.schemas import API_KEY
+
+
+def _put_key(fake_db, raw_key, client_id="client-a", **values):
+    fake_db.put(API_KEY.to_entity(fake_db.key(API_KEY_KIND, hash_api_key(raw_key)),
+                                  dict({"client_id": client_id}, **values)))
+
+
+def _get(client, key):
+    return client.get('/employees/cache/stats', headers={'X-Auth-Key': key} if key else {})
+
+
+def test_missing_and_unknown_keys_are_rejected(client):
+    assert _get(client, None).status_code == 401
+    assert _get(client, "nope").status_code == 401
+
+
+def test_legacy_key_can_be_disabled(app, client, auth_headers):
+    assert _get(client, auth_headers['X-Auth-Key']).status_code == 200
+    app.config['AUTH_LEGACY_KEY_ENABLED'] = False
+    assert _get(client, auth_headers['X-Auth-Key']).status_code == 401
+
+
+def test_datastore_key_is_verified_once_and_cached(client, fake_db):
+    _put_key(fake_db, "key-a")
+    fake_db.calls.clear()
+
+    assert _get(client, "key-a").status_code == 200
+    assert _get(client, "key-a").status_code == 200
+    assert len([call for call in fake_db.calls if call == ('lookup', API_KEY_KIND)]) == 1
+
+
+@pytest.mark.parametrize("values", [{"disabled": True},
+                                    {"expires_at": datetime.now(timezone.utc) - timedelta(days=1)}])
+def test_disabled_or_expired_keys_are_rejected(client, fake_db, values):
+    _put_key(fake_db, "key-a", **values)
+    assert _get(client, "key-a").status_code == 401
+
+
+def test_invalid_keys_are_negatively_cached(app, fake_db):
+    verifier = ApiKeyVerifier(negative_ttl=60)
+    assert verifier.verify(app, "key-a") is None
+    _put_key(fake_db, "key-a")
+
+    # 無効の結果は negative_ttl の間は使い続ける (invalidate で消せる)
+    assert verifier.verify(app, "key-a") is None
+    verifier.invalidate("key-a")
+    assert verifier.verify(app, "key-a") == "client-a"
+
+
+def test_backend_failure_is_503(client, fake_db, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise RuntimeError("datastore down")
+    monkeypatch.setattr(fake_db, 'get', _fail)
+
+    assert _get(client, "key-a").status_code == 503
@@ -0,0 +1,63 @@
+from app.meeting_summary.chunking import build_chunks, merge_summaries, remap_indices, split_utterances
+from app.meeting_summary.models import ActionItem, Decision, MeetingSummary
+
+
+def _transcript(count, header="会議: 1on1 2025-01-15"):
+    lines = [header] + [f"source_index: {i} 発言者{i % 2}: 発言 {i} " + "あ" * 40 for i in range(count)]
+    return "\n".join(lines)
+
+
+def test_split_utterances_separates_header():
+    header, utterances = split_utterances(_transcript(3))
+    assert header == "会議: 1on1 2025-01-15"
+    assert len(utterances) == 3 and utterances[0].startswith("source_index: 0")
+
+
+def test_split_utterances_without_markers_uses_lines():
+    assert split_utterances("a\n\nb\r\nc") == ('', ['a', 'b', 'c'])
+
+
+def test_build_chunks_respects_budget_and_renumbers():
+    chunks = build_chunks(_transcript(20), max_chars=300)
+
+    assert len(chunks) > 1
+    assert all(chunk.text.startswith("会議: 1on1 2025-01-15\n") for chunk in chunks)
+    assert [index for chunk in chunks for index in chunk.source_indices] == list(range(20))
+    # チャンク内の番号は 0 から振り直される
+    assert all("source_index: 0 " in chunk.text for chunk in chunks)
+
+
+def test_remap_indices_drops_out_of_range():
+    chunk = build_chunks(_transcript(6), max_chars=10_000)[0]
+    chunk.source_indices = [10, 11, 12]
+    assert remap_indices([0, 2, 5, "x"], chunk) == [10, 12]
+
+
+def test_merge_summaries_deduplicates_and_remaps():
+    chunks = build_chunks(_transcript(20), max_chars=300)[:2]
+    first = MeetingSummary(meeting_date="2025-01-15", employee_name=["山田"], purpose="振り返り",
+                           decisions=[Decision(item="A", source_utterance_indices=[0])],
+                           action_items=[ActionItem(action="資料作成", assignee="山田")], overall_summary="前半")
+    second = MeetingSummary(meeting_date="", employee_name=["山田", "佐藤"], purpose="",
+                            decisions=[Decision(item="A", source_utterance_indices=[1]), Decision(item="B")],
+                            action_items=[ActionItem(action="資料作成", assignee="山田")], overall_summary="後半")
+
+    merged = merge_summaries([(first, chunks[0]), (second, chunks[1])])
+
+    assert merged.meeting_date == "2025-01-15" and merged.purpose == "振り返り"
+    assert merged.employee_name == ["山田", "佐藤"]
+    assert [decision.item for decision in merged.decisions] == ["A", "B"]
+    assert merged.decisions[0].source_utterance_indices == [chunks[0].source_indices[0], chunks[1].source_indices[1]]
+    assert len(merged.action_items) == 1
+    assert merged.overall_summary == "前半\n\n後半"
+
+
+def test_long_transcript_is_summarized_in_chunks(app, client, auth_headers):
+    app.config['LONG_TRANSCRIPT_CHUNK_CHARS'] = 300
+    response = client.post('/meeting-summary/meeting', headers=auth_headers,
+                           json={"transcript_content": _transcript(20), "chunked": True, "use_cache": False})
+
+    assert response.status_code == 200
+    assert response.json["input"]["chunked"] is True
+    # スタブはチャンクのプロンプトごとに異なる決定事項を返すため、複数チャンクの決定事項がまとめられている
+    assert len(response.json["summary"]["decisions"]) > 1
@@ -0,0 +1,50 @@
+from google.cloud import datastore
+
+from app.cache import StatsTTLCache
+
+
+def test_get_employee_is_served_from_cache(client, auth_headers, fake_db):
+    client.post('/employees/e1', json={"name": "Alice", "email": "alice@example.com"}, headers=auth_headers)
+    fake_db.calls.clear()
+
+    first = client.get('/employees/e1', headers=auth_headers)
+    second = client.get('/employees/e1', headers=auth_headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json == second.json == {"name": "Alice", "email": "alice@example.com", "role": None}
+    # 作成時に書き込んだ内容でキャッシュされるため Datastore は読まない
+    assert [call for call in fake_db.calls if call[0] == 'lookup'] == []
+
+
+def test_get_employee_caches_after_first_lookup(app, client, auth_headers, fake_db):
+    stored = datastore.Entity(key=app.db.key('employees', 'e1'))
+    stored.update({"name": "Alice", "email": "alice@example.com"})
+    fake_db.put(stored)
+    fake_db.calls.clear()
+
+    client.get('/employees/e1', headers=auth_headers)
+    client.get('/employees/e1', headers=auth_headers)
+
+    assert len([call for call in fake_db.calls if call[0] == 'lookup']) == 1
+    stats = client.get('/employees/cache/stats', headers=auth_headers).json
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 1
+
+
+def test_get_missing_employee_is_not_cached(client, auth_headers, fake_db):
+    assert client.get('/employees/missing', headers=auth_headers).status_code == 404
+    assert client.get('/employees/missing', headers=auth_headers).status_code == 404
+    assert len([call for call in fake_db.calls if call[0] == 'lookup']) == 2
+
+
+def test_stats_ttl_cache_counts_evictions_and_expirations():
+    cache = StatsTTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+
+    cache._cache.expire(time=cache._cache.timer() + 120)
+    assert cache.stats()["expirations"] == 2
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def employees(client, auth_headers):
+    for employee_id in ("e1", "e2"):
+        client.post(f'/employees/{employee_id}', json={"name": employee_id, "email": f"{employee_id}@example.com"},
+                    headers=auth_headers)
+
+
+def _event(employee_id, **overrides):
+    return dict({"employee_id": employee_id, "event_type": "login", "description": "signed in",
+                 "timestamp": "2025-01-01T09:00:00+09:00"}, **overrides)
+
+
+def test_batch_events_report_each_record(client, auth_headers, fake_db, employees):
+    response = client.post('/employees/events:batch', headers=auth_headers, json=[
+        _event("e1"), _event("e2"), _event("missing"), _event("e1", event_type=""), {"event_type": "login"},
+        _event("e1", timestamp="not-a-date"),
+    ])
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == [
+        "created", "created", "not_found", "invalid", "invalid", "invalid"]
+    assert response.json["summary"] == {"created": 2, "not_found": 1, "invalid": 3, "error": 0}
+    assert len(fake_db.kind_entities('employee_event')) == 2
+
+
+def test_batch_events_look_up_each_unknown_employee_once(client, auth_headers, fake_db):
+    records = [_event("missing") for _ in range(10)]
+    fake_db.calls.clear()
+    response = client.post('/employees/events:batch', json=records, headers=auth_headers)
+
+    assert response.json["summary"]["not_found"] == 10
+    assert len([call for call in fake_db.calls if call[0] == 'lookup']) == 1
+
+
+def test_batch_events_accept_ndjson(client, auth_headers, fake_db, employees):
+    body = "\n".join(json.dumps(_event("e1", description=f"event {i}")) for i in range(3)) + "\n{broken\n"
+    response = client.post('/employees/events:batch', data=body,
+                           headers=dict(auth_headers, **{'Content-Type': 'application/x-ndjson'}))
+
+    assert [result["status"] for result in response.json["results"]] == ["created"] * 3 + ["invalid"]
+    events = client.get('/employees/e1/events', headers=auth_headers).json["events"]
+    assert sorted(event["description"] for event in events) == ["event 0", "event 1", "event 2"]
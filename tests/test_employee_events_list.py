@@ -0,0 +1,59 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.cloud import datastore
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def events(app, fake_db):
+    parent = app.db.key('employees', 'e1')
+    fake_db.put(datastore.Entity(key=parent))
+    for i in range(5):
+        entity = datastore.Entity(key=app.db.key('employee_event', parent=parent))
+        entity.update({"event_type": "login" if i % 2 == 0 else "logout", "description": f"event {i}",
+                       "timestamp": BASE_TIME + timedelta(hours=i), "created_at": BASE_TIME, "updated_at": BASE_TIME})
+        fake_db.put(entity)
+
+
+def test_list_events_pages_with_cursor(client, auth_headers, events):
+    first = client.get('/employees/e1/events?limit=3&order=asc', headers=auth_headers).json
+    assert [event["description"] for event in first["events"]] == ["event 0", "event 1", "event 2"]
+
+    second = client.get(f'/employees/e1/events?limit=3&order=asc&cursor={first["next_cursor"]}', headers=auth_headers).json
+    assert [event["description"] for event in second["events"]] == ["event 3", "event 4"]
+    assert second["next_cursor"] is None
+
+
+def test_list_events_filters_by_type_and_range(client, auth_headers, events):
+    since = (BASE_TIME + timedelta(hours=1)).isoformat()
+    response = client.get('/employees/e1/events', headers=auth_headers,
+                          query_string={"event_type": "login", "since": since})
+    assert [event["description"] for event in response.json["events"]] == ["event 4", "event 2"]
+
+
+def test_list_events_stream_returns_all_events(client, auth_headers, events):
+    response = client.get('/employees/e1/events?stream=true&order=asc', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["description"] for line in lines] == [f"event {i}" for i in range(5)]
+
+
+def test_list_events_invalid_cursor_is_rejected(client, auth_headers, events):
+    assert client.get('/employees/e1/events?cursor=garbage', headers=auth_headers).status_code == 400
+
+
+def test_list_events_stream_invalid_cursor_is_rejected_before_streaming(client, auth_headers, events):
+    response = client.get('/employees/e1/events?stream=true&cursor=garbage', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json["error"]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=5000", "since=yesterday", "order=random"])
+def test_list_events_rejects_invalid_parameters(client, auth_headers, query):
+    assert client.get(f'/employees/e1/events?{query}', headers=auth_headers).status_code == 400
@@ -0,0 +1,103 @@
+# tests/test_employee_existence.py
+
+import threading
+
+import pytest
+from google.cloud import datastore
+
+from app.employees.existence import EmployeeIdSet, get_employee_id_set
+
+
+def _post_event(client, auth_headers, employee_id='e1'):
+    return client.post(f'/employees/{employee_id}/events', headers=auth_headers,
+                       json={"event_type": "login", "description": "x"})
+
+
+def _put_employee(fake_db, employee_id):
+    # API を通さずに作られた従業員 (集合に無い ID) として保存する
+    entity = datastore.Entity(key=fake_db.key('employees', employee_id))
+    entity.update({"name": employee_id, "email": f"{employee_id}@example.com"})
+    fake_db.put(entity)
+
+
+def test_known_employee_is_written_blind(client, auth_headers, fake_db):
+    client.post('/employees/e1', json={"name": "e1", "email": "e1@example.com"}, headers=auth_headers)
+    fake_db.calls.clear()
+
+    assert _post_event(client, auth_headers).status_code == 201
+    assert fake_db.calls == [('commit_put', 'employee_event')]
+
+
+def test_unknown_employee_is_looked_up_without_a_transaction(app, client, auth_headers, fake_db):
+    _put_employee(fake_db, 'e1')
+    fake_db.calls.clear()
+
+    assert _post_event(client, auth_headers).status_code == 201
+    assert [call[0] for call in fake_db.calls] == ['lookup', 'commit_put']
+    assert get_employee_id_set(app).contains('e1')
+
+    fake_db.calls.clear()
+    assert _post_event(client, auth_headers).status_code == 201
+    assert fake_db.calls == [('commit_put', 'employee_event')]
+
+
+def test_missing_employee_is_404_and_writes_nothing(client, auth_headers, fake_db):
+    response = _post_event(client, auth_headers, 'missing')
+
+    assert response.status_code == 404
+    assert fake_db.kind_entities('employee_event') == []
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/employees/e1', {"name": "e1", "email": "e1@example.com"}),
+    ('/employees:batch', [{"id": "e1", "name": "e1", "email": "e1@example.com"}]),
+])
+def test_creating_employees_adds_ids_without_reloading(app, client, auth_headers, fake_db, path, body):
+    app.config['EMPLOYEE_ID_SET_REFRESH_SECONDS'] = 600
+
+    client.post(path, json=body, headers=auth_headers)
+
+    id_set = get_employee_id_set(app)
+    assert id_set.contains('e1')
+    assert ('run_query', 'employees') not in fake_db.calls
+    assert id_set._thread is None
+
+
+def test_refresh_replaces_the_loaded_ids_and_keeps_added_ones(app, fake_db):
+    _put_employee(fake_db, 'e1')
+    id_set = EmployeeIdSet(app, refresh_seconds=600)
+    id_set.refresh(fake_db)
+    id_set.add('e2')
+
+    assert id_set.contains('e1') and id_set.contains('e2')
+    assert id_set.stats()["loaded"] is True
+
+    fake_db.delete(fake_db.key('employees', 'e1'))
+    id_set.refresh(fake_db)
+
+    assert not id_set.contains('e1')
+
+
+def test_background_thread_loads_ids(app, fake_db, monkeypatch):
+    _put_employee(fake_db, 'e1')
+    id_set = EmployeeIdSet(app, refresh_seconds=600)
+    loaded = threading.Event()
+    refresh = id_set.refresh
+
+    def _refresh(db_client):
+        refresh(db_client)
+        loaded.set()
+
+    monkeypatch.setattr(id_set, 'refresh', _refresh)
+    id_set.ensure_started()
+
+    assert loaded.wait(5)
+    assert id_set._thread.name == 'employee-id-refresh'
+    assert id_set.contains('e1')
+
+
+def test_refresh_can_be_disabled(app):
+    id_set = EmployeeIdSet(app, refresh_seconds=0)
+    id_set.ensure_started()
+
+    assert id_set._thread is None
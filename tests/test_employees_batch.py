@@ -0,0 +1,56 @@
+import json
+
+
+def test_batch_create_employees_reports_each_record(client, auth_headers, fake_db):
+    records = [
+        {"id": "e1", "name": "Alice", "email": "alice@example.com"},
+        {"id": "e1", "name": "Alice again", "email": "alice@example.com"},
+        {"name": "No ID"},
+        {"id": "e2", "name": "Bob"},
+        5,
+    ]
+    response = client.post('/employees:batch', json=records, headers=auth_headers)
+
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json["results"]]
+    assert statuses == ["created", "conflict", "invalid", "invalid", "invalid"]
+    assert response.json["summary"] == {"created": 1, "conflict": 1, "invalid": 3, "error": 0}
+    assert [entity.key.name for entity in fake_db.kind_entities('employees')] == ["e1"]
+
+
+def test_batch_create_employees_conflicts_with_existing(client, auth_headers):
+    client.post('/employees/e1', json={"name": "Alice", "email": "alice@example.com"}, headers=auth_headers)
+    response = client.post('/employees:batch', headers=auth_headers, json=[
+        {"id": "e1", "name": "Alice", "email": "alice@example.com"},
+        {"id": "e2", "name": "Bob", "email": "bob@example.com"},
+    ])
+
+    assert [result["status"] for result in response.json["results"]] == ["conflict", "created"]
+
+
+def test_batch_create_employees_uses_chunked_rpcs(client, auth_headers, fake_db):
+    records = [{"id": f"e{i}", "name": "n", "email": "e@example.com"} for i in range(1200)]
+    fake_db.calls.clear()
+    response = client.post('/employees:batch', json=records, headers=auth_headers)
+
+    assert response.json["summary"]["created"] == 1200
+    # 1件ずつではなくチャンク単位の get_multi / put_multi で書き込む
+    assert len([call for call in fake_db.calls if call[0] == 'lookup']) <= 3
+    assert len([call for call in fake_db.calls if call[0] == 'commit_put']) <= 3
+
+
+def test_batch_create_employees_accepts_ndjson(client, auth_headers):
+    body = "\n".join(json.dumps(record) for record in [
+        {"id": "e1", "name": "Alice", "email": "alice@example.com"},
+        {"id": "e2", "name": "Bob", "email": "bob@example.com"},
+    ]) + "\n{broken\n"
+    response = client.post('/employees:batch', data=body, headers=dict(auth_headers, **{'Content-Type': 'application/x-ndjson'}))
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == ["created", "created", "invalid"]
+
+
+def test_batch_create_employees_rejects_non_array(client, auth_headers):
+    response = client.post('/employees:batch', json={"id": "e1"}, headers=auth_headers)
+
+    assert response.status_code == 400
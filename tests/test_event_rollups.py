@@ -0,0 +1,105 @@
+# tests/test_event_rollups.py
+
+from datetime import datetime, timezone
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.employees.rollups import ROLLUP_KIND, get_rollup_buffer, rebuild_rollup
+
+
+@pytest.fixture
+def employee(app, client, auth_headers):
+    # バックグラウンドの書き出しがテストの途中で走らないようにする (書き出しは flush() で明示的に行う)
+    app.config['EVENT_ROLLUP_FLUSH_SECONDS'] = 3600
+    client.post('/employees/e1', json={"name": "e1", "email": "e1@example.com"}, headers=auth_headers)
+    return 'e1'
+
+
+def _post_event(client, auth_headers, timestamp, event_type="login"):
+    response = client.post('/employees/e1/events', headers=auth_headers,
+                           json={"event_type": event_type, "description": "x", "timestamp": timestamp})
+    assert response.status_code == 201
+
+
+def _stats(client, auth_headers, **params):
+    response = client.get('/employees/e1/events/stats', headers=auth_headers, query_string=params)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_event_write_does_not_touch_rollups(client, auth_headers, fake_db, employee):
+    _post_event(client, auth_headers, "2025-01-10T09:00:00+09:00")
+    fake_db.calls.clear()
+    _post_event(client, auth_headers, "2025-01-10T10:00:00+09:00")
+
+    # 集計はリクエストの中では読み書きしない
+    assert fake_db.kind_entities(ROLLUP_KIND) == []
+    assert ('begin_transaction',) not in fake_db.calls
+    assert fake_db.calls == [('commit_put', 'employee_event')]
+    # 同じプロセスの書き出し前の差分は読み取りに反映される
+    assert _stats(client, auth_headers)["total"] == 2
+
+
+def test_flush_writes_one_entity_per_month_and_shard(app, client, auth_headers, fake_db, employee):
+    _post_event(client, auth_headers, "2025-01-31T09:00:00+09:00")
+    _post_event(client, auth_headers, "2025-02-01T09:00:00+09:00", event_type="logout")
+
+    assert get_rollup_buffer(app).flush() == 2
+
+    rollups = fake_db.kind_entities(ROLLUP_KIND)
+    assert sorted(entity['month'] for entity in rollups) == ['2025-01', '2025-02']
+    assert all(entity.key.name.startswith(f"{entity['month']}-s") for entity in rollups)
+    assert all(entity.key.parent.name == 'e1' for entity in rollups)
+    assert get_rollup_buffer(app).pending('e1') == {}
+    assert _stats(client, auth_headers) == {
+        "employee_id": "e1", "total": 2, "by_type": {"login": 1, "logout": 1},
+        "by_day": {"2025-01-31": 1, "2025-02-01": 1}}
+    assert _stats(client, auth_headers, since="2025-02-01")["by_day"] == {"2025-02-01": 1}
+
+
+def test_flush_adds_to_existing_counts(app, client, auth_headers, fake_db, employee):
+    buffer = get_rollup_buffer(app)
+    buffer.shards = 1
+    for _ in range(3):
+        _post_event(client, auth_headers, "2025-01-10T09:00:00+09:00")
+        buffer.flush()
+
+    rollups = fake_db.kind_entities(ROLLUP_KIND)
+    assert len(rollups) == 1
+    assert rollups[0]['total'] == 3
+    assert _stats(client, auth_headers)["total"] == 3
+
+
+def test_failed_flush_keeps_deltas_for_the_next_flush(app, client, auth_headers, fake_db, employee, monkeypatch):
+    _post_event(client, auth_headers, "2025-01-10T09:00:00+09:00")
+    buffer = get_rollup_buffer(app)
+
+    def _unavailable(keys, **kwargs):
+        raise google_exceptions.ServiceUnavailable("down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fake_db, 'get_multi', _unavailable)
+        assert buffer.flush() == 0
+    assert sum(buffer.pending('e1').values()) == 1
+
+    assert buffer.flush() == 1
+    assert sum(entity['total'] for entity in fake_db.kind_entities(ROLLUP_KIND)) == 1
+
+
+def test_rebuild_rollup_recounts_into_shard_zero(app, client, auth_headers, fake_db, employee):
+    for timestamp in ("2025-01-10T09:00:00+09:00", "2025-01-11T09:00:00+09:00", "2025-03-01T09:00:00+09:00"):
+        _post_event(client, auth_headers, timestamp)
+    buffer = get_rollup_buffer(app)
+    buffer.shards = 8
+    buffer.flush()
+
+    total = rebuild_rollup(fake_db, 'e1', 9, datetime.now(timezone.utc))
+
+    assert total == 3
+    assert sorted(entity.key.name for entity in fake_db.kind_entities(ROLLUP_KIND)) == ['2025-01-s0', '2025-03-s0']
+    assert _stats(client, auth_headers)["total"] == 3
+
+
+def test_stats_for_unknown_employee_is_404(client, auth_headers):
+    assert client.get('/employees/missing/events/stats', headers=auth_headers).status_code == 404
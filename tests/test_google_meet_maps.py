@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+from google.cloud import datastore
+
+from app.google_meet_maps.index import MAPPING_KIND, GoogleMeetMappingIndex, normalize_meet_name
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _put_mapping(fake_db, email, name, updated_at):
+    entity = datastore.Entity(key=fake_db.key(MAPPING_KIND, email))
+    entity.update({"email": email, "google_meet_name": name, "updated_at": updated_at})
+    fake_db.put(entity)
+
+
+def test_normalize_meet_name():
+    assert normalize_meet_name(" Ｙａｍａｄａ　 Taro ") == "yamada taro"
+
+
+def test_incremental_load_picks_up_changes(fake_db):
+    _put_mapping(fake_db, "a@example.com", "Alice", BASE_TIME)
+    index = GoogleMeetMappingIndex(refresh_seconds=0)
+    index.ensure_fresh(fake_db)
+    version = index.version
+
+    _put_mapping(fake_db, "b@example.com", "Bob", BASE_TIME + timedelta(minutes=1))
+    index.ensure_fresh(fake_db)
+
+    assert index.lookup_email("b@example.com") == "Bob"
+    assert index.lookup_name("  BOB ") == ["b@example.com"]
+    assert index.version == version + 1
+
+
+def test_local_write_does_not_advance_watermark(app, client, auth_headers, fake_db):
+    app.config['GOOGLE_MEET_MAP_REFRESH_SECONDS'] = 0
+    app.config['GOOGLE_MEET_MAP_SYNC_OVERLAP_SECONDS'] = 0
+    _put_mapping(fake_db, "a@example.com", "Alice", datetime.now(timezone.utc) - timedelta(hours=1))
+    client.get('/google_meet_employee_map/a@example.com', headers=auth_headers)
+
+    # このプロセスの書き込みより前の時刻で、別のワーカーの書き込みが後からコミットされる
+    client.post('/google_meet_employee_map/a@example.com', json={"google_meet_name": "Alice 2"}, headers=auth_headers)
+    _put_mapping(fake_db, "b@example.com", "Bob", datetime.now(timezone.utc) - timedelta(minutes=5))
+
+    assert client.get('/google_meet_employee_map/b@example.com', headers=auth_headers).json["google_meet_name"] == "Bob"
+
+
+def test_overlap_catches_late_commits(fake_db):
+    _put_mapping(fake_db, "a@example.com", "Alice", BASE_TIME)
+    index = GoogleMeetMappingIndex(refresh_seconds=0, sync_overlap_seconds=30)
+    index.ensure_fresh(fake_db)
+
+    # 基準の時刻より前の updated_at で遅れてコミットされた書き込み
+    _put_mapping(fake_db, "c@example.com", "Carol", BASE_TIME - timedelta(seconds=10))
+    index.ensure_fresh(fake_db)
+
+    assert index.lookup_email("c@example.com") == "Carol"
+
+
+def test_unchanged_rows_do_not_bump_version(fake_db):
+    _put_mapping(fake_db, "a@example.com", "Alice", BASE_TIME)
+    index = GoogleMeetMappingIndex(refresh_seconds=0)
+    index.ensure_fresh(fake_db)
+    version = index.version
+
+    index.ensure_fresh(fake_db)
+
+    assert index.version == version
+
+
+def test_mapping_endpoints(client, auth_headers):
+    response = client.post('/google_meet_employee_map/a@example.com', json={"google_meet_name": " Alice "},
+                           headers=auth_headers)
+    assert response.status_code == 200
+
+    assert client.get('/google_meet_employee_map/a@example.com', headers=auth_headers).json == {
+        "email": "a@example.com", "google_meet_name": "Alice"}
+    assert client.get('/google_meet_employee_map?google_meet_name=alice', headers=auth_headers).json["emails"] == [
+        "a@example.com"]
+    assert client.get('/google_meet_employee_map/missing@example.com', headers=auth_headers).status_code == 404
+    assert client.post('/google_meet_employee_map/a@example.com', json={"google_meet_name": " "},
+                       headers=auth_headers).status_code == 400
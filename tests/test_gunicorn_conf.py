@@ -0,0 +1,100 @@
+# tests/test_gunicorn_conf.py
+
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import pytest
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+
+
+def _load_conf(monkeypatch, **env):
+    for name in ('GUNICORN_WORKERS', 'GUNICORN_THREADS', 'GUNICORN_MAX_CONCURRENCY', 'GUNICORN_WORKER_MEMORY_MB'):
+        monkeypatch.delenv(name, raising=False)
+    # gunicorn.conf.py は導出した LLM_MAX_CONCURRENCY を os.environ に書くため、テスト後に元に戻るようにしておく
+    monkeypatch.setenv('LLM_MAX_CONCURRENCY', '')
+    monkeypatch.delenv('LLM_THREAD_SHARE', raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', CONF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _cgroup(monkeypatch, module, files):
+    monkeypatch.setattr(module, '_read_first_line', files.get)
+    monkeypatch.setattr(module.os, 'sched_getaffinity', lambda pid: set(range(8)))
+
+
+@pytest.mark.parametrize('max_concurrency, workers, threads', [('40', '2', 20), ('40', '3', 14), ('10', '4', 4)])
+def test_threads_split_max_concurrency_across_workers(monkeypatch, max_concurrency, workers, threads):
+    conf = _load_conf(monkeypatch, GUNICORN_MAX_CONCURRENCY=max_concurrency, GUNICORN_WORKERS=workers)
+
+    assert conf.workers == int(workers)
+    assert conf.threads == threads
+
+
+@pytest.mark.parametrize('workers, threads, llm', [('1', 40, 24), ('4', 10, 6), ('8', 5, 3)])
+def test_llm_concurrency_shares_the_thread_budget(monkeypatch, workers, threads, llm):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS=workers)
+
+    assert conf.threads == threads
+    assert conf.llm_max_concurrency == llm
+    assert os.environ['LLM_MAX_CONCURRENCY'] == str(llm)
+    assert conf.workers * conf.llm_max_concurrency <= 40
+
+
+def test_llm_concurrency_leaves_a_thread_for_short_requests(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='1', GUNICORN_THREADS='2', LLM_THREAD_SHARE='1')
+
+    assert conf.llm_max_concurrency == 1
+
+
+def test_llm_max_concurrency_overrides_derivation(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='1', LLM_MAX_CONCURRENCY='5')
+
+    assert conf.llm_max_concurrency == 5
+
+
+def test_timeout_outlasts_the_longest_summary(monkeypatch):
+    assert _load_conf(monkeypatch, GUNICORN_WORKERS='1').timeout == 360
+    assert _load_conf(monkeypatch, GUNICORN_WORKERS='1', GUNICORN_TIMEOUT='600').timeout == 600
+
+
+def test_gunicorn_threads_overrides_derivation(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='2', GUNICORN_THREADS='7')
+
+    assert conf.threads == 7
+
+
+def test_cpu_quota_limits_workers(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='1')
+    monkeypatch.delenv('GUNICORN_WORKERS')
+    _cgroup(monkeypatch, conf, {'/sys/fs/cgroup/cpu.max': '200000 100000'})
+
+    assert conf._available_cpus() == 2
+    assert conf._derive_workers() == 2
+
+
+def test_memory_limit_limits_workers(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='1')
+    monkeypatch.delenv('GUNICORN_WORKERS')
+    _cgroup(monkeypatch, conf, {'/sys/fs/cgroup/cpu.max': 'max 100000',
+                                '/sys/fs/cgroup/memory.max': str(1024 * 1024 * 1024)})
+
+    # 1024 MB / 256 MB から共有分の 1 を引いて 3
+    assert conf._derive_workers() == 3
+
+
+def test_worker_exit_retires_metrics(monkeypatch):
+    conf = _load_conf(monkeypatch, GUNICORN_WORKERS='1')
+    retired = []
+    metrics = SimpleNamespace(retire=lambda: retired.append(True))
+    app = SimpleNamespace(extensions={'metrics': metrics})
+    worker = SimpleNamespace(app=SimpleNamespace(wsgi=lambda: app))
+
+    conf.worker_exit(None, worker)
+
+    assert retired == [True]
@@ -0,0 +1,175 @@
+# tests/test_idempotency.py
+
+import json
+
+import pytest
+from flask import jsonify, request
+from google.cloud import datastore
+
+from app.employees import routes
+from app import idempotency
+from app.idempotency import IDEMPOTENCY_KIND, StoredResponse, get_idempotency_store, idempotent
+
+
+@pytest.fixture
+def employee(client, auth_headers):
+    client.post('/employees/e1', json={"name": "e1", "email": "e1@example.com"}, headers=auth_headers)
+    return 'e1'
+
+
+def _ndjson(records):
+    return '\n'.join(json.dumps(record) for record in records) + '\n'
+
+
+def test_ndjson_batch_with_idempotency_key_processes_every_record(client, auth_headers, fake_db, employee):
+    # idempotent がフィンガープリントのためにボディを読み切っても、レコードを読めること
+    body = _ndjson([{"employee_id": "e1", "event_type": "login", "description": "x"} for _ in range(3)])
+    headers = dict(auth_headers, **{'Idempotency-Key': 'batch-1', 'Content-Type': 'application/x-ndjson'})
+
+    response = client.post('/employees/events:batch', data=body, headers=headers)
+
+    assert response.json["summary"]["created"] == 3
+    assert len(fake_db.kind_entities('employee_event')) == 3
+
+
+@pytest.mark.parametrize('headers, buffered', [({}, False), ({'Idempotency-Key': 'k1'}, True)])
+def test_ndjson_is_buffered_only_when_the_body_was_fingerprinted(app, auth_headers, headers, buffered):
+    seen = {}
+
+    def _view():
+        records = [record for _, record, _ in routes._iter_batch_records()]
+        seen.update(records=records, buffered=getattr(request, '_cached_data', None) is not None)
+        return jsonify({})
+
+    body = _ndjson([{"n": 1}, {"n": 2}])
+    with app.test_request_context('/batch', method='POST', data=body, content_type='application/x-ndjson',
+                                  headers=dict(auth_headers, **headers)):
+        idempotent(_view)()
+
+    assert seen == {"records": [{"n": 1}, {"n": 2}], "buffered": buffered}
+
+
+def test_ndjson_employee_batch_with_idempotency_key(client, auth_headers, fake_db):
+    body = _ndjson([{"id": f"n{n}", "name": f"n{n}", "email": f"n{n}@example.com"} for n in range(2)])
+    headers = dict(auth_headers, **{'Idempotency-Key': 'employees-1', 'Content-Type': 'application/x-ndjson'})
+
+    response = client.post('/employees:batch', data=body, headers=headers)
+
+    assert [result["status"] for result in response.json["results"]] == ["created", "created"]
+
+
+def test_replay_returns_the_stored_response_without_running_again(client, auth_headers, fake_db, employee):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'event-1'})
+    payload = {"event_type": "login", "description": "x"}
+
+    first = client.post('/employees/e1/events', json=payload, headers=headers)
+    second = client.post('/employees/e1/events', json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.json == first.json
+    assert len(fake_db.kind_entities('employee_event')) == 1
+    assert fake_db.kind_entities(IDEMPOTENCY_KIND)[0]['state'] == 'completed'
+
+
+def test_replay_is_served_from_datastore_after_a_restart(app, client, auth_headers, fake_db, employee):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'event-1'})
+    payload = {"event_type": "login", "description": "x"}
+    first = client.post('/employees/e1/events', json=payload, headers=headers)
+
+    # プロセス内のキャッシュを捨てる (別のワーカー・インスタンスへの再送に相当)
+    app.extensions.pop('idempotency')
+    assert get_idempotency_store(app) is not None
+    second = client.post('/employees/e1/events', json=payload, headers=headers)
+
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.json == first.json
+    assert len(fake_db.kind_entities('employee_event')) == 1
+
+
+def test_same_key_with_a_different_body_is_422(client, auth_headers, employee):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'event-1'})
+    client.post('/employees/e1/events', json={"event_type": "login", "description": "x"}, headers=headers)
+
+    response = client.post('/employees/e1/events', json={"event_type": "logout", "description": "x"}, headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_keys_are_scoped_per_path(client, auth_headers, fake_db, employee):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'same'})
+    client.post('/employees/e2', json={"name": "e2", "email": "e2@example.com"}, headers=headers)
+
+    response = client.post('/employees/e1/events', json={"event_type": "login", "description": "x"}, headers=headers)
+
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+
+
+def test_server_errors_are_not_stored(client, auth_headers, fake_db, employee, monkeypatch):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'event-1'})
+    payload = {"event_type": "login", "description": "x"}
+
+    def _fail(entity):
+        raise RuntimeError("datastore down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fake_db, 'put', _fail)
+        assert client.post('/employees/e1/events', json=payload, headers=headers).status_code == 500
+
+    response = client.post('/employees/e1/events', json=payload, headers=headers)
+
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+
+
+def test_overlong_key_is_400(client, auth_headers, employee):
+    headers = dict(auth_headers, **{'Idempotency-Key': 'k' * 256})
+
+    response = client.post('/employees/e1/events', json={"event_type": "login", "description": "x"}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def _other_instance_record(fake_db, key):
+    entity = datastore.Entity(key=fake_db.key(IDEMPOTENCY_KIND, key))
+    entity.update({'state': 'in_progress'})
+    fake_db.put(entity)
+
+
+def test_release_keeps_records_it_did_not_claim(app, fake_db, monkeypatch):
+    store = get_idempotency_store(app)
+    _other_instance_record(fake_db, 'k1')
+
+    def _unavailable(db_client, key):
+        raise RuntimeError("datastore down")
+
+    monkeypatch.setattr(store, '_claim_once', _unavailable)
+    assert store.acquire('k1') is None
+    store.release('k1')
+
+    assert fake_db.get(fake_db.key(IDEMPOTENCY_KIND, 'k1')) is not None
+
+
+def test_release_deletes_its_own_claim(app, fake_db):
+    store = get_idempotency_store(app)
+
+    assert store.acquire('k1') is None
+    assert fake_db.get(fake_db.key(IDEMPOTENCY_KIND, 'k1')) is not None
+    store.release('k1')
+
+    assert fake_db.get(fake_db.key(IDEMPOTENCY_KIND, 'k1')) is None
+
+
+def test_oversized_response_survives_a_failed_release(app, fake_db, monkeypatch):
+    store = get_idempotency_store(app)
+    monkeypatch.setattr(idempotency, '_MAX_PERSISTED_BODY_BYTES', 1)
+    assert store.acquire('k1') is None
+
+    def _fail(key):
+        raise RuntimeError("datastore down")
+
+    monkeypatch.setattr(fake_db, 'delete', _fail)
+    store.complete('k1', StoredResponse(status_code=200, body=b'{"large": true}', headers=[], fingerprint='f'))
+
+    assert store.acquire('k1').body == b'{"large": true}'
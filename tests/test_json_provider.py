@@ -0,0 +1,68 @@
+# tests/test_json_provider.py
+
+import dataclasses
+import json
+import uuid
+from datetime import date, datetime, timezone
+
+import pytest
+from flask import jsonify
+from google.cloud import datastore
+
+
+@dataclasses.dataclass
+class _Item:
+    name: str
+    due: date
+
+
+@pytest.fixture(params=[True, False], ids=['orjson', 'json'])
+def provider(app, request):
+    if request.param:
+        pytest.importorskip('orjson')
+    app.json.use_orjson = request.param
+    return app.json
+
+
+def test_serializes_app_types(app, provider):
+    key = datastore.Key('employees', 'e1', 'employee_event', 5, project='test-project')
+    entity = datastore.Entity(key=key)
+    entity.update({'event_type': 'login'})
+    value = {
+        'item': _Item('資料作成', date(2025, 1, 15)),
+        'at': datetime(2025, 1, 15, 9, 30, tzinfo=timezone.utc),
+        'key': key,
+        'entity': entity,
+        'id': uuid.UUID(int=1),
+        'tags': {'a'},
+    }
+
+    assert json.loads(provider.dumps(value)) == {
+        'item': {'name': '資料作成', 'due': '2025-01-15'},
+        'at': '2025-01-15T09:30:00+00:00',
+        'key': ['employees', 'e1', 'employee_event', 5],
+        'entity': {'event_type': 'login'},
+        'id': str(uuid.UUID(int=1)),
+        'tags': ['a'],
+    }
+
+
+def test_output_is_compact_utf8_and_keeps_key_order(provider):
+    assert provider.dumps({'b': '山田', 'a': 1}) == '{"b":"山田","a":1}'
+
+
+def test_response_matches_dumps(app, provider):
+    with app.test_request_context():
+        response = jsonify({'name': '山田', 'items': [1, 2]})
+
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data(as_text=True)) == {'name': '山田', 'items': [1, 2]}
+
+
+def test_loads_round_trips(provider):
+    assert provider.loads(provider.dumps({'name': '山田', 'n': [1, 2.5, None]})) == {'name': '山田', 'n': [1, 2.5, None]}
+
+
+def test_unknown_types_raise_type_error(provider):
+    with pytest.raises(TypeError):
+        provider.dumps({'value': object()})
@@ -0,0 +1,65 @@
+# tests/test_llm_concurrency.py
+
+import threading
+
+import pytest
+
+from app.extensions import get_or_create_extension
+from app.genai_client import LLMBusyError, llm_slot
+
+TRANSCRIPT = "2025-01-15 定例\n山田: 来週までに資料を作ります。\n佐藤: お願いします。"
+
+
+@pytest.fixture
+def single_slot(app):
+    app.config['LLM_MAX_CONCURRENCY'] = 1
+    app.config['LLM_QUEUE_TIMEOUT_SECONDS'] = 0.01
+    return app
+
+
+def test_summary_is_503_with_retry_after_when_llm_slots_are_taken(single_slot, client, auth_headers):
+    with llm_slot(single_slot):
+        response = client.post('/meeting-summary/meeting', headers=auth_headers,
+                               json={"transcript_content": TRANSCRIPT, "use_cache": False})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(response.json["retry_after"])
+
+
+def test_llm_slot_is_released_after_each_call(single_slot, client, auth_headers):
+    for _ in range(2):
+        response = client.post('/meeting-summary/meeting', headers=auth_headers,
+                               json={"transcript_content": TRANSCRIPT, "use_cache": False})
+        assert response.status_code == 200
+
+
+def test_llm_slot_raises_when_no_slot_frees_up(single_slot):
+    with llm_slot(single_slot):
+        with pytest.raises(LLMBusyError):
+            with llm_slot(single_slot):
+                pass
+    with llm_slot(single_slot):
+        pass
+
+
+def test_get_or_create_extension_builds_once_under_concurrency(app):
+    created = []
+    barrier = threading.Barrier(8)
+
+    def _factory():
+        created.append(object())
+        return created[-1]
+
+    def _get(results):
+        barrier.wait()
+        results.append(get_or_create_extension(app, 'test_singleton', _factory))
+
+    results = []
+    threads = [threading.Thread(target=_get, args=(results,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
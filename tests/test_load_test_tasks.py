@@ -0,0 +1,94 @@
+# tests/test_load_test_tasks.py
+
+import json
+import threading
+
+import pytest
+from invoke import Context
+from werkzeug.serving import make_server
+
+import tasks
+from app import genai_stub
+
+
+@pytest.fixture
+def live_server(app):
+    """テスト用のアプリ (Datastore はフェイク, LLM はスタブ) を別スレッドの HTTP サーバーで動かす"""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    thread.join()
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert tasks._percentile(values, 50) == 50
+    assert tasks._percentile(values, 95) == 95
+    assert tasks._percentile(values, 99) == 99
+    assert tasks._percentile([7], 99) == 7
+    assert tasks._percentile([], 50) is None
+
+
+def test_bench_requests_write_before_read():
+    planned = tasks._bench_requests('employees', 10, 'run1')
+
+    assert [method for method, _, _ in planned] == ['POST'] * 5 + ['GET'] * 5
+    # 読み取りは書き込んだ従業員を対象にする
+    assert {path for method, path, _ in planned if method == 'GET'} == \
+        {path for method, path, _ in planned if method == 'POST'}
+
+
+def test_bench_transcripts_are_unique_per_request():
+    planned = tasks._bench_requests('meeting_summary', 3, 'run1')
+
+    transcripts = [body["transcript_content"] for _, _, body in planned]
+    assert len(set(transcripts)) == 3
+
+
+@pytest.mark.parametrize('scenario', ['employees', 'events'])
+def test_run_load_reports_latency_and_statuses(live_server, app, scenario):
+    result = tasks._run_load(live_server, app.config['SECRET_AUTH_KEY'], scenario,
+                             request_count=20, concurrency=4, run_id='t', timeout=10)
+
+    assert result["requests"] == 20
+    assert result["error_rate"] == 0
+    latency = result["latency_ms"]
+    assert latency["min"] <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert result["throughput_rps"] > 0
+
+
+def _write_report(path, p95, rps):
+    path.write_text(json.dumps({"runs": [{"scenario": "employees", "throughput_rps": rps,
+                                          "latency_ms": {"p95": p95}}]}), encoding='utf-8')
+    return str(path)
+
+
+def test_bench_compare_passes_within_tolerance(tmp_path):
+    baseline = _write_report(tmp_path / 'baseline.json', p95=100, rps=50)
+    current = _write_report(tmp_path / 'current.json', p95=110, rps=48)
+
+    tasks.bench_compare(Context(), baseline, current, max_regression=0.15)
+
+
+def test_bench_compare_fails_on_p95_regression(tmp_path):
+    baseline = _write_report(tmp_path / 'baseline.json', p95=100, rps=50)
+    current = _write_report(tmp_path / 'current.json', p95=130, rps=50)
+
+    with pytest.raises(SystemExit):
+        tasks.bench_compare(Context(), baseline, current, max_regression=0.15)
+
+
+def test_genai_stub_returns_function_call_with_source_indices(monkeypatch):
+    monkeypatch.setattr(genai_stub, '_settings', dict(genai_stub._settings))
+    genai_stub.configure(latency=0, stream_chunks=3)
+    model = genai_stub.GenerativeModel('stub')
+    prompt = "日時: 2025-01-15\nsource_index: 4 話者: a\nsource_index: 2 話者: b"
+
+    args = model.generate_content(prompt).candidates[0].content.parts[0].function_call.args
+    chunks = list(model.generate_content(prompt, stream=True))
+
+    assert args["meeting_date"] == "2025-01-15"
+    assert args["decisions"][0]["source_utterance_indices"] == [2, 4]
+    assert len(chunks) == 3
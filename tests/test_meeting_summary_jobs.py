@@ -0,0 +1,67 @@
+import pytest
+
+from app import genai_stub
+
+TRANSCRIPT = "2025-01-15 1on1\n山田: 来週までに資料を作ります。\n佐藤: お願いします。"
+
+
+def test_summarize_meeting_sync(client, auth_headers):
+    response = client.post('/meeting-summary/meeting', json={"transcript_content": TRANSCRIPT}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["summary"]["purpose"] == "Load test"
+    assert response.json["cached"] is False
+
+
+def test_summarize_meeting_async_job(client, auth_headers, wait_for_job):
+    response = client.post('/meeting-summary/meeting', json={"transcript_content": TRANSCRIPT, "async": True},
+                           headers=auth_headers)
+
+    assert response.status_code == 202
+    assert response.headers["Location"] == response.json["status_url"]
+    job = wait_for_job(response.json["job_id"])
+    assert job["status"] == "succeeded"
+    assert job["http_status"] == 200
+    assert job["result"]["summary"]["purpose"] == "Load test"
+
+
+def test_summary_job_is_readable_from_datastore(app, client, auth_headers, wait_for_job):
+    job_id = client.post('/meeting-summary/meeting?async=true', json={"transcript_content": TRANSCRIPT},
+                         headers=auth_headers).json["job_id"]
+    wait_for_job(job_id)
+    # 別のワーカーに届いたポーリングを想定し、プロセス内の状態を捨てる
+    app.extensions.pop('meeting_summary_jobs')
+
+    job = client.get(f'/meeting-summary/jobs/{job_id}', headers=auth_headers).json
+    assert job["status"] == "succeeded"
+
+
+def test_unknown_job_is_404(client, auth_headers):
+    assert client.get('/meeting-summary/jobs/unknown', headers=auth_headers).status_code == 404
+
+
+def test_blocked_prompt_is_400(client, auth_headers, monkeypatch):
+    def _blocked(self, prompt, **kwargs):
+        raise genai_stub.BlockedPromptException("blocked")
+    monkeypatch.setattr(genai_stub.GenerativeModel, 'generate_content', _blocked)
+
+    response = client.post('/meeting-summary/meeting', json={"transcript_content": TRANSCRIPT}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.json["message"] == "Prompt was blocked by safety settings."
+
+
+def test_unexpected_error_is_500(client, auth_headers, monkeypatch):
+    def _failing(self, prompt, **kwargs):
+        raise RuntimeError("backend exploded")
+    monkeypatch.setattr(genai_stub.GenerativeModel, 'generate_content', _failing)
+
+    response = client.post('/meeting-summary/meeting', json={"transcript_content": TRANSCRIPT}, headers=auth_headers)
+
+    assert response.status_code == 500
+    assert "backend exploded" in response.json["message"]
+
+
+@pytest.mark.parametrize("body", [{}, {"transcript_content": 5}, {"transcript_content": "x", "chunked": "yes"}])
+def test_summarize_meeting_rejects_invalid_body(client, auth_headers, body):
+    assert client.post('/meeting-summary/meeting', json=body, headers=auth_headers).status_code == 400
@@ -0,0 +1,158 @@
+import json
+import queue
+import threading
+
+from app import genai_stub
+from app.meeting_summary import routes
+from app.meeting_summary.progress import ProgressChannel
+
+TRANSCRIPT = "2025-01-15 1on1\n山田: 来週までに資料を作ります。\n佐藤: お願いします。"
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_emits_sections_before_the_llm_finishes(client, auth_headers):
+    response = client.post('/meeting-summary/meeting/stream', json={"transcript_content": TRANSCRIPT},
+                           headers=auth_headers)
+    events = _parse_sse(response.get_data(as_text=True))
+    names = [name for name, _ in events]
+
+    assert response.mimetype == 'text/event-stream'
+    assert names[0] == "queued" and names[-2:] == ["result", "done"]
+    first_chunk = names.index("llm_chunk")
+    streamed = [data["name"] for name, data in events[:first_chunk] if name == "section"]
+    assert set(streamed) == {"meeting_date", "employee_name", "purpose", "decisions", "action_items", "overall_summary"}
+    # 同じ値の section は二度送らない。話者は要約の完了後に送る
+    sections = [data["name"] for name, data in events if name == "section"]
+    assert len(sections) == len(set(sections))
+    speakers_at = next(i for i, (name, data) in enumerate(events) if name == "section" and data["name"] == "speakers")
+    assert speakers_at > names.index("summary_ready")
+    result = dict(events)["result"]
+    assert result["status"] == 200 and result["body"]["summary"]["purpose"] == "Load test"
+
+
+def test_stream_sends_cached_summary_sections(client, auth_headers):
+    body = {"transcript_content": TRANSCRIPT}
+    client.post('/meeting-summary/meeting', json=body, headers=auth_headers)
+    events = _parse_sse(client.post('/meeting-summary/meeting/stream', json=body, headers=auth_headers)
+                        .get_data(as_text=True))
+
+    assert "llm_chunk" not in [name for name, _ in events]
+    assert dict(events)["summary_ready"] == {"cached": True}
+    assert len([name for name, _ in events if name == "section"]) == 8
+
+
+def test_stream_chunk_done_carries_partial_summary(app, client, auth_headers):
+    app.config['LONG_TRANSCRIPT_CHUNK_CHARS'] = 300
+    transcript = "\n".join(["会議 2025-01-15"] + [f"source_index: {i} 山田: 発言 {i} " + "あ" * 40 for i in range(20)])
+    events = _parse_sse(client.post('/meeting-summary/meeting/stream', headers=auth_headers,
+                                    json={"transcript_content": transcript, "chunked": True}).get_data(as_text=True))
+
+    chunk_events = [data for name, data in events if name == "chunk_done"]
+    assert len(chunk_events) == chunk_events[0]["chunks"] > 1
+    assert sorted(data["completed"] for data in chunk_events) == list(range(1, len(chunk_events) + 1))
+    assert all(data["summary"]["decisions"] for data in chunk_events)
+
+
+def test_progress_channel_drops_when_full():
+    channel = ProgressChannel(maxsize=2, put_timeout=0)
+    for number in range(5):
+        channel.publish("llm_chunk", {"n": number})
+    channel.finish()
+
+    assert channel.dropped == 3
+    assert [channel.get(timeout=0) for _ in range(3)] == [("llm_chunk", {"n": 0}), ("llm_chunk", {"n": 1}), None]
+
+
+def test_progress_channel_keeps_the_result_when_full():
+    channel = ProgressChannel(maxsize=1, put_timeout=0)
+    channel.publish("llm_chunk", {"n": 0})
+    channel.set_result("result", {"status": 200})
+    channel.finish()
+
+    assert channel.get(timeout=0) == ("llm_chunk", {"n": 0})
+    assert channel.get(timeout=1) is None
+    assert channel.result == ("result", {"status": 200})
+
+
+def test_progress_channel_discards_after_close():
+    channel = ProgressChannel(maxsize=10)
+    channel.publish("section", {})
+    channel.close()
+    channel.publish("section", {})
+    channel.finish()
+
+    assert channel.closed
+    assert channel.get(timeout=0) is None
+
+
+def test_progress_channel_get_times_out_while_running():
+    channel = ProgressChannel(maxsize=1)
+    try:
+        channel.get(timeout=0.01)
+    except queue.Empty:
+        pass
+    else:
+        raise AssertionError("expected queue.Empty")
+
+
+def test_disconnected_stream_stops_buffering(client, auth_headers, wait_for_job, monkeypatch):
+    channels = []
+
+    class RecordingChannel(ProgressChannel):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            channels.append(self)
+
+    release = threading.Event()
+    original_iter = genai_stub._StreamingResponse.__iter__
+
+    def _slow_iter(self):
+        release.wait(5)
+        yield from original_iter(self)
+
+    monkeypatch.setattr(routes, 'ProgressChannel', RecordingChannel)
+    monkeypatch.setattr(genai_stub._StreamingResponse, '__iter__', _slow_iter)
+
+    response = client.post('/meeting-summary/meeting/stream', json={"transcript_content": TRANSCRIPT},
+                           headers=auth_headers, buffered=False)
+    queued = _parse_sse(next(iter(response.response)).decode('utf-8'))
+    response.close()
+    release.set()
+    job = wait_for_job(queued[0][1]["job_id"])
+
+    # 接続が切れても要約ジョブは最後まで実行され、その後の進捗はキューに溜まらない
+    assert job["status"] == "succeeded"
+    [channel] = channels
+    assert channel.closed and channel._queue.empty()
+
+
+def test_slow_reader_still_receives_result(app, client, auth_headers, wait_for_job, monkeypatch):
+    app.config['SSE_EVENT_QUEUE_SIZE'] = 1
+
+    class NonBlockingChannel(ProgressChannel):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, put_timeout=0, **kwargs)
+
+    monkeypatch.setattr(routes, 'ProgressChannel', NonBlockingChannel)
+
+    response = client.post('/meeting-summary/meeting/stream', json={"transcript_content": TRANSCRIPT},
+                           headers=auth_headers, buffered=False)
+    chunks = iter(response.response)
+    queued = _parse_sse(next(chunks).decode('utf-8'))
+    # 受信側が読まない間にジョブを終わらせ、進捗のほとんどをキューから溢れさせる
+    wait_for_job(queued[0][1]["job_id"])
+    events = _parse_sse(b"".join(chunks).decode('utf-8'))
+    response.close()
+
+    names = [name for name, _ in events]
+    assert names[-2:] == ["result", "done"]
+    assert dict(events)["result"]["status"] == 200
+    assert dict(events)["done"]["dropped_events"] > 0
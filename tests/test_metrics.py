@@ -0,0 +1,143 @@
+# tests/test_metrics.py
+
+import functools
+import json
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from google.cloud import datastore
+
+from app.metrics import InstrumentedDatastoreClient, MetricsRegistry, _collect_cache_stats
+from tests.fakes import FakeDatastoreClient
+
+
+def _calls(registry):
+    """external_calls_total を {operation: 回数} にする"""
+    return {dict(labels)["operation"]: value for name, labels, value in registry.snapshot()["counters"]
+            if name == "external_calls_total"}
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def _write_snapshot(metrics_dir, pid, counters=(), gauges=()):
+    with open(os.path.join(metrics_dir, f"metrics-{pid}.json"), 'w', encoding='utf-8') as f:
+        json.dump({"counters": list(counters), "gauges": list(gauges), "histograms": []}, f)
+
+
+def test_collect_skips_gauges_of_dead_workers(tmp_path):
+    registry = MetricsRegistry(metrics_dir=str(tmp_path))
+    registry.set_gauge("cache_entries", {"cache": "employee"}, 10)
+    _write_snapshot(tmp_path, _dead_pid(),
+                    counters=[["http_requests_total", {"status": "200"}, 5]],
+                    gauges=[["cache_entries", {"cache": "employee"}, 100]])
+
+    collected = registry.collect()
+
+    # 終了したワーカーのゲージは合算しないが、カウンタは残す
+    assert collected["gauges"] == [["cache_entries", {"cache": "employee"}, 10]]
+    assert collected["counters"] == [["http_requests_total", {"status": "200"}, 5]]
+
+
+def test_retire_drops_gauges_and_keeps_counters(tmp_path):
+    registry = MetricsRegistry(metrics_dir=str(tmp_path))
+    registry.inc("http_requests_total", {"status": "200"})
+    registry.set_gauge("cache_entries", {"cache": "employee"}, 10)
+
+    registry.retire()
+
+    with open(tmp_path / f"metrics-{os.getpid()}.json", encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot["gauges"] == []
+    assert snapshot["counters"] == [["http_requests_total", {"status": "200"}, 1]]
+
+
+class _Cache:
+    def __init__(self, size):
+        self.size = size
+
+    def stats(self):
+        return {"hits": 3, "misses": 1, "size": self.size}
+
+
+def _read_snapshot(metrics_dir):
+    with open(metrics_dir / f"metrics-{os.getpid()}.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_every_worker_snapshot_includes_its_cache_stats(tmp_path):
+    # /metrics を処理しないワーカーも、書き出すスナップショットに自分のキャッシュ統計を含める
+    cache = _Cache(size=7)
+    registry = MetricsRegistry(metrics_dir=str(tmp_path), flush_interval=0)
+    registry.add_collector(functools.partial(_collect_cache_stats, SimpleNamespace(extensions={"employee": cache})))
+
+    registry.maybe_flush()
+    assert _read_snapshot(tmp_path)["gauges"] == [["cache_entries", {"cache": "employee"}, 7]]
+    assert ["cache_events_total", {"cache": "employee", "event": "hits"}, 3] in _read_snapshot(tmp_path)["counters"]
+
+    cache.size = 9
+    registry.maybe_flush()
+    assert _read_snapshot(tmp_path)["gauges"] == [["cache_entries", {"cache": "employee"}, 9]]
+
+    registry.retire()
+    assert _read_snapshot(tmp_path)["gauges"] == []
+
+
+def test_collect_without_metrics_dir_runs_collectors():
+    registry = MetricsRegistry()
+    registry.add_collector(functools.partial(_collect_cache_stats, SimpleNamespace(extensions={"employee": _Cache(2)})))
+
+    assert registry.collect()["gauges"] == [["cache_entries", {"cache": "employee"}, 2]]
+
+
+def test_query_pages_are_timed_through_public_iterator():
+    registry = MetricsRegistry()
+    fake = FakeDatastoreClient(page_size=2)
+    for name in ("a", "b", "c"):
+        fake.put(datastore.Entity(key=fake.key('employees', name)))
+    client = InstrumentedDatastoreClient(fake, registry)
+
+    iterator = client.query(kind='employees').fetch()
+    assert len(list(iterator)) == 3
+    assert iterator.next_page_token is None
+    assert _calls(registry)["run_query"] == 2
+
+    pages = client.query(kind='employees').fetch(limit=2).pages
+    assert len(list(next(pages))) == 2
+    assert _calls(registry)["run_query"] == 3
+
+
+def test_transaction_times_begin_and_commit_but_not_buffered_puts():
+    registry = MetricsRegistry()
+    fake = FakeDatastoreClient()
+    client = InstrumentedDatastoreClient(fake, registry)
+
+    with client.transaction():
+        client.get(fake.key('employees', 'a'))
+        client.put(datastore.Entity(key=fake.key('employees', 'a')))
+
+    calls = _calls(registry)
+    assert calls["begin_transaction"] == 1
+    assert calls["commit"] == 1
+    assert calls["get"] == 1
+    # トランザクション中の put はコミットで送られるため個別には数えない
+    assert "put" not in calls
+
+
+def test_transaction_rollback_is_timed():
+    registry = MetricsRegistry()
+    client = InstrumentedDatastoreClient(FakeDatastoreClient(), registry)
+
+    try:
+        with client.transaction():
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert _calls(registry)["rollback"] == 1
+    assert "commit" not in _calls(registry)
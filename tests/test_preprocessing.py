@@ -0,0 +1,116 @@
+# tests/test_preprocessing.py
+
+import pytest
+
+from app.meeting_summary.preprocessing import (PREPROCESSING_STEPS, estimate_tokens, parse_steps,
+                                               preprocess_transcript, preprocessing_fingerprint)
+
+
+def _run(text, *steps):
+    return preprocess_transcript(text, steps or PREPROCESSING_STEPS).text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("", 0),
+    ("abcd", 1),
+    ("abcde", 2),
+    ("山田", 2),
+    ("山田 ok", 3),
+])
+def test_estimate_tokens(text, expected):
+    assert estimate_tokens(text) == expected
+
+
+def test_parse_steps_fixes_the_order_and_ignores_blanks():
+    assert parse_steps(" Speakers, whitespace,,fillers ") == ('whitespace', 'fillers', 'speakers')
+    assert parse_steps("") == ()
+    assert parse_steps(None) == ()
+
+
+def test_parse_steps_rejects_unknown_steps():
+    with pytest.raises(ValueError, match="translate"):
+        parse_steps("whitespace,translate")
+
+
+def test_fingerprint_depends_on_the_steps():
+    assert preprocessing_fingerprint(()) == 'raw'
+    assert preprocessing_fingerprint(('whitespace',)) == preprocessing_fingerprint(['whitespace'])
+    assert preprocessing_fingerprint(('whitespace',)) != preprocessing_fingerprint(('whitespace', 'fillers'))
+
+
+def test_whitespace_normalizes_and_drops_blank_lines():
+    assert _run("  山田:\t資料を　作ります  \r\n\r\n\n佐藤:  はい ", 'whitespace') == "山田: 資料を 作ります\n佐藤: はい"
+
+
+def test_timestamps_drop_timestamp_lines_and_leading_timestamps():
+    text = "2025-01-15 1on1\n00:12:34\n[00:12:35] 山田: 進めます\n(1:02) 佐藤: 17:28 に終わります"
+
+    assert _run(text, 'whitespace', 'timestamps') == "2025-01-15 1on1\n山田: 進めます\n佐藤: 17:28 に終わります"
+
+
+def test_fillers_keep_words_that_only_start_like_fillers():
+    text = "山田: えー、あの人に、まあ、確認します\n佐藤: あのー 了解です\n鈴木: えーと、\n田中: うーん"
+
+    assert _run(text, 'whitespace', 'fillers') == "山田: あの人に、確認します\n佐藤: 了解です"
+
+
+def test_fillers_keep_filler_only_lines_with_a_source_index():
+    text = "[source_index: 3] 山田: えー\n佐藤: えーと"
+
+    assert _run(text, 'whitespace', 'fillers') == "[source_index: 3] 山田:"
+
+
+def test_speakers_merge_consecutive_turns():
+    text = "山田: 資料を作ります\n山田: 来週までに\n佐藤: お願いします\n山田: はい"
+
+    assert _run(text, 'whitespace', 'speakers') == "山田: 資料を作ります 来週までに\n佐藤: お願いします\n山田: はい"
+
+
+def test_speakers_do_not_merge_across_source_index_lines():
+    text = "山田: 資料を作ります\n[source_index: 2] 山田: 来週までに\n山田: 了解"
+
+    assert _run(text, 'whitespace', 'speakers') == text
+
+
+def test_all_steps_together():
+    text = "2025-01-15 1on1\n00:00:01\n[00:00:02] 山田: えー、資料を作ります\n[00:00:05] 山田: あのー 来週までに\n佐藤: うーん"
+
+    assert _run(text) == "2025-01-15 1on1\n山田: 資料を作ります 来週までに"
+
+
+def test_prepared_transcript_reports_compression():
+    text = "山田: えー、資料を作ります\n山田: えー、来週までに"
+
+    prepared = preprocess_transcript(text)
+
+    assert prepared.original_tokens == estimate_tokens(text)
+    assert prepared.estimated_tokens == estimate_tokens(prepared.text)
+    assert prepared.compression_ratio < 1.0
+    assert prepared.to_dict() == {
+        "original_chars": len(text), "processed_chars": len(prepared.text),
+        "original_tokens": prepared.original_tokens, "estimated_tokens": prepared.estimated_tokens,
+        "compression_ratio": round(prepared.estimated_tokens / prepared.original_tokens, 3),
+        "fingerprint": preprocessing_fingerprint(PREPROCESSING_STEPS),
+    }
+
+
+def test_no_steps_returns_the_transcript_unchanged():
+    text = "  山田: えー  \n\n"
+
+    prepared = preprocess_transcript(text, ())
+
+    assert prepared.text == text
+    assert prepared.compression_ratio == 1.0
+    assert prepared.fingerprint == 'raw'
+    assert preprocess_transcript("", ()).compression_ratio == 1.0
+
+
+def test_oversized_transcript_is_rejected_before_calling_the_model(app, client, auth_headers):
+    app.config['MEETING_SUMMARY_MAX_INPUT_TOKENS'] = 10
+    transcript = "2025-01-15 1on1\n" + "山田: 資料を作ります\n" * 5
+
+    response = client.post('/meeting-summary/meeting', headers=auth_headers,
+                           json={"transcript_content": transcript, "use_cache": False})
+
+    assert response.status_code == 413
+    assert response.json["max_tokens"] == 10
@@ -0,0 +1,60 @@
+# tests/test_schemas.py
+
+from datetime import datetime, timezone
+
+import pytest
+from google.cloud import datastore
+
+from app.schemas import (EMPLOYEE, MEETING_SUMMARY, MEETING_SUMMARY_CACHE, MEETING_SUMMARY_JOB, SLACK_UNDELIVERED,
+                         SchemaError)
+
+
+def _key(schema):
+    return datastore.Key(schema.kind, 'id', project='test-project')
+
+
+@pytest.mark.parametrize('schema, name', [
+    (MEETING_SUMMARY, 'meeting_date'),
+    (MEETING_SUMMARY, 'employee_name'),
+    (MEETING_SUMMARY_JOB, 'status'),
+    (MEETING_SUMMARY_JOB, 'created_at'),
+    (MEETING_SUMMARY_CACHE, 'created_at'),
+    (SLACK_UNDELIVERED, 'created_at'),
+])
+def test_properties_read_only_by_key_are_not_indexed(schema, name):
+    assert name not in schema.indexed_properties
+
+
+@pytest.mark.parametrize('schema, names', [
+    # 話者の解決の projection クエリ (name, email) はどちらのインデックスも読む
+    (EMPLOYEE, {'name', 'email'}),
+    (MEETING_SUMMARY, {'employee_ids', 'createdAt'}),
+])
+def test_queried_properties_stay_indexed(schema, names):
+    assert names <= schema.indexed_properties
+
+
+def test_to_entity_excludes_unindexed_and_unknown_properties():
+    entity = MEETING_SUMMARY.to_entity(_key(MEETING_SUMMARY), {
+        'meeting_date': '2025-01-15', 'employee_name': ['山田'], 'employee_ids': ['e1'],
+        'createdAt': datetime(2025, 1, 15, tzinfo=timezone.utc), 'extra': 'x',
+    })
+
+    assert set(entity.exclude_from_indexes) == {'meeting_date', 'employee_name', 'extra'}
+    assert MEETING_SUMMARY.conforms(entity)
+
+
+def test_conform_rewrites_previously_indexed_entities():
+    stored = datastore.Entity(key=_key(MEETING_SUMMARY_JOB))
+    stored.update({'status': 'running', 'created_at': '2025-01-15T00:00:00+00:00'})
+    assert not MEETING_SUMMARY_JOB.conforms(stored)
+
+    conformed = MEETING_SUMMARY_JOB.conform(stored)
+
+    assert set(conformed.exclude_from_indexes) == {'status', 'created_at'}
+    assert MEETING_SUMMARY_JOB.conforms(conformed)
+
+
+def test_to_entity_rejects_values_of_the_wrong_type():
+    with pytest.raises(SchemaError):
+        SLACK_UNDELIVERED.to_entity(_key(SLACK_UNDELIVERED), {'attempts': 'many'})
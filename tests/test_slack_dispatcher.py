@@ -0,0 +1,119 @@
+import pytest
+
+from app.meeting_summary import slack
+from app.meeting_summary.slack import DEAD_LETTER_KIND, UNDELIVERED_KIND, SlackDispatcher
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {"ok": True}
+        self.headers = headers or {}
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append(json)
+        return self._responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(slack.time, 'sleep', recorded.append)
+    return recorded
+
+
+@pytest.fixture
+def make_dispatcher(app, monkeypatch):
+    # テスト中に atexit へ登録されたまま残らないようにする
+    monkeypatch.setattr(slack.atexit, 'register', lambda func: None)
+
+    def _make(responses, **kwargs):
+        dispatcher = SlackDispatcher(app, "xoxb-test", "#general", **dict({"max_retries": 3}, **kwargs))
+        dispatcher._session = FakeSession(responses)
+        return dispatcher
+    return _make
+
+
+def _payload(text="hello"):
+    return {"channel": "#general", "text": text, "unfurl_links": False}
+
+
+def test_transient_failures_are_retried(make_dispatcher, fake_db, sleeps):
+    dispatcher = make_dispatcher([FakeResponse(503), FakeResponse(200, {"ok": False, "error": "internal_error"}),
+                                  FakeResponse()])
+    dispatcher._deliver(_payload())
+
+    assert len(dispatcher._session.posts) == 3
+    assert len(sleeps) == 2
+    assert fake_db.kind_entities(UNDELIVERED_KIND) == []
+
+
+def test_rate_limit_honours_retry_after(make_dispatcher, sleeps):
+    dispatcher = make_dispatcher([FakeResponse(429, headers={"Retry-After": "7"}),
+                                  FakeResponse(200, {"ok": False, "error": "ratelimited"}, {"Retry-After": "3"}),
+                                  FakeResponse()])
+    dispatcher._deliver(_payload())
+
+    assert sleeps == [7.0, 3.0]
+
+
+@pytest.mark.parametrize('response, error', [
+    (FakeResponse(200, {"ok": False, "error": "channel_not_found"}), "channel_not_found"),
+    (FakeResponse(403), "HTTP 403"),
+    (FakeResponse(400), "HTTP 400"),
+])
+def test_permanent_error_is_dead_lettered_without_retry(make_dispatcher, fake_db, sleeps, response, error):
+    dispatcher = make_dispatcher([response])
+    dispatcher._deliver(_payload())
+
+    assert len(dispatcher._session.posts) == 1
+    assert fake_db.kind_entities(UNDELIVERED_KIND) == []
+    [dead] = fake_db.kind_entities(DEAD_LETTER_KIND)
+    assert dead["error"] == error and dead["attempts"] == 1 and dead["text"] == "hello"
+
+
+def test_exhausted_retries_are_persisted(make_dispatcher, fake_db, sleeps):
+    dispatcher = make_dispatcher([FakeResponse(500)] * 4)
+    dispatcher._deliver(_payload())
+
+    [undelivered] = fake_db.kind_entities(UNDELIVERED_KIND)
+    assert undelivered["attempts"] == 4 and undelivered["text"] == "hello"
+
+
+def test_full_queue_persists_message(make_dispatcher, fake_db, monkeypatch):
+    dispatcher = make_dispatcher([], max_queue=1)
+    monkeypatch.setattr(dispatcher, '_ensure_started', lambda: None)
+
+    assert dispatcher.enqueue("first") is True
+    assert dispatcher.enqueue("second") is False
+    [undelivered] = fake_db.kind_entities(UNDELIVERED_KIND)
+    assert undelivered["error"] == "queue_full" and undelivered["text"] == "second"
+
+
+def test_persisted_messages_are_requeued(make_dispatcher, fake_db):
+    dispatcher = make_dispatcher([])
+    dispatcher._persist(_payload("retry me"), "HTTP 500", 4)
+    dispatcher._persist(_payload("rate limited"), "HTTP 429", 4)
+    # 恒久的なエラーで未送信として保存されていたもの (以前の raise_for_status のメッセージを含む)
+    dispatcher._persist(_payload("give up"), "invalid_auth", 1)
+    dispatcher._persist(_payload("forbidden"), "403 Client Error: Forbidden for url: https://slack.com", 1)
+
+    dispatcher._requeue_persisted()
+
+    assert sorted(dispatcher._queue.get_nowait()["text"] for _ in range(2)) == ["rate limited", "retry me"]
+    assert dispatcher._queue.empty()
+    assert fake_db.kind_entities(UNDELIVERED_KIND) == []
+    assert sorted(entity["text"] for entity in fake_db.kind_entities(DEAD_LETTER_KIND)) == ["forbidden", "give up"]
+
+    # 移した後の起動では何も再投入しない
+    dispatcher._requeue_persisted()
+    assert dispatcher._queue.empty()
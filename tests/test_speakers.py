@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from google.cloud import datastore
+
+from app.google_meet_maps.index import get_mapping_index
+from app.meeting_summary.speakers import AhoCorasick, SpeakerResolver, SpeakerResolverHolder
+from app.schemas import EMPLOYEE
+
+
+def _put_employee(fake_db, employee_id, name, email):
+    fake_db.put(EMPLOYEE.to_entity(fake_db.key('employees', employee_id), {"name": name, "email": email}))
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.01)
+
+
+def test_aho_corasick_respects_word_boundaries():
+    automaton = AhoCorasick(["bob", "山田"])
+    assert automaton.count_matches("bob bobby 山田さん山田") == {0: 1, 1: 2}
+
+
+def test_resolver_links_meet_names_and_employee_names():
+    resolver = SpeakerResolver({"t@example.com": "Taro Yamada"},
+                               [("e1", "山田 太郎", "t@example.com"), ("e2", "佐藤 花子", "h@example.com")])
+
+    speakers = resolver.resolve_transcript("Taro Yamada: こんにちは\n佐藤花子: はい\ntaro yamada: 以上")
+    assert [(s["employee_id"], s["mentions"]) for s in speakers] == [("e1", 2), ("e2", 1)]
+    assert resolver.resolve_names(["山田太郎", "佐藤 花子さん", "unknown"]) == ["e1", "e2", None]
+
+
+def test_holder_reads_employees_with_projection(app, fake_db):
+    _put_employee(fake_db, "e1", "山田 太郎", "t@example.com")
+    # name がインデックスされていない (スキーマ変更前に作られた) 従業員は projection クエリに載らない
+    legacy = datastore.Entity(key=fake_db.key('employees', 'e2'), exclude_from_indexes=('name',))
+    legacy.update({"name": "佐藤 花子", "email": "h@example.com", "role": "manager"})
+    fake_db.put(legacy)
+
+    resolver = SpeakerResolverHolder().get(app)
+
+    assert resolver.resolve_names(["山田太郎", "佐藤花子"]) == ["e1", None]
+
+
+def test_holder_refreshes_in_background_and_keeps_resolver_if_unchanged(app, fake_db):
+    _put_employee(fake_db, "e1", "山田 太郎", "t@example.com")
+    holder = SpeakerResolverHolder(employee_refresh_seconds=0, check_seconds=0)
+    first = holder.get(app)
+
+    # 入力が変わらなければ確認しても作り直さない
+    assert holder.get(app) is first
+    _wait_until(lambda: not holder._refreshing)
+    assert holder.get(app) is first and holder.rebuilds == 1
+
+    _put_employee(fake_db, "e2", "佐藤 花子", "h@example.com")
+    holder.get(app)
+    _wait_until(lambda: holder.rebuilds == 2)
+    assert holder.get(app).resolve_names(["佐藤花子"]) == ["e2"]
+
+
+def test_holder_does_not_block_requests_while_refreshing(app, fake_db, monkeypatch):
+    _put_employee(fake_db, "e1", "山田 太郎", "t@example.com")
+    holder = SpeakerResolverHolder(employee_refresh_seconds=0, check_seconds=0)
+    first = holder.get(app)
+
+    release = threading.Event()
+    original_query = fake_db.query
+
+    def _slow_query(*args, **kwargs):
+        release.wait(2)
+        return original_query(*args, **kwargs)
+
+    monkeypatch.setattr(fake_db, 'query', _slow_query)
+    started = time.monotonic()
+    assert holder.get(app) is first
+    assert holder.get(app) is first
+    assert time.monotonic() - started < 0.5
+    release.set()
+    _wait_until(lambda: not holder._refreshing)
+
+
+def test_mapping_change_triggers_rebuild(app, client, auth_headers, fake_db):
+    _put_employee(fake_db, "e1", "山田 太郎", "t@example.com")
+    holder = SpeakerResolverHolder(check_seconds=3600)
+    holder.get(app)
+
+    client.post('/google_meet_employee_map/t@example.com', json={"google_meet_name": "Taro Y"}, headers=auth_headers)
+    assert get_mapping_index(app).version != holder._mapping_version
+    holder.get(app)
+    _wait_until(lambda: holder.rebuilds == 2)
+
+    assert holder.get(app).resolve_names(["Taro Y"]) == ["e1"]
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_summary_includes_speakers(app, client, auth_headers, fake_db, enabled):
+    app.config['SPEAKER_RESOLUTION_ENABLED'] = enabled
+    _put_employee(fake_db, "e1", "Stub Employee", "s@example.com")
+    response = client.post('/meeting-summary/meeting', json={"transcript_content": "Stub Employee: hello"},
+                           headers=auth_headers)
+
+    summary = response.json["summary"]
+    if enabled:
+        assert summary["employee_ids"] == ["e1"]
+        assert summary["speakers"][0]["employee_id"] == "e1"
+    else:
+        assert summary["employee_ids"] == [] and summary["speakers"] == []
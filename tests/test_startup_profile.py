@@ -0,0 +1,49 @@
+from app import create_app, reset_after_fork
+from app.startup_profile import StartupProfile
+
+
+def test_profile_records_phases_and_imports():
+    profile = StartupProfile()
+    profile.mark("config")
+    profile.import_module("json")
+    profile.finish()
+
+    report = profile.report()
+    assert [phase["phase"] for phase in report["phases"]] == ["config", "other"]
+    assert report["imports"][0]["module"] == "json"
+    assert report["total_ms"] >= 0
+
+
+def test_create_app_does_not_initialise_clients(monkeypatch):
+    monkeypatch.setenv('GENAI_BACKEND', 'stub')
+    app = create_app()
+
+    assert not app.db_initialized
+    assert 'genai' not in app.extensions
+    report = app.extensions['startup_profile'].report()
+    assert "blueprint:employees" in [phase["phase"] for phase in report["phases"]]
+
+
+def test_startup_profile_endpoint(client, auth_headers):
+    response = client.get('/_startup/profile', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["lazy_initialized"] == {"datastore_client": True, "genai": False}
+    assert client.get('/_startup/profile').status_code == 401
+
+
+def test_genai_is_loaded_on_first_summary(app, client, auth_headers):
+    client.post('/meeting-summary/meeting', json={"transcript_content": "山田: はい"}, headers=auth_headers)
+
+    assert client.get('/_startup/profile', headers=auth_headers).json["lazy_initialized"]["genai"] is True
+
+
+def test_reset_after_fork_keeps_only_fork_safe_extensions(app, client, auth_headers):
+    client.get('/employees/e1', headers=auth_headers)
+    registry = app.extensions['metrics']
+
+    reset_after_fork(app)
+
+    assert set(app.extensions) == {'startup_profile', 'metrics'}
+    assert app.extensions['metrics'] is registry
+    assert not app.db_initialized
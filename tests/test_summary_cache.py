@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.meeting_summary.models import MeetingSummary
+from app.meeting_summary.summary_cache import CACHE_KIND, SummaryCache, summary_cache_key
+
+TRANSCRIPT = "2025-01-15 1on1\n山田: 来週までに資料を作ります。"
+
+
+def _summary(purpose="weekly"):
+    return MeetingSummary(meeting_date="2025-01-15", employee_name=["山田"], purpose=purpose, decisions=[],
+                          action_items=[], overall_summary="ok")
+
+
+def test_cache_key_ignores_whitespace_and_line_endings():
+    key = summary_cache_key("a  b\r\n\r\nc", "model", "v1")
+    assert key == summary_cache_key("a b\nc\n", "model", "v1")
+    assert key != summary_cache_key("a b\nc", "model", "v2")
+    assert key != summary_cache_key("a b\nc", "model", "v1", preprocessing="abc")
+
+
+def test_concurrent_requests_compute_once(app):
+    cache = SummaryCache(app)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return _summary()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
+    assert len({id(summary) for summary, _ in results}) == 5
+
+
+def test_followers_see_leader_error(app):
+    cache = SummaryCache(app)
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("llm failed")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_compute("k", compute)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["llm failed", "llm failed"]
+    # 失敗は保存されず、次の呼び出しで再計算する
+    assert cache.get_or_compute("k", _summary) == (_summary(), False)
+
+
+def test_persistent_cache_survives_process_restart(app, fake_db):
+    SummaryCache(app).get_or_compute("k", _summary)
+
+    summary, hit = SummaryCache(app).get_or_compute("k", lambda: pytest.fail("should not recompute"))
+
+    assert hit is True and summary.purpose == "weekly"
+    assert len(fake_db.kind_entities(CACHE_KIND)) == 1
+
+
+def test_expired_persistent_entry_is_recomputed(app, fake_db):
+    SummaryCache(app, persistent_ttl=60).get_or_compute("k", _summary)
+    [entity] = fake_db.kind_entities(CACHE_KIND)
+    entity['created_at'] = datetime.now(timezone.utc) - timedelta(seconds=120)
+
+    summary, hit = SummaryCache(app, persistent_ttl=60).get_or_compute("k", lambda: _summary("fresh"))
+
+    assert hit is False and summary.purpose == "fresh"
+
+
+def test_summarize_endpoint_reuses_cached_summary(client, auth_headers):
+    body = {"transcript_content": TRANSCRIPT}
+    first = client.post('/meeting-summary/meeting', json=body, headers=auth_headers).json
+    second = client.post('/meeting-summary/meeting', json=body, headers=auth_headers).json
+    bypass = client.post('/meeting-summary/meeting', json=dict(body, use_cache=False), headers=auth_headers).json
+
+    assert (first["cached"], second["cached"], bypass["cached"]) == (False, True, False)
+    assert first["summary"] == second["summary"]
@@ -0,0 +1,115 @@
+# tests/test_summary_models.py
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.meeting_summary.models import ActionItem, Decision, MeetingSummary
+from app.schemas import MEETING_SUMMARY
+
+
+def _summary(employee_ids=('e1',), purpose="定例"):
+    return MeetingSummary(
+        meeting_date="2025-01-15", employee_name=["山田"], purpose=purpose,
+        decisions=[Decision(item="資料を作る", discussion_summary="進め方", source_utterance_indices=[1, 2])],
+        action_items=[ActionItem(action="資料作成", assignee="山田", due_date="2025-01-22")],
+        overall_summary="まとめ", employee_ids=list(employee_ids),
+        speakers=[{"name": "山田", "email": "yamada@example.com", "employee_id": "e1", "mentions": 3}],
+    )
+
+
+@pytest.fixture
+def saved_summaries(fake_db):
+    """e1 の要約 3 件と e2 の要約 1 件を、古い順に1分ずつずらして保存する"""
+    started = datetime(2025, 1, 15, tzinfo=timezone.utc)
+    ids = []
+    for n, employee_id in enumerate(['e1', 'e1', 'e2', 'e1']):
+        key = fake_db.key(MEETING_SUMMARY.kind, f"1on1_{n}")
+        fake_db.put(_summary([employee_id], purpose=f"会議 {n}").to_entity(
+            key, extra={"createdAt": started + timedelta(minutes=n)}))
+        ids.append(key.name)
+    return ids
+
+
+def test_models_use_slots():
+    summary = _summary()
+    for value in (summary, summary.decisions[0], summary.action_items[0]):
+        assert not hasattr(value, '__dict__')
+
+
+def test_dict_round_trip():
+    summary = _summary()
+
+    restored = MeetingSummary.from_dict(json.loads(json.dumps(summary.to_dict())))
+
+    assert restored == summary
+
+
+def test_entity_round_trip_embeds_records_and_indexes_only_schema_properties(fake_db):
+    summary = _summary()
+    entity = summary.to_entity(fake_db.key(MEETING_SUMMARY.kind, 'm1'),
+                               extra={"createdAt": datetime(2025, 1, 15, tzinfo=timezone.utc)})
+
+    assert MeetingSummary.from_entity(entity) == summary
+    assert set(entity.exclude_from_indexes) == set(entity) - MEETING_SUMMARY.indexed_properties
+    assert set(entity['decisions'][0].exclude_from_indexes) == set(Decision._FIELDS)
+
+
+def test_from_mapping_ignores_unknown_keys_and_fills_defaults():
+    item = ActionItem.from_mapping({"action": "連絡", "unknown": 1})
+
+    assert item == ActionItem(action="連絡", assignee='', due_date=None)
+
+
+def test_get_saved_summary(client, auth_headers, saved_summaries):
+    response = client.get(f'/meeting-summary/summaries/{saved_summaries[0]}', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["meeting_id"] == saved_summaries[0]
+    assert response.json["summary"]["decisions"][0]["source_utterance_indices"] == [1, 2]
+    assert client.get('/meeting-summary/summaries/missing', headers=auth_headers).status_code == 404
+
+
+def test_list_saved_summaries_filters_by_employee_newest_first(client, auth_headers, saved_summaries):
+    response = client.get('/meeting-summary/summaries?employee_id=e1', headers=auth_headers)
+
+    assert [item["meeting_id"] for item in response.json["summaries"]] == ['1on1_3', '1on1_1', '1on1_0']
+    assert response.json["next_cursor"] is None
+
+
+def test_list_saved_summaries_paginates_with_cursor(client, auth_headers, saved_summaries):
+    first = client.get('/meeting-summary/summaries?limit=2', headers=auth_headers).json
+    second = client.get(f'/meeting-summary/summaries?limit=2&cursor={first["next_cursor"]}',
+                        headers=auth_headers).json
+
+    assert [item["meeting_id"] for item in first["summaries"] + second["summaries"]] == \
+        ['1on1_3', '1on1_2', '1on1_1', '1on1_0']
+    assert client.get('/meeting-summary/summaries?cursor=bad', headers=auth_headers).status_code == 400
+
+
+def test_list_saved_summaries_streams_ndjson(client, auth_headers, saved_summaries):
+    response = client.get('/meeting-summary/summaries?stream=true', headers=auth_headers)
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 4
+    assert lines[0]["summary"]["purpose"] == "会議 3"
+
+
+def test_stream_rejects_an_invalid_cursor_before_streaming(client, auth_headers, saved_summaries):
+    response = client.get('/meeting-summary/summaries?stream=true&cursor=zzz', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.mimetype == 'application/json'
+
+
+def test_stream_continues_from_a_cursor_across_pages(client, auth_headers, fake_db, saved_summaries):
+    fake_db.page_size = 1
+    first = client.get('/meeting-summary/summaries?limit=1', headers=auth_headers).json
+
+    response = client.get(f'/meeting-summary/summaries?stream=true&cursor={first["next_cursor"]}',
+                          headers=auth_headers)
+
+    assert [json.loads(line)["meeting_id"] for line in response.get_data(as_text=True).splitlines()] == \
+        ['1on1_2', '1on1_1', '1on1_0']